@@ -1,16 +1,25 @@
 import os
+import pandas as pd
 import streamlit as st
 
 from utils.styling import apply_global_style
-from utils.data_loader import load_data
-from app.pages_exec import render_exec_overview
-from app.pages_reveal import render_reveal
-from app.pages_predict import render_predict
-from app.pages_act import render_act
+from app.data_store import get_cube, get_filter_index, get_registered_model, info_dataset, invalidate_dataset
+from utils.instrumentation import DIAG_ATIVO, finalizar_rerun, iniciar_rerun, trecho
+from utils.kpis import resumo_kpis
+from utils.model import chave_modelo
 
 
 LOGO_PATH = os.path.join("assets", "genesis_logo.png")
 
+# Só a aba escolhida roda (st.tabs executaria as quatro a cada rerun): o
+# modelo — e o import do scikit-learn — ficam para quando Predict/Act abrir.
+ABAS = ["Executive Overview", "Reveal", "Predict", "Act"]
+ABAS_MODELO = {"Predict", "Act"}
+
+# O dataset é compartilhado entre sessões: copy-on-write garante que
+# filtros/colunas derivadas nas páginas nunca alterem o frame original.
+pd.set_option("mode.copy_on_write", True)
+
 st.set_page_config(
     page_title="Genesis | No-show & Eficiência de Agenda",
     page_icon="🏥",
@@ -18,6 +27,9 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# Medições deste rerun (painel "Diagnóstico" com ?diag=1 e log GENESIS_DIAG_LOG)
+diag = iniciar_rerun()
+
 # ✅ agora não passa mais logo_path
 apply_global_style()
 
@@ -27,10 +39,10 @@ st.sidebar.header("Filtros")
 if os.path.exists(LOGO_PATH):
     st.sidebar.image(LOGO_PATH, use_container_width=True)
 
-df = load_data()
+with trecho("dados"):
+    indice = get_filter_index()
 
-min_date = df["data_agendamento"].min()
-max_date = df["data_agendamento"].max()
+min_date, max_date = (d.date() for d in indice.periodo())
 
 date_range = st.sidebar.date_input(
     "Período (data do agendamento)",
@@ -44,30 +56,63 @@ if isinstance(date_range, tuple) and len(date_range) == 2:
 else:
     start_date, end_date = min_date, max_date
 
-canais = ["Todos"] + sorted(df["canal_confirmacao"].unique().tolist())
-bairros = ["Todos"] + sorted(df["bairro"].unique().tolist())
-
-canal = st.sidebar.selectbox("Canal de confirmação", canais, index=0)
-bairro = st.sidebar.selectbox("Bairro", bairros, index=0)
-
-dff = df.copy()
-dff = dff[(dff["data_agendamento"] >= start_date) & (dff["data_agendamento"] <= end_date)]
-
-if canal != "Todos":
-    dff = dff[dff["canal_confirmacao"] == canal]
-if bairro != "Todos":
-    dff = dff[dff["bairro"] == bairro]
-
-tab1, tab2, tab3, tab4 = st.tabs(["Executive Overview", "Reveal", "Predict", "Act"])
+# Seleção vazia = todos
+canais = st.sidebar.multiselect(
+    "Canal de confirmação", indice.valores("canal_confirmacao"), placeholder="Todos"
+)
+bairros = st.sidebar.multiselect(
+    "Bairro", indice.valores("bairro"), placeholder="Todos"
+)
 
-with tab1:
-    render_exec_overview(dff)
+diag.contexto["filtros"] = {"inicio": str(start_date), "fim": str(end_date), "canais": canais, "bairros": bairros}
 
-with tab2:
-    render_reveal(dff)
+# Identifica o estado de filtro para reaproveitar KPIs e modelo/score entre abas e reruns
+info = info_dataset()
+chave = chave_modelo(info["versao"], (start_date, end_date, tuple(canais), tuple(bairros)))
+# KPIs saem do cubo (ou do GROUP BY do backend SQL): Executive Overview e
+# Reveal não leem linhas; só as abas de modelo filtram a base
+resumo = resumo_kpis(
+    None, chave, cubo=get_cube(),
+    filtros={"inicio": start_date, "fim": end_date, "canais": canais, "bairros": bairros},
+)
 
-with tab3:
-    render_predict(dff)
+with st.sidebar.expander("Dados"):
+    if info.get("origem"):
+        st.caption(f"{info['linhas']:,} linhas".replace(",", ".") + f" | consultas em {info['origem']}")
+    else:
+        st.caption(
+            f"{info['linhas']:,} linhas".replace(",", ".")
+            + f" | {info['memoria_bytes'] / 1024**2:.1f} MB em memória (compartilhado entre sessões)"
+        )
+        if info.get("mapeado_bytes"):
+            st.caption(f"Base mapeada do disco: {info['mapeado_bytes'] / 1024**2:.1f} MB no page cache (compartilhado entre processos)")
+    if st.button("Recarregar dados", key="dados_recarregar"):
+        invalidate_dataset()
+        st.rerun()
+
+aba = st.radio("Aba", ABAS, horizontal=True, key="aba", label_visibility="collapsed")
+modelo = get_registered_model() if aba in ABAS_MODELO else None
+
+if aba == "Executive Overview":
+    from app.pages_exec import render_exec_overview
+    render_exec_overview(resumo=resumo)
+
+elif aba == "Reveal":
+    from app.pages_reveal import render_reveal
+    render_reveal(resumo=resumo)
+
+elif aba == "Predict":
+    from app.pages_predict import render_predict
+    dff = indice.filtrar(start_date, end_date, canais, bairros)
+    render_predict(dff, chave, modelo)
 
-with tab4:
-    render_act(dff)
+else:
+    from app.pages_act import render_act
+    dff = indice.filtrar(start_date, end_date, canais, bairros)
+    render_act(dff, chave, modelo, resumo)
+
+rerun = finalizar_rerun()
+if rerun is not None and (DIAG_ATIVO or st.query_params.get("diag") == "1"):
+    with st.sidebar.expander("Diagnóstico", expanded=True):
+        st.caption(f"Rerun: {rerun.total_s * 1000:.0f} ms | tempo próprio = sem os trechos internos")
+        st.dataframe(rerun.tabela(), use_container_width=True, hide_index=True)
@@ -0,0 +1,217 @@
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from utils.backend import BackendSQL, backend_padrao
+from utils.cube import CuboKpis
+from utils.data_loader import garantir_cache, load_cube, load_data, load_delta, partes_incrementais, versao_dados
+from utils.filters import IndiceFiltros
+from utils.mmap_store import MMAP_ATIVO, abrir_ou_exportar, anexar as anexar_mapeado
+from utils.kpis import limpar_cache_resumos
+from utils.model import limpar_cache_modelos
+from utils.model_registry import carregar_modelo, versao_atual
+
+
+def _montar(df: pd.DataFrame, indice: IndiceFiltros, cubo: CuboKpis, versao: str, partes: list[str],
+            mapeado: bool = False) -> dict:
+    base_bytes = int(df.memory_usage(deep=True).sum()) + indice.memoria_bytes()
+    return {
+        "df": df,
+        "indice": indice,
+        "cubo": cubo,
+        "versao": versao,
+        "partes": partes,
+        "linhas": int(len(df)),
+        "celulas_cubo": int(len(cubo.celulas)),
+        # Base mapeada do disco fica no page cache, compartilhada entre processos
+        "memoria_bytes": (0 if mapeado else base_bytes) + cubo.memoria_bytes(),
+        "mapeado_bytes": base_bytes if mapeado else 0,
+    }
+
+
+def _carregar() -> dict:
+    # O índice ordena a base por data uma vez; o frame compartilhado é o
+    # já ordenado, para que os cortes por período sejam views.
+    # Com GENESIS_MMAP (padrão), base e índice ficam em arquivos mapeados:
+    # o primeiro processo exporta, os demais só mapeiam.
+    # O cubo pré-agregado responde os KPIs de qualquer filtro sem varrer a
+    # base; vem pronto do cache quando a ingestão já o gravou.
+    # Uma reconstrução do cache base reaplica as partes incrementais, então
+    # a versão só é lida depois dela.
+    try:
+        garantir_cache()
+    except (ImportError, OSError, ValueError):
+        pass
+    versao = versao_dados()
+    partes = partes_incrementais()
+    if MMAP_ATIVO:
+        indice, mapeado = abrir_ou_exportar(versao, lambda: IndiceFiltros(load_data()))
+    else:
+        indice, mapeado = IndiceFiltros(load_data()), False
+    df = indice.df
+    cubo = load_cube() or CuboKpis.de_dataframe(df)
+    return _montar(df, indice, cubo, versao, partes, mapeado)
+
+
+def _anexar(pack: dict, versao: str) -> dict:
+    # Só as partes novas são lidas; índice e cubo são estendidos com o delta.
+    # Mapeado, o delta vai para o fim dos arquivos já exportados (O(delta));
+    # só um delta fora de ordem de data reexporta a base inteira.
+    partes = partes_incrementais()
+    delta = load_delta(partes[len(pack["partes"]):])
+    if delta is None or delta.empty:
+        return {**pack, "versao": versao, "partes": partes}
+
+    indice = anexar_mapeado(pack["versao"], versao, delta) if MMAP_ATIVO else None
+    if indice is not None:
+        mapeado = True
+    elif MMAP_ATIVO:
+        indice, mapeado = abrir_ou_exportar(versao, lambda: pack["indice"].anexar(delta))
+    else:
+        indice, mapeado = pack["indice"].anexar(delta), False
+    cubo = load_cube() or CuboKpis.combinar([pack["cubo"].celulas, CuboKpis.de_dataframe(delta).celulas])
+    return _montar(indice.df, indice, cubo, versao, partes, mapeado)
+
+
+# Um único dataset por processo do servidor, compartilhado por todas as
+# sessões. A cada rerun a versão da origem é conferida: se só chegaram
+# partes incrementais (`utils.ingest`), anexa o delta; se o CSV base mudou,
+# recarrega tudo.
+@st.cache_resource(show_spinner=False)
+def _estado() -> dict:
+    return {"lock": threading.Lock(), "pack": None}
+
+
+def _dataset_compartilhado() -> dict:
+    versao = versao_dados()
+    estado = _estado()
+    with estado["lock"]:
+        pack = estado["pack"]
+        if pack is None or pack["versao"] != versao:
+            base = versao.rsplit("+", 1)[0]
+            incremental = (
+                pack is not None
+                and pack["versao"].rsplit("+", 1)[0] == base
+                and partes_incrementais()[:len(pack["partes"])] == pack["partes"]
+            )
+            if incremental:
+                pack = _anexar(pack, versao)
+            else:
+                with st.spinner("Carregando dados..."):
+                    pack = _carregar()
+            estado["pack"] = pack
+            limpar_cache_resumos()
+            limpar_cache_modelos()
+        return pack
+
+
+# Com GENESIS_BACKEND=sqlite/dbapi nada da base fica em memória: filtros e
+# KPIs viram consultas no banco (utils.backend) e só o recorte filtrado é
+# lido para as abas de modelo.
+@st.cache_resource(show_spinner=False)
+def _backend_sql() -> BackendSQL | None:
+    return backend_padrao()
+
+
+# As informações do backend são calculadas uma vez por versão da origem
+# (`versao_origem`: stat do arquivo ou versão do cache, sem consulta).
+@st.cache_data(max_entries=1, show_spinner=False)
+def _info_sql(versao: str) -> dict:
+    backend = _backend_sql()
+    return {
+        "versao": versao,
+        "linhas": backend.contar(),
+        "celulas_cubo": 0,
+        "memoria_bytes": 0,
+        "origem": backend.descricao,
+    }
+
+
+def _backend_atual() -> BackendSQL | None:
+    backend = _backend_sql()
+    if backend is not None and backend.sincronizar(backend.versao_origem()):
+        limpar_cache_resumos()
+        limpar_cache_modelos()
+    return backend
+
+
+def get_dataset() -> pd.DataFrame:
+    """
+    Dataset normalizado compartilhado (somente leitura).
+    Não altere o frame retornado: ele é o mesmo objeto para todas as sessões.
+    """
+
+    backend = _backend_atual()
+    if backend is not None:
+        return backend.load_data()
+    return _dataset_compartilhado()["df"]
+
+
+def get_filter_index() -> IndiceFiltros | BackendSQL:
+    """
+    Índice de filtros (período, canal, bairro) sobre o dataset compartilhado,
+    ou o backend SQL (mesma interface) quando configurado.
+    """
+
+    backend = _backend_atual()
+    if backend is not None:
+        return backend
+    return _dataset_compartilhado()["indice"]
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _modelo_registrado(versao: str) -> dict | None:
+    return carregar_modelo(versao)
+
+
+def get_registered_model() -> dict | None:
+    """
+    Modelo promovido no registro (treinado offline), carregado uma vez por
+    processo. None se não houver modelo registrado: as abas treinam inline.
+    """
+
+    versao = versao_atual()
+    if versao is None:
+        return None
+    return _modelo_registrado(versao)
+
+
+def get_cube() -> CuboKpis | BackendSQL:
+    """
+    Cubo de KPIs (dia × canal × bairro × faixas) do dataset compartilhado,
+    ou o backend SQL, que responde o mesmo `resumo` com um GROUP BY.
+    """
+
+    backend = _backend_atual()
+    if backend is not None:
+        return backend
+    return _dataset_compartilhado()["cubo"]
+
+
+def info_dataset() -> dict:
+    """
+    Versão, linhas e memória (bytes) do dataset carregado no processo.
+    """
+
+    backend = _backend_atual()
+    if backend is not None:
+        return _info_sql(backend.versao_vista)
+    pack = _dataset_compartilhado()
+    return {k: v for k, v in pack.items() if k not in ("df", "indice", "cubo", "partes")}
+
+
+def invalidate_dataset() -> None:
+    """
+    Descarta o dataset compartilhado (e os KPIs/modelos calculados sobre ele);
+    a próxima chamada recarrega.
+    """
+
+    estado = _estado()
+    with estado["lock"]:
+        estado["pack"] = None
+    if _backend_sql() is not None:
+        _backend_sql().limpar()
+        _info_sql.clear()
+    limpar_cache_resumos()
+    limpar_cache_modelos()
@@ -1,11 +1,64 @@
 import streamlit as st
-import plotly.express as px
 
-from utils.kpis import priorizar_acoes, simular_reducao_no_show
-from utils.model import treinar_modelo_no_show, pontuar_risco_no_show
+from utils.instrumentation import medido, plotly_chart
+from utils.kpis import ResumoKpis
+from utils.model import modelo_e_score
+from utils.rules import (
+    EXEC_BOT, EXEC_MANUAL, FAIXAS, LIMIAR_ALTO, LIMIAR_MODERADO, aplicar_regras, carregar_regras, fila_acao, mascara_fila,
+    pagina_fila, ranking_acoes,
+)
+
+
+COLUNAS_FILA_TELA = {
+    "id_agendamento": "ID",
+    "idade": "Idade",
+    "canal_confirmacao": "Canal",
+    "bairro": "Bairro",
+    "antecedencia_dias": "Antecedência (dias)",
+    "faixa_risco": "Faixa de risco",
+    "acao_recomendada": "Ação recomendada",
+    "execucao": "Execução",
+    "risco_no_show": "Risco (0-1)",
+}
+
+# Rótulo -> (coluna, decrescente)
+ORDENACOES_FILA = {
+    "Risco (maior primeiro)": ("risco_no_show", True),
+    "Risco (menor primeiro)": ("risco_no_show", False),
+    "Antecedência (maior primeiro)": ("antecedencia_dias", True),
+    "Antecedência (menor primeiro)": ("antecedencia_dias", False),
+    "Idade (maior primeiro)": ("idade", True),
+}
+
+
+def _csv_fila(tmp, assinatura) -> None:
+    # CSV da fila completa só quando pedido; fica na sessão enquanto base,
+    # modelo, limiares e regras forem os mesmos
+    export = st.session_state.get("act_export_fila")
+    if export is not None and export["assinatura"] != assinatura:
+        del st.session_state["act_export_fila"]
+        export = None
+
+    if export is None:
+        if not st.button("Preparar CSV da fila completa", key="act_preparar_csv"):
+            return
+        with st.spinner("Gerando CSV..."):
+            dados = fila_acao(tmp).rename(columns=COLUNAS_FILA_TELA).to_csv(index=False).encode("utf-8")
+        export = st.session_state["act_export_fila"] = {"assinatura": assinatura, "dados": dados}
 
+    st.download_button(
+        "Baixar fila completa (CSV)",
+        data=export["dados"],
+        file_name="fila_acao_no_show.csv",
+        mime="text/csv",
+        key="act_download_fila_csv",
+    )
+
+
+@medido("render_act")
+def render_act(df, chave=None, modelo=None, resumo=None):
+    import plotly.express as px
 
-def render_act(df):
     st.subheader("Act — Plano de ação (fila de trabalho para reduzir no-show)")
 
     st.caption(
@@ -14,14 +67,13 @@ def render_act(df):
     )
 
     # ======================
-    # 1) Gerar score de risco (reutiliza modelo do Predict)
+    # 1) Gerar score de risco (mesmo modelo/score do Predict, via cache)
     # ======================
-    model_pack = treinar_modelo_no_show(df)
+    model_pack, scored = modelo_e_score(df, chave, modelo)
     if model_pack is None:
         st.warning("Sem dados suficientes para gerar score e montar fila de ação.")
         return
 
-    scored = pontuar_risco_no_show(df, model_pack)
     if scored is None or len(scored) == 0:
         st.warning("Não foi possível gerar score para a base filtrada.")
         return
@@ -40,14 +92,14 @@ def render_act(df):
     with cA:
         limiar_moderado = st.slider(
             "Limite do risco moderado",
-            0.30, 0.90, 0.55, 0.01,
+            0.30, 0.90, LIMIAR_MODERADO, 0.01,
             key="act_limiar_moderado"
         )
 
     with cB:
         limiar_alto = st.slider(
             "Limite do alto risco",
-            0.40, 0.95, 0.75, 0.01,
+            0.40, 0.95, LIMIAR_ALTO, 0.01,
             key="act_limiar_alto"
         )
 
@@ -63,44 +115,10 @@ def render_act(df):
         limiar_alto = limiar_moderado
 
     # ======================
-    # 3) Rotular faixa + ação recomendada (o que você pediu)
+    # 3) Rotular faixa + ação recomendada (playbook em config/regras_acao.json)
     # ======================
-    tmp = scored.copy()
-
-    def faixa_risco(r: float) -> str:
-        if r >= limiar_alto:
-            return "ALTO"
-        elif r >= limiar_moderado:
-            return "MODERADO"
-        return "BAIXO"
-
-    tmp["faixa_risco"] = tmp["risco_no_show"].apply(faixa_risco)
-
-    # Ações:
-    # - ALTO e <60: WhatsApp + SMS (bot)
-    # - ALTO e 60+: Ligação (manual)
-    # - MODERADO: WhatsApp (bot) + lembrete SMS padrão
-    # - BAIXO: lembrete SMS padrão
-    def acao_recomendada(risco: float, idade_60_mais: int) -> str:
-        if risco >= limiar_alto:
-            if int(idade_60_mais) == 1:
-                return "Ligar (manual) — confirmação ativa"
-            return "WhatsApp + SMS (bot) — confirmação dupla"
-        if risco >= limiar_moderado:
-            return "WhatsApp (bot) + SMS padrão — confirmar"
-        return "SMS padrão — lembrete"
-
-    def tipo_execucao(acao: str) -> str:
-        # Para você medir carga operacional
-        if "Ligar" in acao:
-            return "Manual (analista)"
-        return "Automático (bot)"
-
-    tmp["acao_recomendada"] = tmp.apply(
-        lambda row: acao_recomendada(row["risco_no_show"], row["idade_60_mais"]),
-        axis=1
-    )
-    tmp["execucao"] = tmp["acao_recomendada"].apply(tipo_execucao)
+    regras = carregar_regras()
+    tmp = aplicar_regras(scored, limiar_moderado, limiar_alto, regras)
 
     # ======================
     # 4) Resumo executivo: quantos casos por faixa + carga manual x bot
@@ -113,8 +131,8 @@ def render_act(df):
     moderado = int((tmp["faixa_risco"] == "MODERADO").sum())
     baixo = int((tmp["faixa_risco"] == "BAIXO").sum())
 
-    manual = int((tmp["execucao"] == "Manual (analista)").sum())
-    auto = int((tmp["execucao"] == "Automático (bot)").sum())
+    manual = int((tmp["execucao"] == EXEC_MANUAL).sum())
+    auto = int((tmp["execucao"] == EXEC_BOT).sum())
 
     k1, k2, k3, k4, k5 = st.columns(5)
     k1.metric("Total", f"{total:,}".replace(",", "."))
@@ -135,20 +153,7 @@ def render_act(df):
     st.markdown("### Ranking de ações por faixa (guia para analistas)")
 
     # visão agregada para facilitar “o que fazer primeiro”
-    agg = tmp.groupby(["faixa_risco", "idade_60_mais", "acao_recomendada", "execucao"]).agg(
-        qtd=("id_agendamento", "count"),
-        risco_medio=("risco_no_show", "mean"),
-        antecedencia_media=("antecedencia_dias", "mean"),
-    ).reset_index()
-
-    agg["grupo_idade"] = agg["idade_60_mais"].apply(lambda x: "60+" if int(x) == 1 else "<60")
-
-    # ordenação: alto primeiro, depois moderado, depois baixo
-    ordem = {"ALTO": 0, "MODERADO": 1, "BAIXO": 2}
-    agg["ordem"] = agg["faixa_risco"].map(ordem).fillna(9)
-    agg = agg.sort_values(["ordem", "qtd"], ascending=[True, False]).drop(columns=["ordem", "idade_60_mais"])
-
-    agg = agg.rename(columns={
+    agg = ranking_acoes(tmp).rename(columns={
         "faixa_risco": "Faixa de risco",
         "grupo_idade": "Grupo idade",
         "acao_recomendada": "Ação recomendada",
@@ -161,10 +166,9 @@ def render_act(df):
     st.dataframe(agg, use_container_width=True)
 
     st.info(
-        "**Regra do ALTO risco (do jeito que você pediu):**\n"
-        "- **ALTO + <60** → **WhatsApp + SMS (bot)**\n"
-        "- **ALTO + 60+** → **Ligação (manual)**\n\n"
-        "Isso cria um roteiro claro para o time: bot onde dá escala, humano onde a chance de falha é mais cara."
+        "**Playbook vigente (primeira regra que casar define a ação):**\n"
+        + "\n".join(f"- **{r['descricao']}** → **{r['acao']}**" for r in regras.regras)
+        + "\n\nIsso cria um roteiro claro para o time: bot onde dá escala, humano onde a chance de falha é mais cara."
     )
 
     # ======================
@@ -175,33 +179,32 @@ def render_act(df):
 
     st.caption(
         "Esta tabela é a fila que o analista executa. "
-        "Ordenada por risco (maior primeiro)."
+        "Por padrão, ordenada por risco (maior primeiro); filtre, reordene e pagine abaixo."
     )
 
-    fila = tmp.sort_values("risco_no_show", ascending=False)[
-        ["id_agendamento", "idade", "canal_confirmacao", "bairro", "antecedencia_dias", "faixa_risco", "acao_recomendada", "execucao", "risco_no_show"]
-    ].rename(columns={
-        "id_agendamento": "ID",
-        "idade": "Idade",
-        "canal_confirmacao": "Canal",
-        "bairro": "Bairro",
-        "antecedencia_dias": "Antecedência (dias)",
-        "faixa_risco": "Faixa de risco",
-        "acao_recomendada": "Ação recomendada",
-        "execucao": "Execução",
-        "risco_no_show": "Risco (0-1)",
-    })
-
-    st.dataframe(fila.head(200), use_container_width=True)
+    # Paginação no servidor: só a página pedida é selecionada/ordenada (top-k)
+    c1, c2, c3, c4 = st.columns([1.2, 1.2, 1.2, 0.8])
+    faixas = c1.multiselect("Faixa", FAIXAS, placeholder="Todas", key="act_fila_faixas")
+    execucoes = c2.multiselect("Execução", list(tmp["execucao"].cat.categories), placeholder="Todas", key="act_fila_execucao")
+    ordem = c3.selectbox("Ordenar por", list(ORDENACOES_FILA), key="act_fila_ordem")
+    por_pagina = c4.selectbox("Linhas por página", [50, 100, 200, 500], index=2, key="act_fila_por_pagina")
+
+    mascara = mascara_fila(tmp, faixas, execucoes)
+    paginas = max(1, -(-int(mascara.sum()) // por_pagina))
+    # A página vive só no session_state (sem value=): o clamp abaixo não
+    # conflita com o valor padrão do widget.
+    st.session_state.setdefault("act_fila_pagina", 1)
+    if st.session_state["act_fila_pagina"] > paginas:
+        st.session_state["act_fila_pagina"] = paginas
+    pagina = st.number_input("Página", min_value=1, max_value=paginas, step=1, key="act_fila_pagina")
+
+    coluna, decrescente = ORDENACOES_FILA[ordem]
+    fila, total = pagina_fila(tmp, int(pagina) - 1, por_pagina, coluna, decrescente, mascara)
+    st.dataframe(fila.rename(columns=COLUNAS_FILA_TELA), use_container_width=True)
+    st.caption(f"Página {int(pagina)} de {paginas} · {total:,} casos no filtro".replace(",", "."))
 
     # Export CSV para operar (muito útil)
-    st.download_button(
-        "Baixar fila completa (CSV)",
-        data=fila.to_csv(index=False).encode("utf-8"),
-        file_name="fila_acao_no_show.csv",
-        mime="text/csv",
-        key="act_download_fila_csv",
-    )
+    _csv_fila(tmp, (chave if chave is not None else id(scored), model_pack.get("versao"), limiar_moderado, limiar_alto, id(regras)))
 
     # ======================
     # 7) Mantém visão de clusters e ROI (como antes, só mais claro)
@@ -209,7 +212,8 @@ def render_act(df):
     st.divider()
     st.markdown("### Onde está a perda (clusters) e quanto recupera (ROI)")
 
-    prio = priorizar_acoes(df)
+    resumo = resumo or ResumoKpis.de_dataframe(df)
+    prio = resumo.priorizar_acoes()
 
     left, right = st.columns([1.2, 1])
 
@@ -224,7 +228,7 @@ def render_act(df):
         pareto = prio.head(12).copy()
         fig = px.bar(pareto, x="cluster", y="perda_estimada", labels={"perda_estimada": "Perda estimada (R$)"})
         fig.update_layout(height=360)
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
 
     st.divider()
     st.markdown("### Simulação final (ROI direto)")
@@ -235,5 +239,5 @@ def render_act(df):
         0, 30, 5, 1,
         key="act_reducao_no_show_roi"
     )
-    impacto = simular_reducao_no_show(df, reducao / 100.0)
+    impacto = resumo.simular_reducao_no_show(reducao / 100.0)
     st.success(f"Receita recuperável estimada: **R$ {impacto:,.0f}**".replace(",", "."))
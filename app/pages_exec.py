@@ -1,15 +1,20 @@
 import streamlit as st
-import plotly.express as px
 
-from utils.kpis import compute_exec_kpis, pipeline_agenda, perda_financeira, simular_reducao_no_show
+from utils.instrumentation import medido, plotly_chart
+from utils.kpis import ResumoKpis
+
+@medido("render_exec_overview")
+def render_exec_overview(df=None, resumo=None):
+    import plotly.express as px
 
-def render_exec_overview(df):
     st.subheader("Executive Overview")
 
+    resumo = resumo or ResumoKpis.de_dataframe(df)
+
     st.caption("Visão rápida para diretoria: taxa de no-show, perda estimada e potencial de recuperação.")
 
-    kpis = compute_exec_kpis(df)
-    fin = perda_financeira(df)
+    kpis = resumo.exec_kpis()
+    fin = resumo.perda_financeira()
 
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Conversão", "N/A (base só tem agendados)")
@@ -24,14 +29,14 @@ def render_exec_overview(df):
     with left:
         st.markdown("### Pipeline de Agenda")
         st.caption("O que olhar: proporção de faltas vs presença. Por quê: no-show = ociosidade + perda direta.")
-        pipe = pipeline_agenda(df)
+        pipe = resumo.pipeline_agenda()
         fig = px.funnel(pipe, x="qtd", y="etapa", orientation="h")
         fig.update_layout(height=360, margin=dict(l=10, r=10, t=20, b=10))
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
 
     with right:
         st.markdown("### Simulador de ROI")
         st.caption("O que olhar: quanto recupera em R$ ao reduzir no-show em X%.")
         reducao = st.slider("Redução de no-show (%)", 0, 30, 5, 1)
-        impacto = simular_reducao_no_show(df, reducao / 100.0)
+        impacto = resumo.simular_reducao_no_show(reducao / 100.0)
         st.success(f"Receita recuperável estimada: **R$ {impacto:,.0f}**".replace(",", "."))
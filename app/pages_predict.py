@@ -1,10 +1,15 @@
 import streamlit as st
-import plotly.express as px
 
-from utils.model import treinar_modelo_no_show, pontuar_risco_no_show
+from utils.instrumentation import medido, plotly_chart
+from utils.model import modelo_e_score
+from utils.model_selection import FOLDS, estado_selecao, iniciar_em_segundo_plano, resumo_resultados
+from utils.rules import top_k
 
 
-def render_predict(df):
+@medido("render_predict")
+def render_predict(df, chave=None, modelo=None):
+    import plotly.express as px
+
     st.subheader("Predict — Risco de No-show")
 
     st.caption(
@@ -14,11 +19,13 @@ def render_predict(df):
 
     colA, colB = st.columns([1.2, 1])
 
+    # Treino + score uma vez por estado de filtro (mover o limiar não re-treina)
+    model_pack, scored = modelo_e_score(df, chave, modelo)
+
     # ======================
     # COLUNA A — Modelo + fatores
     # ======================
     with colA:
-        model_pack = treinar_modelo_no_show(df)
         if model_pack is None:
             st.warning("Sem dados suficientes para treinar modelo.")
             return
@@ -33,6 +40,13 @@ def render_predict(df):
             f"- **Seu AUC: {auc:.3f}** = já útil para ordenar atendimento e focar esforço onde importa"
         )
         st.metric("AUC (validação)", f"{auc:.3f}")
+        if model_pack.get("versao"):
+            st.caption(
+                f"Modelo treinado offline (registro **{model_pack['versao']}**, "
+                f"{model_pack['n_train']:,} agendamentos)".replace(",", ".")
+            )
+
+        _render_selecao()
 
         st.divider()
 
@@ -54,6 +68,8 @@ def render_predict(df):
             # One-hot do bairro/canal
             n = n.replace("canal_confirmacao_", "Canal: ")
             n = n.replace("bairro_", "Bairro: ")
+            # Importância por permutação (gradient boosting) vem por coluna
+            n = n.replace("canal_confirmacao", "Canal").replace("bairro", "Bairro")
 
             # Numéricos
             n = n.replace("idade_60_mais", "Idade 60+ (sim/não)")
@@ -73,7 +89,7 @@ def render_predict(df):
             title="Fatores com maior impacto na previsão de no-show (proxy)",
         )
         fig.update_layout(height=430, margin=dict(l=10, r=10, t=60, b=10))
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
 
         st.info(
             "**O que significa na prática (bem direto):**\n"
@@ -96,7 +112,6 @@ def render_predict(df):
             "- Use isso para **dimensionar esforço** (ex.: quantos ligar hoje / quantos automatizar)."
         )
 
-        scored = pontuar_risco_no_show(df, model_pack)
         if scored is None:
             st.warning("Não foi possível gerar score.")
             return
@@ -109,7 +124,7 @@ def render_predict(df):
             labels={"risco_no_show": "Score de risco de no-show (0 a 1)"},
         )
         fig.update_layout(height=310, margin=dict(l=10, r=10, t=60, b=10))
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
 
         # regra simples de “alto risco” para ficar autoexplicável
         limiar = st.slider(
@@ -131,7 +146,7 @@ def render_predict(df):
             "Sugestão prática: priorize **alto risco** com ligação ou confirmação dupla; risco médio com automação."
         )
 
-        top = scored.sort_values("risco_no_show", ascending=False).head(15)[
+        top = scored.iloc[top_k(scored["risco_no_show"].to_numpy(), 15)][
             ["id_agendamento", "idade", "canal_confirmacao", "bairro", "antecedencia_dias", "risco_no_show"]
         ].rename(columns={
             "id_agendamento": "ID",
@@ -143,3 +158,37 @@ def render_predict(df):
         })
 
         st.dataframe(top, use_container_width=True)
+
+
+def _render_selecao():
+    # A seleção roda num processo separado (pool com todos os núcleos); a
+    # aba só dispara e lê o progresso de models/no_show/selecao.json
+    with st.expander("Seleção de modelos (validação cruzada)"):
+        st.caption(
+            f"Compara regressão logística e gradient boosting em {FOLDS} folds, em paralelo, "
+            "e promove o de maior AUC médio. Roda em segundo plano: a aba continua usável."
+        )
+        status = estado_selecao()
+
+        if st.button("Rodar seleção de modelos", key="predict_selecao"):
+            if iniciar_em_segundo_plano() is None:
+                st.info("Já existe uma seleção rodando.")
+            status = estado_selecao()
+
+        if not status:
+            return
+
+        estado = status.get("estado")
+        if estado in ("iniciando", "rodando"):
+            total = status.get("total") or 0
+            feitos = status.get("feitos", 0)
+            st.progress(feitos / total if total else 0.0, text=f"{feitos} de {total or '?'} folds avaliados")
+            st.caption("Recarregue a página para atualizar o progresso.")
+        elif estado == "concluido":
+            st.success(f"Melhor candidato: **{status['melhor']}** (registrado como {status['versao']}).")
+        elif estado == "erro":
+            st.error(f"A seleção falhou: {status.get('erro')}")
+
+        resumo = resumo_resultados(status.get("resultados", []))
+        if len(resumo):
+            st.dataframe(resumo, use_container_width=True, hide_index=True)
@@ -1,11 +1,16 @@
 import streamlit as st
-import plotly.express as px
 
-from utils.kpis import no_show_por, impacto_antecedencia, comparecimento_por
+from utils.instrumentation import medido, plotly_chart
+from utils.kpis import ResumoKpis
+
+@medido("render_reveal")
+def render_reveal(df=None, resumo=None):
+    import plotly.express as px
 
-def render_reveal(df):
     st.subheader("Reveal — Diagnóstico")
 
+    resumo = resumo or ResumoKpis.de_dataframe(df)
+
     st.caption("Aqui a pergunta é: onde está o no-show e quais padrões explicam o problema.")
 
     a, b = st.columns(2)
@@ -16,7 +21,7 @@ def render_reveal(df):
             "Métrica: **No-show (%)**. "
             "Canal de confirmação aqui é **SMS vs Sem SMS** (proxy do Kaggle)."
         )
-        ns = no_show_por(df, "canal_confirmacao")
+        ns = resumo.no_show_por("canal_confirmacao")
         fig = px.bar(
             ns,
             x="canal_confirmacao",
@@ -33,7 +38,7 @@ def render_reveal(df):
             hovertemplate="Canal: %{x}<br>No-show: %{y:.1%}<extra></extra>",
         )
         fig.update_layout(height=330, yaxis_tickformat=".0%")
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
 
     with b:
         st.markdown("### No-show por bairro (Top 12)")
@@ -41,7 +46,7 @@ def render_reveal(df):
             "Métrica: **No-show (%)**. "
             "O que olhar: bairros com maior taxa e maior volume para priorização operacional."
         )
-        ns_b = no_show_por(df, "bairro").head(12)
+        ns_b = resumo.no_show_por("bairro").head(12)
         fig = px.bar(
             ns_b,
             x="bairro",
@@ -58,7 +63,7 @@ def render_reveal(df):
             hovertemplate="Bairro: %{x}<br>No-show: %{y:.1%}<extra></extra>",
         )
         fig.update_layout(height=330, yaxis_tickformat=".0%")
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
 
     st.divider()
 
@@ -71,7 +76,7 @@ def render_reveal(df):
             "Métrica: **No-show (%)**. "
             "O que olhar: se marcar com muita antecedência aumenta o risco de falta."
         )
-        da = impacto_antecedencia(df)
+        da = resumo.impacto_antecedencia()
 
         fig = px.line(
             da,
@@ -87,7 +92,7 @@ def render_reveal(df):
             hovertemplate="Antecedência: %{x} dias<br>No-show: %{y:.1%}<extra></extra>"
         )
         fig.update_layout(height=330, yaxis_tickformat=".0%")
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
 
         st.info(
             "Se o no-show subir nas faixas **15–30** e **30+ dias**, isso sugere ação simples: "
@@ -100,9 +105,7 @@ def render_reveal(df):
             "Métrica: **Comparecimento (%)**. "
             "O que olhar: diferença de comportamento em **60+ vs <60** para personalizar a comunicação."
         )
-        tmp = df.copy()
-        tmp["faixa_idade"] = tmp["idade"].apply(lambda x: "60+" if x >= 60 else "<60")
-        att = comparecimento_por(tmp, "faixa_idade")
+        att = resumo.comparecimento_por("faixa_idade")
 
         fig = px.bar(
             att,
@@ -120,4 +123,4 @@ def render_reveal(df):
             hovertemplate="Faixa: %{x}<br>Comparecimento: %{y:.1%}<extra></extra>",
         )
         fig.update_layout(height=330, yaxis_tickformat=".0%")
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
@@ -1,6 +1,6 @@
 -- Schema base para quando você quiser plugar SQL de verdade
 
-CREATE TABLE appointments (
+CREATE TABLE IF NOT EXISTS appointments (
     lead_id            INT PRIMARY KEY,
     created_date       DATE NOT NULL,
     appointment_date   DATE NULL,
@@ -22,3 +22,32 @@ CREATE TABLE appointments (
 
     price              DECIMAL(10,2)
 );
+
+-- Base normalizada (mesmas colunas de utils.data_loader._normalizar),
+-- lida pelo backend SQL do dashboard (utils.backend). Datas em ISO (YYYY-MM-DD).
+CREATE TABLE IF NOT EXISTS agendamentos (
+    id_agendamento        BIGINT PRIMARY KEY,
+    data_agendamento      DATE,
+    data_consulta         DATE,
+
+    idade                 SMALLINT,
+    idade_60_mais         SMALLINT,
+
+    canal_confirmacao     VARCHAR(50),
+    bairro                VARCHAR(100),
+    especialidade         VARCHAR(100),
+
+    antecedencia_minutos  INT,
+    antecedencia_dias     SMALLINT,
+
+    agendado              SMALLINT,
+    faltou                SMALLINT,
+    compareceu            SMALLINT,
+
+    valor_medio           DECIMAL(10,2)
+);
+
+-- Filtros da sidebar: período sempre, canal/bairro combinados com período
+CREATE INDEX IF NOT EXISTS ix_agendamentos_data ON agendamentos (data_agendamento);
+CREATE INDEX IF NOT EXISTS ix_agendamentos_canal_data ON agendamentos (canal_confirmacao, data_agendamento);
+CREATE INDEX IF NOT EXISTS ix_agendamentos_bairro_data ON agendamentos (bairro, data_agendamento);
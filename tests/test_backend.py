@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from utils.backend import TABELA, BackendSQL, verificar_paridade
+from utils.data_generator import gravar_sintetico
+from utils.data_loader import load_data
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    # load_data resolve data/raw/ relativo ao cwd: base sintética pequena
+    # (formato do Kaggle) numa pasta temporária
+    monkeypatch.chdir(tmp_path)
+    gravar_sintetico(3000, os.path.join("data", "raw", "noshowappointments.csv"), seed=7, dias=60)
+    return load_data()
+
+
+def test_sqlite_kpis_iguais_ao_pandas(base, tmp_path):
+    backend = BackendSQL.sqlite(str(tmp_path / "genesis.sqlite"))
+    backend.carregar(base)
+    assert verificar_paridade(backend, base, n=15) == []
+
+
+def test_duckdb_kpis_iguais_ao_pandas(base):
+    pytest.importorskip("duckdb")
+    backend = BackendSQL.duckdb()
+    assert verificar_paridade(backend, base, n=15) == []
+
+
+def test_duckdb_uma_conexao_por_versao(base):
+    duckdb = pytest.importorskip("duckdb")
+    backend = BackendSQL.duckdb()
+    backend.sincronizar(backend.versao_origem())
+
+    backend.contar()
+    conexao = backend._conexao
+    backend.resumo()
+    backend.filtrar()
+    assert backend._conexao is conexao
+
+    # Mesma versão: segue a mesma conexão; outra versão: reabre
+    assert not backend.sincronizar(backend.versao_origem())
+    assert backend._conexao is conexao
+    assert backend.sincronizar("outra-versao")
+    assert backend.contar() == len(base)
+    assert backend._conexao is not conexao
+    with pytest.raises(duckdb.ConnectionException):
+        conexao.execute("SELECT 1")
+
+
+def test_duckdb_fecha_conexao_trocada_apos_cursores(base):
+    duckdb = pytest.importorskip("duckdb")
+    backend = BackendSQL.duckdb()
+    backend.contar()
+    conexao = backend._conexao
+
+    # Troca de versão com uma consulta em andamento: a conexão antiga segue
+    # aberta até o cursor terminar e só então é fechada
+    with backend._cursor() as cur:
+        backend.limpar()
+        assert cur.execute(f"SELECT COUNT(*) FROM {TABELA}").fetchone()[0] == len(base)
+        conexao.execute("SELECT 1")
+    with pytest.raises(duckdb.ConnectionException):
+        conexao.execute("SELECT 1")
+    assert backend.contar() == len(base)
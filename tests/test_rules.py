@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.rules import COLUNAS_FILA, aplicar_regras, faixa_risco, pagina_fila, top_k
+
+
+# Regras linha a linha da aba Act original (referência)
+def _faixa_baseline(r, limiar_moderado, limiar_alto):
+    if r >= limiar_alto:
+        return "ALTO"
+    elif r >= limiar_moderado:
+        return "MODERADO"
+    return "BAIXO"
+
+
+def _acao_baseline(risco, idade_60_mais, limiar_moderado, limiar_alto):
+    if risco >= limiar_alto:
+        if int(idade_60_mais) == 1:
+            return "Ligar (manual) — confirmação ativa"
+        return "WhatsApp + SMS (bot) — confirmação dupla"
+    if risco >= limiar_moderado:
+        return "WhatsApp (bot) + SMS padrão — confirmar"
+    return "SMS padrão — lembrete"
+
+
+def _fila(n=500, seed=0):
+    # Riscos arredondados (muitos empates), alguns NaN e exatamente nos limites
+    rng = np.random.default_rng(seed)
+    risco = np.round(rng.random(n), 2)
+    risco[rng.choice(n, 20, replace=False)] = np.nan
+    risco[:6] = [0.55, 0.75, 0.40, 0.60, 0.90, 0.30]
+    return pd.DataFrame({
+        "id_agendamento": np.arange(n),
+        "idade": rng.integers(0, 100, n),
+        "idade_60_mais": rng.integers(0, 2, n),
+        "canal_confirmacao": pd.Categorical(rng.choice(["SMS", "Sem SMS"], n)),
+        "bairro": pd.Categorical(rng.choice(["CENTRO", "PRAIA DO CANTO", "JABOUR"], n)),
+        "antecedencia_dias": rng.integers(0, 60, n),
+        "risco_no_show": risco,
+    })
+
+
+@pytest.mark.parametrize("limiar_moderado, limiar_alto", [(0.55, 0.75), (0.40, 0.60), (0.75, 0.55), (0.60, 0.60)])
+def test_faixa_risco_igual_ao_baseline(limiar_moderado, limiar_alto):
+    risco = _fila()["risco_no_show"].to_numpy()
+    alto = max(limiar_alto, limiar_moderado)
+    esperado = [_faixa_baseline(r, limiar_moderado, alto) for r in risco]
+
+    faixas = faixa_risco(risco, limiar_moderado, limiar_alto)
+    assert list(faixas.categories) == ["ALTO", "MODERADO", "BAIXO"]
+    assert faixas.astype(str).tolist() == esperado
+
+
+@pytest.mark.parametrize("limiar_moderado, limiar_alto", [(0.55, 0.75), (0.40, 0.60), (0.75, 0.55), (0.60, 0.60)])
+def test_aplicar_regras_igual_ao_baseline(limiar_moderado, limiar_alto):
+    scored = _fila()
+    out = aplicar_regras(scored, limiar_moderado, limiar_alto)
+
+    # A aba Act original corrigia alto < moderado antes de rotular
+    alto = max(limiar_alto, limiar_moderado)
+    faixa = [_faixa_baseline(r, limiar_moderado, alto) for r in scored["risco_no_show"]]
+    acao = [
+        _acao_baseline(r, i, limiar_moderado, alto)
+        for r, i in zip(scored["risco_no_show"], scored["idade_60_mais"])
+    ]
+    execucao = ["Manual (analista)" if "Ligar" in a else "Automático (bot)" for a in acao]
+
+    assert out["faixa_risco"].astype(str).tolist() == faixa
+    assert out["acao_recomendada"].astype(str).tolist() == acao
+    assert out["execucao"].astype(str).tolist() == execucao
+    assert (out.loc[scored["risco_no_show"].isna(), "faixa_risco"] == "BAIXO").all()
+
+
+@pytest.mark.parametrize("maior", [True, False])
+@pytest.mark.parametrize("seed", range(20))
+def test_top_k_igual_ao_sort_estavel(seed, maior):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 60))
+    # Poucos valores distintos: empates caem no limite do k
+    valores = rng.integers(0, 5, n).astype(float)
+    valores[rng.random(n) < 0.2] = np.nan
+    ordem = pd.Series(valores).sort_values(ascending=not maior, kind="stable", na_position="last").index.to_numpy()
+
+    for k in range(0, n + 2):
+        assert top_k(valores, k, maior=maior).tolist() == ordem[:k].tolist()
+
+
+def test_pagina_fila_limites():
+    tmp = aplicar_regras(_fila(n=450), 0.55, 0.75)
+    ordem = tmp.sort_values("risco_no_show", ascending=False, kind="stable", na_position="last")[COLUNAS_FILA]
+
+    paginas = [pagina_fila(tmp, p, por_pagina=200) for p in range(3)]
+    assert [len(p) for p, _ in paginas] == [200, 200, 50]
+    assert all(total == 450 for _, total in paginas)
+    pd.testing.assert_frame_equal(pd.concat([p for p, _ in paginas]), ordem)
+
+    # Página além do fim: vazia, com o total e as colunas da fila
+    vazia, total = pagina_fila(tmp, 3, por_pagina=200)
+    assert vazia.empty and total == 450 and list(vazia.columns) == COLUNAS_FILA
+    pd.testing.assert_frame_equal(pagina_fila(tmp, -1, por_pagina=200)[0], paginas[0][0])
+
+
+def test_pagina_fila_com_mascara_e_ordem_crescente():
+    tmp = aplicar_regras(_fila(n=300, seed=1), 0.55, 0.75)
+    mascara = (tmp["faixa_risco"] != "BAIXO").to_numpy()
+    filtrada = tmp[mascara]
+    ordem = filtrada.sort_values("antecedencia_dias", kind="stable")[COLUNAS_FILA]
+
+    por_pagina = 25
+    paginas, p = [], 0
+    while True:
+        pagina, total = pagina_fila(tmp, p, por_pagina, "antecedencia_dias", decrescente=False, mascara=mascara)
+        assert total == len(filtrada)
+        if pagina.empty:
+            break
+        paginas.append(pagina)
+        p += 1
+    assert p == -(-len(filtrada) // por_pagina)
+    pd.testing.assert_frame_equal(pd.concat(paginas), ordem)
@@ -0,0 +1,162 @@
+import argparse
+import os
+import re
+import shutil
+import sys
+import time
+import unicodedata
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.rules import COLUNAS_FILA, LIMIAR_ALTO, LIMIAR_MODERADO, aplicar_regras, carregar_regras
+
+
+# Fila de ação sem navegador: agendamentos dos próximos dias pontuados em
+# lotes, com faixa/ação do playbook, um arquivo por unidade (bairro) ordenado
+# por risco. Feito para rodar no cron antes do call center abrir.
+LOTE = 50_000
+DIAS = 7
+SAIDA = "filas"
+COLUNAS_SAIDA = ["data_consulta"] + COLUNAS_FILA
+
+
+def _slug(nome: str) -> str:
+    s = unicodedata.normalize("NFKD", str(nome)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "_", s.lower()).strip("_") or "sem_unidade"
+
+
+def proximos_agendamentos(df: pd.DataFrame, inicio: date, dias: int = DIAS) -> pd.DataFrame:
+    """
+    Agendamentos com consulta em [inicio, inicio + dias).
+    """
+
+    ini = pd.Timestamp(inicio)
+    fim = ini + pd.Timedelta(days=dias)
+    consulta = df["data_consulta"]
+    return df[(df["agendado"] == 1) & (consulta >= ini) & (consulta < fim)]
+
+
+def modelo_para_fila(df: pd.DataFrame) -> dict | None:
+    """
+    Modelo promovido no registro; sem registro, treina na base histórica
+    (como as abas fazem sem modelo offline).
+    """
+
+    from utils.model import treinar_modelo_no_show
+    from utils.model_registry import carregar_modelo
+
+    model_pack = carregar_modelo()
+    if model_pack is None:
+        print("Nenhum modelo promovido: treinando na base histórica.", file=sys.stderr)
+        model_pack = treinar_modelo_no_show(df)
+    return model_pack
+
+
+def pontuar_em_lotes(base: pd.DataFrame, model_pack: dict, limiar_moderado: float, limiar_alto: float,
+                     regras=None, lote: int = LOTE):
+    """
+    Gera a fila (COLUNAS_SAIDA, com faixa e ação) de `base` em lotes de até
+    `lote` linhas: o modelo nunca transforma a base inteira de uma vez.
+    """
+
+    from utils.model import pontuar_risco_no_show
+
+    regras = regras or carregar_regras()
+    for i in range(0, len(base), lote):
+        scored = pontuar_risco_no_show(base.iloc[i:i + lote], model_pack)
+        if scored is None or scored.empty:
+            continue
+        yield aplicar_regras(scored, limiar_moderado, limiar_alto, regras)[COLUNAS_SAIDA]
+
+
+def _gravar(fila: pd.DataFrame, path: str, formato: str) -> None:
+    if formato == "parquet":
+        fila.to_parquet(path, index=False)
+    else:
+        fila.to_csv(path, index=False, encoding="utf-8")
+
+
+def gerar_filas(destino: str, inicio: date, dias: int = DIAS, limiar_moderado: float = LIMIAR_MODERADO,
+                limiar_alto: float = LIMIAR_ALTO, formato: str = "csv", lote: int = LOTE) -> pd.DataFrame:
+    """
+    Grava `<destino>/fila-<inicio>/<unidade>.<formato>` (um arquivo por
+    bairro, maior risco primeiro) e retorna o resumo por unidade × faixa.
+    A pasta é montada num diretório temporário e renomeada no fim: quem lê
+    às 6h nunca pega uma fila pela metade.
+    """
+
+    from utils.data_loader import load_data
+
+    df = load_data()
+    base = proximos_agendamentos(df, inicio, dias)
+    model_pack = modelo_para_fila(df) if len(base) else None
+    regras = carregar_regras()
+
+    final = os.path.join(destino, f"fila-{inicio.isoformat()}")
+    tmp = f"{final}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    resumos = []
+    if model_pack is not None and len(base):
+        # Uma unidade por vez: memória limitada à maior unidade, não ao dia inteiro
+        codigos = np.asarray(base["bairro"].array.codes)
+        for codigo in np.unique(codigos):
+            unidade = base["bairro"].cat.categories[codigo]
+            partes = list(pontuar_em_lotes(base[codigos == codigo], model_pack, limiar_moderado, limiar_alto, regras, lote))
+            if not partes:
+                continue
+            fila = pd.concat(partes).sort_values("risco_no_show", ascending=False)
+            _gravar(fila, os.path.join(tmp, f"{_slug(unidade)}.{formato}"), formato)
+            resumos.append(
+                fila.groupby(["faixa_risco", "execucao"], observed=True).size().rename("casos").reset_index().assign(bairro=unidade)
+            )
+
+    if os.path.exists(final):
+        shutil.rmtree(final)
+    os.replace(tmp, final)
+
+    if not resumos:
+        return pd.DataFrame(columns=["bairro", "faixa_risco", "execucao", "casos"])
+    return pd.concat(resumos, ignore_index=True)[["bairro", "faixa_risco", "execucao", "casos"]]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.action_queue",
+        description="Gera a fila de ação diária (um arquivo por unidade) sem abrir o dashboard.",
+    )
+    parser.add_argument("--inicio", type=date.fromisoformat, default=date.today(),
+                        help="primeiro dia de consulta (AAAA-MM-DD, padrão: hoje)")
+    parser.add_argument("--dias", type=int, default=DIAS, help="quantos dias de consultas a partir do início")
+    parser.add_argument("--saida", default=SAIDA, help="pasta onde fica fila-<inicio>/")
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--limiar-moderado", type=float, default=LIMIAR_MODERADO)
+    parser.add_argument("--limiar-alto", type=float, default=LIMIAR_ALTO)
+    parser.add_argument("--lote", type=int, default=LOTE, help="linhas pontuadas por vez")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    resumo = gerar_filas(
+        args.saida, args.inicio, args.dias, args.limiar_moderado, args.limiar_alto, args.formato, args.lote
+    )
+    fim = args.inicio + timedelta(days=args.dias - 1)
+    pasta = os.path.join(args.saida, f"fila-{args.inicio.isoformat()}")
+
+    if resumo.empty:
+        print(f"Nenhum agendamento entre {args.inicio} e {fim}: {pasta} ficou vazia.")
+        return 0
+
+    total = resumo.pivot_table(index="faixa_risco", columns="execucao", values="casos", aggfunc="sum", observed=True, fill_value=0)
+    print(total.to_string())
+    print(
+        f"\n{int(resumo['casos'].sum()):,} agendamentos ({args.inicio} a {fim}) em ".replace(",", ".")
+        + f"{resumo['bairro'].nunique()} unidades -> {pasta} ({time.perf_counter() - t0:.1f} s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,546 @@
+import argparse
+import importlib
+import os
+import threading
+from contextlib import closing, contextmanager
+
+import pandas as pd
+
+from utils.data_loader import CANAIS, CATEGORICAS, _ajustar_tipos, alinhar_categorias, arquivos_cache, load_data, versao_dados
+from utils.instrumentation import medido
+from utils.kpis import (
+    DIMENSOES,
+    FAIXAS_ANTECEDENCIA,
+    FAIXAS_ANTECEDENCIA_BINS,
+    FAIXAS_IDADE,
+    ResumoKpis,
+)
+from utils.lru import CacheLRU
+
+
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Origem dos dados do dashboard:
+# - "arquivo": CSV/Parquet carregado em memória (padrão)
+# - "sqlite":  tabela `agendamentos` num arquivo SQLite local
+# - "dbapi":   qualquer driver DB-API; GENESIS_SQL_CONECTAR="modulo:funcao"
+#              aponta a função que abre a conexão
+# - "duckdb":  DuckDB embarcado direto sobre o cache Parquet (colunar,
+#              multi-thread), sem carregar a base no pandas
+BACKEND = os.environ.get("GENESIS_BACKEND", "arquivo")
+SQLITE_PATH = os.environ.get("GENESIS_SQLITE_PATH", os.path.join(_RAIZ, "data", "genesis.sqlite"))
+SQL_CONECTAR = os.environ.get("GENESIS_SQL_CONECTAR")
+SQL_PARAMSTYLE = os.environ.get("GENESIS_SQL_PARAMSTYLE", "format")
+DUCKDB_THREADS = int(os.environ.get("GENESIS_DUCKDB_THREADS", "0"))  # 0 = padrão do DuckDB (todos os núcleos)
+
+SCHEMA_SQL = os.path.join(_RAIZ, "sql", "schema.sql")
+TABELA = "agendamentos"
+
+COLUNAS = [
+    "id_agendamento", "data_agendamento", "data_consulta", "idade", "idade_60_mais",
+    "canal_confirmacao", "bairro", "especialidade", "antecedencia_minutos", "antecedencia_dias",
+    "agendado", "faltou", "compareceu", "valor_medio",
+]
+COLUNAS_DATA = ["data_agendamento", "data_consulta"]
+
+# Tipos da base normalizada (os mesmos de `_normalizar`)
+TIPOS = {
+    "id_agendamento": "int64",
+    "idade": "int16",
+    "idade_60_mais": "int8",
+    "antecedencia_minutos": "int32",
+    "antecedencia_dias": "int16",
+    "agendado": "int8",
+    "faltou": "int8",
+    "compareceu": "int8",
+    "valor_medio": "float32",
+}
+
+MEDIDAS_SQL = [
+    ("n", "COUNT(id_agendamento)"),
+    ("agendado", "SUM(agendado)"),
+    ("faltou", "SUM(faltou)"),
+    ("compareceu", "SUM(compareceu)"),
+    ("valor_soma", "SUM(valor_medio)"),
+    ("valor_n", "COUNT(valor_medio)"),
+    ("antecedencia_soma", "SUM(antecedencia_dias)"),
+    ("antecedencia_n", "COUNT(antecedencia_dias)"),
+]
+
+PLACEHOLDERS = {"qmark": "?", "format": "%s", "pyformat": "%s"}
+CACHE_LINHAS_MAX = 4
+
+
+def _expr_faixa_antecedencia() -> str:
+    # Mesmos intervalos de pd.cut (fechados à direita) em CASE portável
+    bins = FAIXAS_ANTECEDENCIA_BINS
+    casos = [f"WHEN antecedencia_dias <= {bins[0]} THEN NULL"]
+    casos += [f"WHEN antecedencia_dias <= {b} THEN '{rotulo}'" for b, rotulo in zip(bins[1:], FAIXAS_ANTECEDENCIA)]
+    return "CASE " + " ".join(casos) + " END"
+
+
+def _expr_faixa_idade() -> str:
+    return f"CASE WHEN idade >= 60 THEN '{FAIXAS_IDADE[0]}' ELSE '{FAIXAS_IDADE[1]}' END"
+
+
+EXPRESSOES = {
+    "faixa_antecedencia": _expr_faixa_antecedencia(),
+    "faixa_idade": _expr_faixa_idade(),
+}
+
+
+def _data_iso(valor) -> str:
+    return pd.Timestamp(valor).strftime("%Y-%m-%d")
+
+
+def sql_where(inicio=None, fim=None, canais=None, bairros=None, ph: str = "?") -> tuple[str, list]:
+    """
+    Cláusula WHERE (com parâmetros) dos filtros da sidebar — mesma semântica
+    de IndiceFiltros: período inclusivo, listas vazias = todos.
+    """
+
+    condicoes, params = [], []
+    if inicio is not None:
+        condicoes.append(f"data_agendamento >= {ph}")
+        params.append(_data_iso(inicio))
+    if fim is not None:
+        condicoes.append(f"data_agendamento <= {ph}")
+        params.append(_data_iso(fim))
+    for col, valores in (("canal_confirmacao", canais), ("bairro", bairros)):
+        if valores:
+            condicoes.append(f"{col} IN ({', '.join([ph] * len(valores))})")
+            params.extend(str(v) for v in valores)
+
+    return ("WHERE " + " AND ".join(condicoes)) if condicoes else "", params
+
+
+def sql_celulas(dims: list[str] | None = None, tabela: str = TABELA, ph: str = "?", **filtros) -> tuple[str, list]:
+    """
+    GROUP BY que devolve as mesmas células de `utils.kpis.celulas_kpi`:
+    a agregação roda no banco e só as células trafegam.
+    """
+
+    dims = DIMENSOES if dims is None else dims
+    where, params = sql_where(ph=ph, **filtros)
+
+    exprs = [EXPRESSOES.get(d, d) for d in dims]
+    select = [f"{e} AS {d}" for e, d in zip(exprs, dims)] + [f"{e} AS {nome}" for nome, e in MEDIDAS_SQL]
+    sql = f"SELECT {', '.join(select)} FROM {tabela} {where}"
+    if dims:
+        sql += f" GROUP BY {', '.join(exprs)}"
+    return sql, params
+
+
+def sql_linhas(colunas: list[str] | None = None, tabela: str = TABELA, ph: str = "?", **filtros) -> tuple[str, list]:
+    where, params = sql_where(ph=ph, **filtros)
+    return f"SELECT {', '.join(colunas or COLUNAS)} FROM {tabela} {where} ORDER BY data_agendamento, id_agendamento", params
+
+
+def tipar_celulas(celulas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte o resultado do GROUP BY para os tipos de `celulas_kpi`
+    (categóricas nas dimensões, int64/float64 nas medidas).
+    """
+
+    out = celulas.copy()
+    for c in ["n", "agendado", "faltou", "compareceu", "valor_n", "antecedencia_n"]:
+        out[c] = pd.to_numeric(out[c]).fillna(0).astype("int64")
+    for c in ["valor_soma", "antecedencia_soma"]:
+        out[c] = pd.to_numeric(out[c]).fillna(0).astype("float64")
+
+    if "data_agendamento" in out.columns:
+        out["data_agendamento"] = pd.to_datetime(out["data_agendamento"])
+    if "canal_confirmacao" in out.columns:
+        out["canal_confirmacao"] = pd.Categorical(out["canal_confirmacao"], categories=CANAIS)
+    if "bairro" in out.columns:
+        out["bairro"] = pd.Categorical(out["bairro"], categories=sorted(out["bairro"].dropna().unique()))
+    if "faixa_antecedencia" in out.columns:
+        out["faixa_antecedencia"] = pd.Categorical(out["faixa_antecedencia"], categories=FAIXAS_ANTECEDENCIA, ordered=True)
+    if "faixa_idade" in out.columns:
+        out["faixa_idade"] = pd.Categorical(out["faixa_idade"], categories=FAIXAS_IDADE)
+    return out
+
+
+def tipar_linhas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Linhas lidas do banco com os tipos compactos da base normalizada.
+    """
+
+    out = df.copy()
+    for c in COLUNAS_DATA:
+        if c in out.columns:
+            out[c] = pd.to_datetime(out[c])
+    for c, tipo in TIPOS.items():
+        if c in out.columns:
+            out[c] = pd.to_numeric(out[c]).astype(tipo)
+    for c in CATEGORICAS:
+        if c in out.columns:
+            out[c] = out[c].astype(str).astype("category")
+    if all(c in out.columns for c in CATEGORICAS):
+        out = _ajustar_tipos(out)
+    return out
+
+
+def _resultado(cur, sql: str, params) -> pd.DataFrame:
+    cur.execute(sql, list(params))
+    if hasattr(cur, "fetchdf"):
+        # DuckDB entrega o resultado colunar direto em pandas
+        return cur.fetchdf()
+    colunas = [d[0] for d in cur.description]
+    return pd.DataFrame.from_records(cur.fetchall(), columns=colunas)
+
+
+class BackendSQL:
+    """
+    Base normalizada numa tabela SQL (`agendamentos`, ver sql/schema.sql).
+
+    Tem a interface do índice de filtros (`periodo`, `valores`, `filtrar`) e
+    do cubo (`resumo`): os KPIs saem de um GROUP BY com os filtros no WHERE
+    (índices por data/canal/bairro) e só as linhas do recorte, quando
+    pedidas, trafegam para o pandas.
+
+    `conectar` abre uma conexão DB-API nova a cada consulta (conexões
+    SQLite não podem ser compartilhadas entre as threads do Streamlit).
+    Com `compartilhar` (DuckDB), uma conexão só é aberta por versão dos
+    dados e cada consulta usa um cursor próprio dela.
+    `versionar` devolve uma versão barata da origem (sem consulta); sem ele,
+    vale a `versao()` do banco.
+    """
+
+    def __init__(self, conectar, paramstyle: str = "qmark", descricao: str = "sql", tabela: str = TABELA,
+                 versionar=None, compartilhar: bool = False):
+        if paramstyle not in PLACEHOLDERS:
+            raise ValueError(f"paramstyle não suportado: {paramstyle!r}. Use um de {sorted(PLACEHOLDERS)}.")
+        self._conectar = conectar
+        self._versionar = versionar
+        self._compartilhar = compartilhar
+        self._conexao = None
+        # Cursores abertos por conexão compartilhada (id -> quantidade): a
+        # conexão trocada por `limpar` só é fechada quando o último termina
+        self._cursores = {}
+        self.ph = PLACEHOLDERS[paramstyle]
+        self.descricao = descricao
+        self.tabela = tabela
+        self._linhas = CacheLRU(CACHE_LINHAS_MAX)
+        # Última versão da origem vista por `sincronizar`
+        self.versao_vista = None
+        self._trava = threading.RLock()
+
+    @classmethod
+    def sqlite(cls, path: str = SQLITE_PATH) -> "BackendSQL":
+        import sqlite3
+
+        return cls(lambda: sqlite3.connect(path), "qmark", descricao=f"sqlite:{os.path.abspath(path)}",
+                   versionar=lambda: _versao_arquivos([path, f"{path}-wal"]))
+
+    @classmethod
+    def duckdb(cls, arquivos: list[str] | None = None, threads: int = DUCKDB_THREADS) -> "BackendSQL":
+        """
+        DuckDB em memória com a view `agendamentos` sobre os arquivos Parquet
+        do cache (padrão: base + partes incrementais atuais). A conexão é
+        aberta uma vez e refeita quando `sincronizar` vê outra versão dos
+        dados. Mesmo SQL do backend relacional.
+        """
+
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("GENESIS_BACKEND=duckdb requer o pacote duckdb (pip install duckdb).") from e
+
+        def conectar():
+            lista = arquivos or arquivos_cache()
+            con = duckdb.connect()
+            if threads:
+                con.execute(f"SET threads = {int(threads)}")
+            caminhos = ", ".join("'" + p.replace("'", "''") + "'" for p in lista)
+            con.execute(f"CREATE VIEW {TABELA} AS SELECT * FROM read_parquet([{caminhos}])")
+            return con
+
+        origem = os.path.dirname(arquivos[0]) if arquivos else "cache"
+        versionar = (lambda: _versao_arquivos(arquivos)) if arquivos else versao_dados
+        return cls(conectar, "qmark", descricao=f"duckdb:{origem}", versionar=versionar, compartilhar=True)
+
+    @contextmanager
+    def _cursor(self):
+        # Cursor de DuckDB é uma conexão própria sobre o mesmo banco (segura
+        # por thread); fechá-lo não fecha a conexão compartilhada
+        with self._trava:
+            if self._conexao is None:
+                self._conexao = self._conectar()
+            con = self._conexao
+            cur = con.cursor()
+            self._cursores[id(con)] = self._cursores.get(id(con), 0) + 1
+        try:
+            yield cur
+        finally:
+            cur.close()
+            with self._trava:
+                self._cursores[id(con)] -= 1
+                if not self._cursores[id(con)]:
+                    del self._cursores[id(con)]
+                    if con is not self._conexao:
+                        con.close()
+
+    def consultar(self, sql: str, params=()) -> pd.DataFrame:
+        if self._compartilhar:
+            with self._cursor() as cur:
+                return _resultado(cur, sql, params)
+        with closing(self._conectar()) as con:
+            return _resultado(con.cursor(), sql, params)
+
+    def criar_schema(self) -> None:
+        with open(SCHEMA_SQL, "r", encoding="utf-8") as f:
+            script = f.read()
+
+        comandos = [c.strip() for c in script.split(";")]
+        with closing(self._conectar()) as con:
+            cur = con.cursor()
+            for c in comandos:
+                if any(l.strip() and not l.strip().startswith("--") for l in c.splitlines()):
+                    cur.execute(c)
+            con.commit()
+
+    def carregar(self, df: pd.DataFrame, substituir: bool = True, bloco: int = 100_000) -> int:
+        """
+        Grava a base normalizada em `agendamentos` (em blocos). Uso local /
+        testes: em produção a tabela é mantida pelo warehouse.
+        """
+
+        self.criar_schema()
+        sql = f"INSERT INTO {self.tabela} ({', '.join(COLUNAS)}) VALUES ({', '.join([self.ph] * len(COLUNAS))})"
+
+        with closing(self._conectar()) as con:
+            cur = con.cursor()
+            if substituir:
+                cur.execute(f"DELETE FROM {self.tabela}")
+            for i in range(0, len(df), bloco):
+                parte = df.iloc[i:i + bloco]
+                colunas = []
+                for c in COLUNAS:
+                    s = parte[c]
+                    if c in COLUNAS_DATA:
+                        s = s.dt.strftime("%Y-%m-%d")
+                    elif c in CATEGORICAS:
+                        s = s.astype(str)
+                    colunas.append(s.astype(object).where(s.notna(), None).tolist())
+                cur.executemany(sql, list(zip(*colunas)))
+            con.commit()
+
+        self._linhas.clear()
+        return len(df)
+
+    def versao(self) -> str:
+        v = self.consultar(f"SELECT COUNT(*) AS n, MAX(id_agendamento) AS max_id FROM {self.tabela}")
+        return f"{self.descricao}:{int(v['n'].iloc[0])}:{v['max_id'].iloc[0]}"
+
+    def versao_origem(self) -> str:
+        """
+        Versão da origem para invalidar caches: `stat` do arquivo SQLite,
+        versão do cache Parquet no DuckDB; no DB-API genérico, `versao()`.
+        """
+
+        return self._versionar() if self._versionar else self.versao()
+
+    def sincronizar(self, versao: str) -> bool:
+        """
+        Registra a versão da origem vista agora. Se mudou desde a anterior,
+        descarta os recortes em memória e retorna True.
+        """
+
+        with self._trava:
+            mudou = self.versao_vista is not None and self.versao_vista != versao
+            if mudou:
+                self.limpar()
+            self.versao_vista = versao
+        return mudou
+
+    def contar(self) -> int:
+        return int(self.consultar(f"SELECT COUNT(*) AS n FROM {self.tabela}")["n"].iloc[0])
+
+    def periodo(self) -> tuple:
+        p = self.consultar(f"SELECT MIN(data_agendamento) AS ini, MAX(data_agendamento) AS fim FROM {self.tabela}")
+        return pd.Timestamp(p["ini"].iloc[0]), pd.Timestamp(p["fim"].iloc[0])
+
+    def valores(self, col: str) -> list:
+        """Valores presentes na base (opções do filtro), em ordem alfabética."""
+        v = self.consultar(f"SELECT DISTINCT {col} AS v FROM {self.tabela} WHERE {col} IS NOT NULL")
+        return sorted(v["v"].astype(str))
+
+    def celulas(self, inicio=None, fim=None, canais=None, bairros=None, dims: list[str] | None = None) -> pd.DataFrame:
+        sql, params = sql_celulas(dims, self.tabela, self.ph, inicio=inicio, fim=fim, canais=canais, bairros=bairros)
+        return tipar_celulas(self.consultar(sql, params))
+
+    @medido("sql.resumo")
+    def resumo(self, inicio=None, fim=None, canais=None, bairros=None) -> ResumoKpis:
+        return ResumoKpis(self.celulas(inicio, fim, canais, bairros))
+
+    @medido("sql.filtrar")
+    def filtrar(self, inicio=None, fim=None, canais=None, bairros=None) -> pd.DataFrame:
+        """
+        Linhas do recorte (filtros empurrados para o WHERE), com os tipos da
+        base normalizada. Os últimos recortes ficam em memória.
+        """
+
+        chave = (inicio, fim, tuple(canais or ()), tuple(bairros or ()))
+        df = self._linhas.get(chave)
+        if df is None:
+            sql, params = sql_linhas(None, self.tabela, self.ph, inicio=inicio, fim=fim, canais=canais, bairros=bairros)
+            df = tipar_linhas(self.consultar(sql, params))
+            self._linhas.put(chave, df)
+        return df
+
+    def load_data(self) -> pd.DataFrame:
+        return self.filtrar()
+
+    def limpar(self) -> None:
+        # A conexão compartilhada é reaberta (com os arquivos atuais) na
+        # próxima consulta. A anterior é fechada agora ou, com cursores em
+        # uso, quando o último deles terminar (`_cursor`)
+        self._linhas.clear()
+        with self._trava:
+            anterior, self._conexao = self._conexao, None
+            if anterior is not None and id(anterior) not in self._cursores:
+                anterior.close()
+
+
+def _versao_arquivos(caminhos: list[str]) -> str:
+    # Tamanho e mtime de cada arquivo (ausente = "-"): muda a cada escrita
+    partes = []
+    for p in caminhos:
+        try:
+            st = os.stat(p)
+            partes.append(f"{st.st_size}:{st.st_mtime_ns}")
+        except FileNotFoundError:
+            partes.append("-")
+    return f"{os.path.abspath(caminhos[0])}:{'|'.join(partes)}"
+
+
+def _conectar_dbapi():
+    modulo, funcao = SQL_CONECTAR.split(":")
+    return getattr(importlib.import_module(modulo), funcao)()
+
+
+def backend_padrao() -> BackendSQL | None:
+    """
+    Backend SQL configurado por GENESIS_BACKEND, ou None no modo arquivo.
+    """
+
+    if BACKEND == "sqlite":
+        return BackendSQL.sqlite(SQLITE_PATH)
+    if BACKEND == "duckdb":
+        return BackendSQL.duckdb()
+    if BACKEND == "dbapi":
+        if not SQL_CONECTAR:
+            raise ValueError("GENESIS_BACKEND=dbapi exige GENESIS_SQL_CONECTAR='modulo:funcao'.")
+        return BackendSQL(_conectar_dbapi, SQL_PARAMSTYLE, descricao=f"dbapi:{SQL_CONECTAR}")
+    if BACKEND == "arquivo":
+        return None
+    raise ValueError(f"GENESIS_BACKEND inválido: {BACKEND!r}")
+
+
+def _comparavel(x):
+    # Ordem de empates e tipos (categórica × texto) não contam na comparação
+    if isinstance(x, pd.DataFrame):
+        x = x.reset_index(drop=True)
+        x = x.assign(**{c: x[c].astype(str) for c in x.columns if isinstance(x[c].dtype, pd.CategoricalDtype)})
+        return x.sort_values(list(x.columns)).reset_index(drop=True)
+    return x
+
+
+def _divergencias(nome: str, a, b) -> list[str]:
+    try:
+        if isinstance(a, pd.DataFrame):
+            pd.testing.assert_frame_equal(_comparavel(a), _comparavel(b), check_dtype=False)
+        elif isinstance(a, dict):
+            return [d for k in a for d in _divergencias(f"{nome}.{k}", a[k], b.get(k))]
+        elif a is None or b is None:
+            assert a is None and b is None
+        else:
+            assert abs(float(a) - float(b)) <= 1e-6 * max(1.0, abs(float(b)))
+    except AssertionError as e:
+        return [f"{nome}: {str(e).splitlines()[0] if str(e) else (a, b)}"]
+    return []
+
+
+def verificar_paridade(backend: BackendSQL, df: pd.DataFrame | None = None, n: int = 50, seed: int = 0) -> list[str]:
+    """
+    Compara o backend com a implementação pandas (IndiceFiltros +
+    ResumoKpis) em `n` estados de filtro aleatórios: KPIs, agregados por
+    dimensão e linhas filtradas. Devolve as divergências (vazio = paridade).
+    """
+
+    import numpy as np
+
+    from utils.filters import IndiceFiltros
+
+    indice = IndiceFiltros(load_data() if df is None else df)
+    rng = np.random.default_rng(seed)
+    bairros = indice.valores("bairro")
+    dias = pd.date_range(*indice.periodo())
+
+    out = [] if tuple(backend.periodo()) == tuple(indice.periodo()) else ["periodo"]
+    for col in ["canal_confirmacao", "bairro"]:
+        if backend.valores(col) != indice.valores(col):
+            out.append(f"valores({col})")
+
+    for i in range(n):
+        ini, fim = sorted(pd.Timestamp(d) for d in rng.choice(dias, 2))
+        filtros = {
+            "inicio": ini,
+            "fim": fim,
+            "canais": [[], ["SMS"], ["Sem SMS"]][rng.integers(0, 3)],
+            "bairros": list(rng.choice(bairros, rng.integers(0, 4), replace=False)),
+        }
+        r_sql = backend.resumo(**filtros)
+        r_pd = ResumoKpis.de_dataframe(indice.filtrar(**filtros))
+
+        pares = [
+            ("exec_kpis", r_sql.exec_kpis(), r_pd.exec_kpis()),
+            ("perda_financeira", r_sql.perda_financeira(), r_pd.perda_financeira()),
+            ("impacto_antecedencia", r_sql.impacto_antecedencia(), r_pd.impacto_antecedencia()),
+            ("priorizar_acoes", r_sql.priorizar_acoes(), r_pd.priorizar_acoes()),
+        ]
+        for col in ["canal_confirmacao", "bairro", "faixa_idade"]:
+            pares.append((f"no_show_por({col})", r_sql.no_show_por(col), r_pd.no_show_por(col)))
+
+        linhas_sql, linhas_pd = alinhar_categorias([backend.filtrar(**filtros), indice.filtrar(**filtros)], CATEGORICAS)
+        pares.append(("filtrar", linhas_sql, linhas_pd))
+
+        out += [f"[{i}] {d}" for nome, a, b in pares for d in _divergencias(nome, a, b)]
+    return out
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.backend",
+        description="Backends SQL do dashboard (tabela `agendamentos`).",
+    )
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_carregar = sub.add_parser("carregar", help="carrega a base normalizada num arquivo SQLite")
+    p_carregar.add_argument("--sqlite", default=SQLITE_PATH, help="arquivo SQLite de destino")
+
+    p_paridade = sub.add_parser("paridade", help="compara um backend com a implementação pandas")
+    p_paridade.add_argument("--backend", choices=["duckdb", "sqlite"], default="duckdb")
+    p_paridade.add_argument("--sqlite", default=SQLITE_PATH)
+    p_paridade.add_argument("-n", type=int, default=50, help="estados de filtro aleatórios")
+    p_paridade.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "carregar":
+        os.makedirs(os.path.dirname(os.path.abspath(args.sqlite)), exist_ok=True)
+        n = BackendSQL.sqlite(args.sqlite).carregar(load_data())
+        print(f"{n} linhas em {args.sqlite}:{TABELA}")
+        return 0
+
+    backend = BackendSQL.duckdb() if args.backend == "duckdb" else BackendSQL.sqlite(args.sqlite)
+    divergencias = verificar_paridade(backend, n=args.n, seed=args.seed)
+    for d in divergencias[:20]:
+        print(d)
+    print(f"{backend.descricao}: {args.n} estados de filtro, {len(divergencias)} divergência(s)")
+    return 1 if divergencias else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
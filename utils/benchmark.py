@@ -0,0 +1,501 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+
+# Tamanhos padrão da base sintética (linhas) e repetições por caso
+TAMANHOS = [100_000, 1_000_000]
+REPETICOES = 3
+ESTADOS_FILTRO = 20
+
+# Imports a frio (processo novo) até a primeira tela do dashboard e das abas
+# pesadas. O orçamento vale para "importacao.dashboard": o que o pod importa
+# antes de desenhar a sidebar.
+IMPORTACOES = {
+    "importacao.dashboard": ["streamlit", "app.data_store", "utils.kpis", "utils.model", "utils.styling", "utils.instrumentation"],
+    "importacao.exec_overview": ["app.pages_exec", "plotly.express"],
+    "importacao.predict": ["app.pages_predict", "plotly.express", "sklearn.linear_model", "sklearn.compose"],
+}
+ORCAMENTO_IMPORTACAO_S = 1.5
+
+_SCRIPT_IMPORTACAO = """
+import json, sys, time, tracemalloc
+modulos = sys.argv[2:]
+if sys.argv[1] == "memoria":
+    tracemalloc.start()
+ausentes = []
+t0 = time.perf_counter()
+for m in modulos:
+    try:
+        __import__(m)
+    except ModuleNotFoundError as e:
+        # Módulo que ainda não existia no commit medido (ex.: o baseline)
+        if e.name != m:
+            raise
+        ausentes.append(m)
+tempo = time.perf_counter() - t0
+pico = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+print(json.dumps({"tempo_s": tempo, "pico": pico, "ausentes": ausentes}))
+"""
+
+# Roda `_casos_na_pasta` deste arquivo com o pacote `utils` de outra árvore
+# (PYTHONPATH): o mesmo runner mede um commit antigo num git worktree.
+_SCRIPT_CASOS = """
+import importlib.util, json, sys
+spec = importlib.util.spec_from_file_location("_genesis_benchmark", sys.argv[1])
+bench = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bench)
+print(json.dumps(bench._casos_na_pasta(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))))
+"""
+
+
+def _raiz_padrao() -> str:
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env(raiz: str) -> dict:
+    return {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [raiz, os.environ.get("PYTHONPATH")]))}
+
+
+@contextmanager
+def _pasta_dados(linhas: int, seed: int):
+    """
+    Diretório temporário com data/raw/noshowappointments.csv sintético
+    (formato do Kaggle) como diretório de trabalho: o load_data resolve o
+    caminho relativo ao cwd.
+    """
+
+    from utils.data_generator import gravar_sintetico
+
+    anterior = os.getcwd()
+    pasta = tempfile.mkdtemp(prefix="genesis-bench-")
+    try:
+        gravar_sintetico(linhas, os.path.join(pasta, "data", "raw", "noshowappointments.csv"), seed=seed)
+        os.chdir(pasta)
+        yield pasta
+    finally:
+        os.chdir(anterior)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def medir(funcao, repeticoes: int = REPETICOES, preparar=None, aquecer: bool = False) -> dict:
+    """
+    Tempo (s) de `funcao()` em `repeticoes` execuções e pico de memória
+    alocada (tracemalloc) numa execução extra — separada, porque o
+    tracemalloc deixa o código bem mais lento.
+    `preparar()` roda antes de cada execução, fora da medição. Com
+    `aquecer`, uma execução descartada antes (caches do primeiro uso).
+    """
+
+    if aquecer:
+        funcao()
+
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        gc.collect()
+        t0 = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - t0)
+
+    if preparar:
+        preparar()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "tempo_min_s": min(tempos),
+        "tempo_mediana_s": float(np.median(tempos)),
+        "tempos_s": tempos,
+        "pico_memoria_mb": pico / 1024 ** 2,
+    }
+
+
+def _importar(modo: str, modulos: list[str], raiz: str | None = None) -> dict:
+    raiz = raiz or _raiz_padrao()
+    saida = subprocess.check_output(
+        [sys.executable, "-c", _SCRIPT_IMPORTACAO, modo, *modulos], cwd=raiz, env=_env(raiz), text=True,
+        stderr=subprocess.DEVNULL,
+    )
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def medir_importacao(modulos: list[str], repeticoes: int = REPETICOES, raiz: str | None = None) -> dict:
+    """
+    Como `medir`, mas para importar `modulos` num interpretador novo a cada
+    repetição (import a frio, como no start de um pod). O processo em si não
+    entra na conta, só os imports. Módulos que não existem em `raiz` ficam
+    de fora e são listados em `ausentes`.
+    """
+
+    tempos = [_importar("tempo", modulos, raiz)["tempo_s"] for _ in range(repeticoes)]
+    memoria = _importar("memoria", modulos, raiz)
+    return {
+        "tempo_min_s": min(tempos),
+        "tempo_mediana_s": float(np.median(tempos)),
+        "tempos_s": tempos,
+        "pico_memoria_mb": memoria["pico"] / 1024 ** 2,
+        "modulos": modulos,
+        "ausentes": memoria["ausentes"],
+    }
+
+
+def importacoes(repeticoes: int = REPETICOES, raiz: str | None = None) -> dict:
+    out = {nome: medir_importacao(modulos, repeticoes, raiz) for nome, modulos in IMPORTACOES.items()}
+    out["importacao.dashboard"]["orcamento_s"] = ORCAMENTO_IMPORTACAO_S
+    return out
+
+
+def _estados_filtro(df: pd.DataFrame, n: int, seed: int) -> list[dict]:
+    # Combinações da sidebar: período aleatório, 0-2 canais, 0-3 bairros.
+    # Só depende dos dados: os estados são os mesmos em qualquer commit.
+    rng = np.random.default_rng(seed)
+    datas = df["data_agendamento"].dropna()
+    dias = pd.date_range(datas.min(), datas.max())
+    canais = sorted(df["canal_confirmacao"].dropna().unique().tolist())
+    bairros = sorted(df["bairro"].dropna().unique().tolist())
+
+    estados = []
+    for _ in range(n):
+        inicio, fim = sorted(pd.Timestamp(d) for d in rng.choice(dias, 2))
+        estados.append({
+            "inicio": inicio.date(),
+            "fim": fim.date(),
+            "canais": list(rng.choice(canais, rng.integers(0, len(canais) + 1), replace=False)),
+            "bairros": list(rng.choice(bairros, rng.integers(0, 4), replace=False)),
+        })
+    return estados
+
+
+def _modulo(nome: str):
+    # None se o módulo não existe na árvore medida (ex.: o baseline)
+    import importlib
+
+    try:
+        return importlib.import_module(nome)
+    except ModuleNotFoundError as e:
+        if e.name != nome:
+            raise
+        return None
+
+
+# Caminhos do dashboard original (baseline), medidos quando a árvore não
+# tem a versão otimizada: é o "antes" da comparação.
+
+def _filtrar_mascaras(df: pd.DataFrame, inicio, fim, canais, bairros) -> pd.DataFrame:
+    # Como a sidebar original: cópia + máscaras sobre a base inteira
+    dff = df.copy()
+    if pd.api.types.is_datetime64_any_dtype(dff["data_agendamento"]):
+        inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    dff = dff[(dff["data_agendamento"] >= inicio) & (dff["data_agendamento"] <= fim)]
+    if canais:
+        dff = dff[dff["canal_confirmacao"].isin(canais)]
+    if bairros:
+        dff = dff[dff["bairro"].isin(bairros)]
+    return dff
+
+
+def _regras_baseline(scored: pd.DataFrame, limiar_moderado: float, limiar_alto: float) -> pd.DataFrame:
+    # Faixa/ação/execução linha a linha com .apply, como a aba Act original
+    tmp = scored.copy()
+
+    def faixa_risco(r):
+        if r >= limiar_alto:
+            return "ALTO"
+        elif r >= limiar_moderado:
+            return "MODERADO"
+        return "BAIXO"
+
+    def acao_recomendada(risco, idade_60_mais):
+        if risco >= limiar_alto:
+            if int(idade_60_mais) == 1:
+                return "Ligar (manual) — confirmação ativa"
+            return "WhatsApp + SMS (bot) — confirmação dupla"
+        if risco >= limiar_moderado:
+            return "WhatsApp (bot) + SMS padrão — confirmar"
+        return "SMS padrão — lembrete"
+
+    tmp["faixa_risco"] = tmp["risco_no_show"].apply(faixa_risco)
+    tmp["acao_recomendada"] = tmp.apply(lambda row: acao_recomendada(row["risco_no_show"], row["idade_60_mais"]), axis=1)
+    tmp["execucao"] = tmp["acao_recomendada"].apply(lambda a: "Manual (analista)" if "Ligar" in a else "Automático (bot)")
+    return tmp
+
+
+def _ranking_baseline(tmp: pd.DataFrame) -> pd.DataFrame:
+    agg = tmp.groupby(["faixa_risco", "idade_60_mais", "acao_recomendada", "execucao"]).agg(
+        qtd=("id_agendamento", "count"),
+        risco_medio=("risco_no_show", "mean"),
+        antecedencia_media=("antecedencia_dias", "mean"),
+    ).reset_index()
+    agg["grupo_idade"] = agg["idade_60_mais"].apply(lambda x: "60+" if int(x) == 1 else "<60")
+    agg["ordem"] = agg["faixa_risco"].map({"ALTO": 0, "MODERADO": 1, "BAIXO": 2}).fillna(9)
+    return agg.sort_values(["ordem", "qtd"], ascending=[True, False]).drop(columns=["ordem", "idade_60_mais"])
+
+
+def _fila_baseline(tmp: pd.DataFrame) -> pd.DataFrame:
+    # Ordena a fila inteira para mostrar 200 linhas / exportar o CSV
+    return tmp.sort_values("risco_no_show", ascending=False)[
+        ["id_agendamento", "idade", "canal_confirmacao", "bairro", "antecedencia_dias",
+         "faixa_risco", "acao_recomendada", "execucao", "risco_no_show"]
+    ]
+
+
+def _casos_na_pasta(pasta: str, repeticoes: int = REPETICOES, seed: int = 42) -> dict:
+    """
+    Mede as etapas do dashboard sobre a base sintética em `pasta` (o cwd)
+    com o pacote `utils` importável. Cada etapa usa a API otimizada quando
+    a árvore a tem e, senão, o caminho do dashboard original, com o mesmo
+    nome de caso: o JSON de um commit antigo compara com o de um novo.
+    """
+
+    import inspect
+
+    from utils import data_loader, kpis, model
+
+    filtros = _modulo("utils.filters")
+    cube = _modulo("utils.cube")
+    rules = _modulo("utils.rules")
+
+    out = {}
+    cache = os.path.join(pasta, "data", "raw", getattr(data_loader, "CACHE_DIRNAME", "cache"))
+    limpar_cache = lambda: shutil.rmtree(cache, ignore_errors=True)
+
+    # Carga
+    if "use_cache" in inspect.signature(data_loader.load_data).parameters:
+        out["load_data.csv"] = medir(lambda: data_loader.load_data(use_cache=False), repeticoes)
+        out["load_data.gravar_cache"] = medir(data_loader.load_data, repeticoes, preparar=limpar_cache)
+        out["load_data.cache"] = medir(data_loader.load_data, repeticoes)
+    else:
+        # Sem cache: toda carga lê e normaliza o CSV
+        out["load_data.csv"] = medir(data_loader.load_data, repeticoes)
+
+    df = data_loader.load_data()
+    estados = _estados_filtro(df, ESTADOS_FILTRO, seed)
+
+    # Filtros da sidebar (índice + recortes em vários estados)
+    if filtros is not None:
+        out["filtros.indice"] = medir(lambda: filtros.IndiceFiltros(df), repeticoes)
+        indice = filtros.IndiceFiltros(df)
+        base = indice.df
+        out["filtros.filtrar"] = medir(lambda: [indice.filtrar(**e) for e in estados], repeticoes)
+    else:
+        base = df
+        out["filtros.filtrar"] = medir(lambda: [_filtrar_mascaras(df, **e) for e in estados], repeticoes)
+    out["filtros.filtrar"]["estados"] = len(estados)
+
+    # KPIs: funções de utils.kpis sobre a base inteira
+    if hasattr(kpis, "faixa_idade"):
+        comparecimento_idade = lambda: kpis.comparecimento_por(base, "faixa_idade")
+    else:
+        def comparecimento_idade():
+            # Como a aba Reveal original: coluna derivada por linha antes de agrupar
+            tmp = base.copy()
+            tmp["faixa_idade"] = tmp["idade"].apply(lambda x: "60+" if x >= 60 else "<60")
+            return kpis.comparecimento_por(tmp, "faixa_idade")
+
+    funcoes_kpi = {
+        "compute_exec_kpis": lambda: kpis.compute_exec_kpis(base),
+        "pipeline_agenda": lambda: kpis.pipeline_agenda(base),
+        "perda_financeira": lambda: kpis.perda_financeira(base),
+        "simular_reducao_no_show": lambda: kpis.simular_reducao_no_show(base, 0.1),
+        "no_show_por.canal_confirmacao": lambda: kpis.no_show_por(base, "canal_confirmacao"),
+        "no_show_por.bairro": lambda: kpis.no_show_por(base, "bairro"),
+        "comparecimento_por.faixa_idade": comparecimento_idade,
+        "impacto_antecedencia": lambda: kpis.impacto_antecedencia(base),
+        "priorizar_acoes": lambda: kpis.priorizar_acoes(base),
+    }
+    if hasattr(kpis, "ResumoKpis"):
+        funcoes_kpi["ResumoKpis.de_dataframe"] = lambda: kpis.ResumoKpis.de_dataframe(base)
+    for nome, funcao in funcoes_kpi.items():
+        out[f"kpis.{nome}"] = medir(funcao, repeticoes)
+
+    if cube is not None:
+        out["cubo.de_dataframe"] = medir(lambda: cube.CuboKpis.de_dataframe(base), repeticoes)
+        cubo = cube.CuboKpis.de_dataframe(base)
+        out["cubo.resumo"] = medir(lambda: [cubo.resumo(**e).exec_kpis() for e in estados], repeticoes)
+        out["cubo.resumo"]["estados"] = len(estados)
+
+    # Modelo. Pontuar é aquecido: a primeira chamada não conta (exportação
+    # do scorer, caches), só o custo por requisição.
+    out["modelo.treinar"] = medir(lambda: model.treinar_modelo_no_show(base), repeticoes)
+    pack = model.treinar_modelo_no_show(base)
+    out["modelo.pontuar"] = medir(lambda: model.pontuar_risco_no_show(base, pack), repeticoes, aquecer=True)
+    out["modelo.pontuar_pipeline"] = medir(
+        lambda: pack["pipeline"].predict_proba(base[pack["features"]]), repeticoes, aquecer=True
+    )
+    scored = model.pontuar_risco_no_show(base, pack)
+
+    # Aba Act: faixas + regras, ranking, fila e export CSV
+    if rules is not None:
+        regras = rules.carregar_regras()
+        out["act.aplicar_regras"] = medir(lambda: rules.aplicar_regras(scored, 0.3, 0.6, regras), repeticoes)
+        tmp = rules.aplicar_regras(scored, 0.3, 0.6, regras)
+        out["act.ranking_acoes"] = medir(lambda: rules.ranking_acoes(tmp), repeticoes)
+        out["act.fila_acao"] = medir(lambda: rules.pagina_fila(tmp, 0, 200), repeticoes)
+        out["act.fila_csv"] = medir(lambda: rules.fila_acao(tmp).to_csv(index=False).encode("utf-8"), repeticoes)
+    else:
+        out["act.aplicar_regras"] = medir(lambda: _regras_baseline(scored, 0.3, 0.6), repeticoes)
+        tmp = _regras_baseline(scored, 0.3, 0.6)
+        out["act.ranking_acoes"] = medir(lambda: _ranking_baseline(tmp), repeticoes)
+        out["act.fila_acao"] = medir(lambda: _fila_baseline(tmp).head(200), repeticoes)
+        out["act.fila_csv"] = medir(lambda: _fila_baseline(tmp).to_csv(index=False).encode("utf-8"), repeticoes)
+
+    return out
+
+
+def casos(linhas: int, repeticoes: int = REPETICOES, seed: int = 42, raiz: str | None = None) -> dict:
+    """
+    Mede as etapas do dashboard sobre uma base sintética de `linhas` linhas.
+    Com `raiz` (checkout de outro commit, ex.: `git worktree add`), mede o
+    código daquela árvore num processo separado; a base é gerada aqui.
+    """
+
+    with _pasta_dados(linhas, seed) as pasta:
+        if raiz is None:
+            return _casos_na_pasta(pasta, repeticoes, seed)
+
+        raiz = os.path.abspath(raiz)
+        saida = subprocess.check_output(
+            [sys.executable, "-c", _SCRIPT_CASOS, os.path.abspath(__file__), pasta, str(repeticoes), str(seed)],
+            cwd=pasta, env=_env(raiz), text=True,
+        )
+        return json.loads(saida.strip().splitlines()[-1])
+
+
+def _commit(raiz: str | None = None) -> str | None:
+    try:
+        raiz = raiz or _raiz_padrao()
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=raiz, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _ambiente(raiz: str | None = None) -> dict:
+    import sklearn
+
+    return {
+        "commit": _commit(raiz),
+        "raiz": os.path.abspath(raiz or _raiz_padrao()),
+        "data_utc": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def executar(tamanhos: list[int] = TAMANHOS, repeticoes: int = REPETICOES, seed: int = 42,
+             raiz: str | None = None) -> dict:
+    resultado = {"ambiente": _ambiente(raiz), "repeticoes": repeticoes, "seed": seed, "tamanhos": {}}
+    print("== imports a frio", file=sys.stderr)
+    resultado["importacao"] = importacoes(repeticoes, raiz)
+    for n in tamanhos:
+        print(f"== {n:,} linhas".replace(",", "."), file=sys.stderr)
+        resultado["tamanhos"][str(n)] = casos(n, repeticoes, seed, raiz)
+    return resultado
+
+
+def comparar(antes: dict, depois: dict) -> pd.DataFrame:
+    """
+    Tabela caso a caso: tempo mínimo e pico de memória antes/depois e a razão
+    (depois / antes; < 1 = melhorou).
+    """
+
+    # Imports não dependem do tamanho da base: entram como linhas = 0
+    grupos = {"0": depois.get("importacao", {}), **depois["tamanhos"]}
+    grupos_antes = {"0": antes.get("importacao", {}), **antes["tamanhos"]}
+
+    linhas = []
+    for n, casos_depois in grupos.items():
+        casos_antes = grupos_antes.get(n, {})
+        for caso, d in casos_depois.items():
+            a = casos_antes.get(caso)
+            if a is None:
+                continue
+            linhas.append({
+                "linhas": int(n),
+                "caso": caso,
+                "tempo_antes_s": a["tempo_min_s"],
+                "tempo_depois_s": d["tempo_min_s"],
+                "razao_tempo": d["tempo_min_s"] / a["tempo_min_s"] if a["tempo_min_s"] else np.nan,
+                "memoria_antes_mb": a["pico_memoria_mb"],
+                "memoria_depois_mb": d["pico_memoria_mb"],
+                "razao_memoria": d["pico_memoria_mb"] / a["pico_memoria_mb"] if a["pico_memoria_mb"] else np.nan,
+            })
+    return pd.DataFrame(linhas)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.benchmark",
+        description="Benchmark de imports, carga, filtros, KPIs, modelo e fila de ação sobre bases sintéticas.",
+    )
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_rodar = sub.add_parser("rodar", help="executa o benchmark e grava JSON")
+    p_rodar.add_argument("--linhas", type=int, nargs="+", default=TAMANHOS)
+    p_rodar.add_argument("--repeticoes", type=int, default=REPETICOES)
+    p_rodar.add_argument("--seed", type=int, default=42)
+    p_rodar.add_argument("--saida", help="arquivo JSON (padrão: benchmark-<commit>.json)")
+    p_rodar.add_argument("--raiz", help="checkout de outro commit a medir (ex.: git worktree do baseline)")
+
+    p_comparar = sub.add_parser("comparar", help="compara dois resultados JSON")
+    p_comparar.add_argument("antes")
+    p_comparar.add_argument("depois")
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "comparar":
+        with open(args.antes, "r", encoding="utf-8") as f:
+            antes = json.load(f)
+        with open(args.depois, "r", encoding="utf-8") as f:
+            depois = json.load(f)
+        with pd.option_context("display.width", 200, "display.max_rows", None, "display.float_format", "{:.4f}".format):
+            print(comparar(antes, depois).to_string(index=False))
+        return 0
+
+    resultado = executar(args.linhas, args.repeticoes, args.seed, args.raiz)
+    saida = args.saida or f"benchmark-{resultado['ambiente']['commit'] or 'local'}.json"
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    print("\nImports a frio")
+    for caso, r in resultado["importacao"].items():
+        aviso = ""
+        if "orcamento_s" in r:
+            aviso = "  ok" if r["tempo_min_s"] <= r["orcamento_s"] else f"  ACIMA do orçamento ({r['orcamento_s']:.1f} s)"
+        print(f"  {caso:<40} {r['tempo_min_s'] * 1000:>10.1f} ms  {r['pico_memoria_mb']:>8.1f} MB{aviso}")
+
+    for n, casos_n in resultado["tamanhos"].items():
+        print(f"\n{int(n):,} linhas".replace(",", "."))
+        for caso, r in casos_n.items():
+            print(f"  {caso:<40} {r['tempo_min_s'] * 1000:>10.1f} ms  {r['pico_memoria_mb']:>8.1f} MB")
+    print(f"\nResultados em {saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
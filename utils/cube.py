@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import alinhar_categorias
+from utils.instrumentation import medido
+from utils.kpis import DIMENSOES, ResumoKpis, celulas_kpi
+
+
+COLUNA_DIA = "data_agendamento"
+
+
+class CuboKpis:
+    """
+    Cubo pré-agregado (dia × canal × bairro × faixa de antecedência × faixa
+    etária) com as mesmas medidas de `celulas_kpi`.
+
+    Construído uma vez na carga; qualquer combinação de filtros da sidebar
+    vira um corte do cubo (período por `searchsorted`, canal/bairro pelos
+    códigos) e os KPIs são rolados a partir de poucas células, sem varrer
+    as linhas da base.
+    """
+
+    def __init__(self, celulas: pd.DataFrame):
+        if not celulas[COLUNA_DIA].is_monotonic_increasing:
+            celulas = celulas.sort_values(COLUNA_DIA, kind="stable").reset_index(drop=True)
+        self.celulas = celulas
+        self._dias = celulas[COLUNA_DIA].to_numpy()
+
+    @classmethod
+    def de_dataframe(cls, df: pd.DataFrame) -> "CuboKpis":
+        return cls(celulas_kpi(df, [COLUNA_DIA] + DIMENSOES))
+
+    @classmethod
+    def combinar(cls, partes: list[pd.DataFrame]) -> "CuboKpis":
+        """
+        Soma cubos parciais (ex.: um por bloco de ingestão) célula a célula.
+        """
+
+        medidas = [c for c in partes[0].columns if c not in [COLUNA_DIA] + DIMENSOES]
+        celulas = pd.concat(alinhar_categorias(partes, DIMENSOES), ignore_index=True)
+        celulas = celulas.groupby([COLUNA_DIA] + DIMENSOES, observed=True, dropna=False)[medidas].sum().reset_index()
+        return cls(celulas)
+
+    def salvar(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        self.celulas.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def carregar(cls, path: str) -> "CuboKpis":
+        return cls(pd.read_parquet(path))
+
+    def memoria_bytes(self) -> int:
+        return int(self.celulas.memory_usage(deep=True).sum())
+
+    def fatiar(self, inicio=None, fim=None, canais=None, bairros=None) -> pd.DataFrame:
+        """
+        Células que passam nos filtros (mesma semântica de IndiceFiltros:
+        período inclusivo, listas vazias = todos).
+        """
+
+        lo = 0 if inicio is None else int(np.searchsorted(self._dias, np.datetime64(pd.Timestamp(inicio)), "left"))
+        hi = len(self._dias) if fim is None else int(np.searchsorted(self._dias, np.datetime64(pd.Timestamp(fim)), "right"))
+        c = self.celulas.iloc[lo:max(lo, hi)]
+
+        for col, valores in (("canal_confirmacao", canais), ("bairro", bairros)):
+            if valores:
+                c = c[c[col].isin(valores)]
+        return c
+
+    @medido("cubo.resumo")
+    def resumo(self, inicio=None, fim=None, canais=None, bairros=None) -> ResumoKpis:
+        return ResumoKpis(self.fatiar(inicio, fim, canais, bairros))
@@ -1,3 +1,6 @@
+import argparse
+import os
+
 import numpy as np
 import pandas as pd
 
@@ -37,7 +40,8 @@ def generate_synthetic_dataset(n: int = 20000, seed: int = 42) -> pd.DataFrame:
         "Gastro": 260, "Neuro": 320, "Gineco": 220, "Oftalmo": 210,
         "Ressonância": 600, "Tomografia": 480
     }
-    price = np.array([base_price_map[s] for s in specialty]) + rng.normal(0, 20, size=n)
+    base_prices = np.array([base_price_map[s] for s in specialties], dtype=float)
+    price = base_prices[pd.Index(specialties).get_indexer(specialty)] + rng.normal(0, 20, size=n)
     price = price.clip(150, 900).round(0)
 
     # Probabilidade de agendar (conversão) — base ~35%
@@ -97,3 +101,240 @@ def generate_synthetic_dataset(n: int = 20000, seed: int = 42) -> pd.DataFrame:
     })
 
     return df
+
+
+# ---------------------------------------------------------------------------
+# Gerador em escala no formato do Kaggle (o que o load_data consome)
+# ---------------------------------------------------------------------------
+
+# Bairros de Vitória/ES presentes no dataset original, com pesos decrescentes
+BAIRROS = [
+    "JARDIM CAMBURI", "MARIA ORTIZ", "RESISTÊNCIA", "JARDIM DA PENHA", "ITARARÉ",
+    "CENTRO", "TABUAZEIRO", "SANTA MARTHA", "JESUS DE NAZARETH", "BONFIM",
+    "SANTO ANTÔNIO", "SANTO ANDRÉ", "CARATOÍRA", "JABOUR", "SÃO PEDRO",
+    "ILHA DO PRÍNCIPE", "NOVA PALESTINA", "ANDORINHAS", "DA PENHA", "ROMÃO",
+    "GURIGICA", "SÃO JOSÉ", "BELA VISTA", "MARUÍPE", "FORTE SÃO JOÃO",
+    "ILHA DE SANTA MARIA", "SÃO CRISTÓVÃO", "REDENÇÃO", "SÃO BENEDITO", "JOANA D´ARC",
+]
+_PESOS_BAIRROS = 1.0 / np.arange(1, len(BAIRROS) + 1) ** 0.6
+_PESOS_BAIRROS /= _PESOS_BAIRROS.sum()
+# Efeito fixo de cada bairro no no-show (-2 a +2 p.p.)
+_EFEITO_BAIRROS = ((np.arange(len(BAIRROS)) * 7) % 5 - 2) * 0.01
+
+COLUNAS_KAGGLE = [
+    "PatientId", "AppointmentID", "Gender", "ScheduledDay", "AppointmentDay", "Age",
+    "Neighbourhood", "Scholarship", "Hipertension", "Diabetes", "Alcoholism",
+    "Handcap", "SMS_received", "No-show",
+]
+
+BLOCO_PADRAO = 1_000_000
+ID_INICIAL = 5_000_000
+
+# Fora de data/raw: o CSV real (lido pelo load_data) nunca é o destino padrão
+SAIDA_PADRAO = os.path.join("data", "synthetic", "noshowappointments.csv")
+
+
+def _bloco_kaggle(m: int, rng: np.random.Generator, id_inicial: int, inicio: str, dias: int) -> pd.DataFrame:
+    """
+    `m` agendamentos no formato do CSV do Kaggle, totalmente vetorizado.
+    Antecedência, SMS, idade e bairro influenciam o no-show, para o modelo
+    ter sinal.
+    """
+
+    age = np.clip(rng.normal(37, 23, m), 0, 115).astype(np.int64)
+
+    segundos = rng.integers(0, dias * 86400, m)
+    scheduled = np.datetime64(inicio, "s") + segundos.astype("timedelta64[s]")
+    antecedencia = np.minimum(rng.exponential(10, m).astype(np.int64), 179)
+    appointment = scheduled.astype("datetime64[D]") + antecedencia.astype("timedelta64[D]")
+
+    # SMS só faz sentido com alguns dias de antecedência
+    sms = (rng.random(m) < np.where(antecedencia >= 3, 0.45, 0.02)).astype(np.int64)
+    bairro = rng.choice(len(BAIRROS), size=m, p=_PESOS_BAIRROS)
+
+    p = (
+        0.12
+        + 0.10 * (antecedencia >= 7)
+        + 0.05 * (antecedencia >= 30)
+        - 0.04 * sms
+        - 0.03 * (age >= 60)
+        + _EFEITO_BAIRROS[bairro]
+    )
+    no_show = rng.random(m) < np.clip(p, 0.02, 0.6)
+
+    return pd.DataFrame({
+        "PatientId": rng.integers(10**9, 10**14, m),
+        "AppointmentID": id_inicial + np.arange(m, dtype=np.int64),
+        "Gender": np.where(rng.random(m) < 0.65, "F", "M"),
+        "ScheduledDay": pd.to_datetime(scheduled).tz_localize("UTC"),
+        "AppointmentDay": pd.to_datetime(appointment).tz_localize("UTC"),
+        "Age": age,
+        "Neighbourhood": pd.Categorical.from_codes(bairro, categories=BAIRROS),
+        "Scholarship": (rng.random(m) < 0.10).astype(np.int64),
+        "Hipertension": (rng.random(m) < np.where(age >= 60, 0.55, 0.12)).astype(np.int64),
+        "Diabetes": (rng.random(m) < np.where(age >= 60, 0.20, 0.04)).astype(np.int64),
+        "Alcoholism": (rng.random(m) < 0.03).astype(np.int64),
+        "Handcap": (rng.random(m) < 0.02).astype(np.int64),
+        "SMS_received": sms,
+        "No-show": np.where(no_show, "Yes", "No"),
+    })
+
+
+def _gerar_bloco(args: tuple) -> pd.DataFrame:
+    # Função de módulo (picklável) para o ProcessPoolExecutor
+    i, m, semente, bloco, formato, inicio, dias = args
+    rng = np.random.default_rng(semente)
+    df = _bloco_kaggle(m, rng, ID_INICIAL + i * bloco, inicio, dias)
+    if formato == "normalizado":
+        from utils.data_loader import _normalizar
+
+        df = _normalizar(df)
+    return df
+
+
+def _gerar_csv(args: tuple) -> str:
+    # Serializa no próprio processo de trabalho: o processo principal só
+    # concatena texto no arquivo
+    df = _gerar_bloco(args)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.DatetimeTZDtype):
+            df[col] = np.char.add(np.datetime_as_string(df[col].dt.tz_convert(None).to_numpy(), unit="s"), "Z")
+        elif pd.api.types.is_datetime64_dtype(df[col]):
+            df[col] = np.datetime_as_string(df[col].to_numpy(), unit="D")
+    return df.to_csv(header=(args[0] == 0), index=False)
+
+
+def _executar(funcao, tarefas: list, processos: int):
+    """
+    `funcao(t)` para cada tarefa, resultados na ordem das tarefas. Com
+    vários processos mantém uma janela limitada de blocos em voo
+    (memória ~ 2 × processos blocos).
+    """
+
+    if processos <= 1:
+        for t in tarefas:
+            yield funcao(t)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=processos) as ex:
+        pendentes = []
+        for t in tarefas:
+            pendentes.append(ex.submit(funcao, t))
+            if len(pendentes) >= 2 * processos:
+                yield pendentes.pop(0).result()
+        for f in pendentes:
+            yield f.result()
+
+
+def _tarefas(n: int, bloco: int, seed: int, formato: str, inicio: str, dias: int) -> list[tuple]:
+    if formato not in ("kaggle", "normalizado"):
+        raise ValueError(f"formato inválido: {formato!r} (use 'kaggle' ou 'normalizado')")
+
+    qtd = -(-n // bloco) if n else 0
+    sementes = np.random.SeedSequence(seed).spawn(qtd)
+    return [(i, min(bloco, n - i * bloco), sementes[i], bloco, formato, inicio, dias) for i in range(qtd)]
+
+
+def gerar_blocos(n: int, bloco: int = BLOCO_PADRAO, seed: int = 42, formato: str = "kaggle",
+                 processos: int = 1, inicio: str = "2016-01-01", dias: int = 180):
+    """
+    Gera `n` agendamentos em blocos de até `bloco` linhas, em ordem.
+
+    Cada bloco tem seu próprio fluxo aleatório (SeedSequence(seed).spawn):
+    o resultado é o mesmo com 1 ou N processos. `formato` = "kaggle"
+    (colunas do CSV original) ou "normalizado" (schema em português do
+    load_data). AppointmentID cresce com a linha, como nas exportações.
+    """
+
+    yield from _executar(_gerar_bloco, _tarefas(n, bloco, seed, formato, inicio, dias), processos)
+
+
+def gerar_kaggle(n: int = 110_527, seed: int = 42, **kwargs) -> pd.DataFrame:
+    """
+    Dataset sintético inteiro no formato do Kaggle (para volumes que cabem
+    em memória; acima disso use `gravar_sintetico`).
+    """
+
+    return pd.concat(list(gerar_blocos(n, seed=seed, **kwargs)), ignore_index=True)
+
+
+def gravar_sintetico(n: int, destino: str, bloco: int = BLOCO_PADRAO, seed: int = 42,
+                     formato: str = "kaggle", processos: int = 1, inicio: str = "2016-01-01",
+                     dias: int = 180, sobrescrever: bool = False) -> int:
+    """
+    Grava `n` linhas sintéticas em `destino` (.csv ou .parquet) bloco a
+    bloco, sem montar o dataset inteiro em memória. Retorna as linhas gravadas.
+    Não substitui um arquivo existente sem `sobrescrever`.
+    """
+
+    if os.path.exists(destino) and not sobrescrever:
+        raise FileExistsError(f"{destino} já existe (use sobrescrever=True / --sobrescrever).")
+
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    tmp = f"{destino}.tmp"
+    tarefas = _tarefas(n, bloco, seed, formato, inicio, dias)
+
+    if not destino.lower().endswith(".parquet"):
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            for texto in _executar(_gerar_csv, tarefas, processos):
+                f.write(texto)
+        os.replace(tmp, destino)
+        return n
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for df in _executar(_gerar_bloco, tarefas, processos):
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                # Categóricas viram texto: blocos com dicionários diferentes
+                schema = pa.schema([
+                    pa.field(c.name, pa.string()) if pa.types.is_dictionary(c.type) else c
+                    for c in tabela.schema
+                ])
+                writer = pq.ParquetWriter(tmp, schema)
+            writer.write_table(tabela.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    os.replace(tmp, destino)
+    return n
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.data_generator",
+        description="Gera agendamentos sintéticos (formato Kaggle ou normalizado) para teste de carga.",
+    )
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--saida", default=SAIDA_PADRAO,
+                        help="arquivo .csv ou .parquet (padrão fora de data/raw, para não "
+                             "substituir a base real)")
+    parser.add_argument("--sobrescrever", action="store_true",
+                        help="substitui o arquivo de saída se ele já existir")
+    parser.add_argument("--formato", choices=["kaggle", "normalizado"], default="kaggle")
+    parser.add_argument("--bloco", type=int, default=BLOCO_PADRAO, help="linhas por bloco")
+    parser.add_argument("--processos", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--inicio", default="2016-01-01", help="primeira data de agendamento")
+    parser.add_argument("--dias", type=int, default=180, help="janela de datas de agendamento")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.saida) and not args.sobrescrever:
+        parser.error(f"{args.saida} já existe; use --sobrescrever para substituí-lo")
+
+    n = gravar_sintetico(
+        args.linhas, args.saida, args.bloco, args.seed, args.formato, args.processos,
+        inicio=args.inicio, dias=args.dias, sobrescrever=args.sobrescrever,
+    )
+    print(f"{n} linhas em {args.saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
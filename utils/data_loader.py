@@ -1,6 +1,28 @@
+import hashlib
+import json
 import os
+import numpy as np
 import pandas as pd
 
+from utils.instrumentation import medido
+
+
+# Versão do schema normalizado. Suba sempre que mudar colunas/regras de
+# `_normalizar` para invalidar os caches gravados com a versão anterior.
+SCHEMA_VERSION = 3
+
+CANAIS = ["SMS", "Sem SMS"]
+CATEGORICAS = ["canal_confirmacao", "bairro", "especialidade"]
+
+# Colunas do CSV do Kaggle usadas na normalização (o resto nem é lido)
+COLUNAS_ORIGEM = ["AppointmentID", "ScheduledDay", "AppointmentDay", "Age", "SMS_received", "Neighbourhood", "No-show"]
+
+CACHE_DIRNAME = "cache"
+
+# Acima deste tamanho o CSV é ingerido em blocos (memória limitada ao bloco)
+STREAMING_MIN_BYTES = int(os.environ.get("GENESIS_STREAMING_MIN_MB", "512")) * 1024 ** 2
+CHUNK_ROWS = 500_000
+
 
 def _resolve_path() -> str:
     """
@@ -28,14 +50,108 @@ def _resolve_path() -> str:
     )
 
 
-def load_data() -> pd.DataFrame:
+def versao_dados() -> str:
     """
-    Carrega o dataset do Kaggle (No-show appointments) e normaliza
-    para modelo executivo em português.
+    Identificador barato da versão dos dados de origem (`stat` do CSV +
+    metadados do cache). Formato `<base>+<nº de partes incrementais>`:
+    muda quando o CSV, o schema ou os incrementos mudam.
     """
 
-    DATA_PATH = _resolve_path()
-    df = pd.read_csv(DATA_PATH)
+    return f"{_base_versao()}+{len(partes_incrementais())}"
+
+
+def _base_versao() -> str:
+    data_path = _resolve_path()
+    st = os.stat(data_path)
+    return f"v{SCHEMA_VERSION}:{os.path.abspath(data_path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _cache_paths(data_path: str) -> tuple[str, str]:
+    """
+    Caminhos do cache colunar (Parquet) e do arquivo de metadados,
+    em uma pasta `cache/` ao lado do CSV bruto.
+    """
+
+    pasta = os.path.join(os.path.dirname(data_path), CACHE_DIRNAME)
+    nome = os.path.splitext(os.path.basename(data_path))[0]
+    return (
+        os.path.join(pasta, f"{nome}.parquet"),
+        os.path.join(pasta, f"{nome}.meta.json"),
+    )
+
+
+def _cubo_nome(cache_path: str, seq: int) -> str:
+    # Um arquivo por versão: o cubo anterior segue válido até o meta trocar
+    nome = os.path.splitext(os.path.basename(cache_path))[0]
+    return f"{nome}.cubo-{seq:05d}.parquet"
+
+
+def _parte_nome(cache_path: str, seq: int) -> str:
+    nome = os.path.splitext(os.path.basename(cache_path))[0]
+    return f"{nome}.delta-{seq:05d}.parquet"
+
+
+def _hash_arquivo(path: str, bloco: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for parte in iter(lambda: f.read(bloco), b""):
+            h.update(parte)
+    return h.hexdigest()
+
+
+def _ler_meta(meta_path: str) -> dict | None:
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_json_atomico(path: str, conteudo: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(conteudo, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _cache_valido(data_path: str, meta: dict | None) -> bool:
+    """
+    O cache vale se foi gravado com o schema atual e para o mesmo CSV.
+    Tamanho + mtime resolvem o caso comum sem ler o arquivo; se só o mtime
+    mudou (arquivo copiado/tocado), confirma pelo hash antes de reconstruir.
+    """
+
+    if not meta or meta.get("schema_version") != SCHEMA_VERSION:
+        return False
+
+    st = os.stat(data_path)
+    if meta.get("size") != st.st_size:
+        return False
+
+    if meta.get("mtime_ns") == st.st_mtime_ns:
+        return True
+
+    return meta.get("sha256") == _hash_arquivo(data_path)
+
+
+def _atualizar_mtime(data_path: str, meta: dict, meta_path: str) -> None:
+    # Conteúdo confirmado pelo hash: registra o novo mtime para não
+    # precisar re-hashear o arquivo na próxima carga.
+    meta["mtime_ns"] = os.stat(data_path).st_mtime_ns
+    try:
+        _gravar_json_atomico(meta_path, meta)
+    except OSError:
+        pass
+
+
+def _normalizar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza o formato do Kaggle (No-show appointments) para o modelo
+    executivo em português.
+
+    Tipos compactos: datas em datetime64 (dia), texto de baixa cardinalidade
+    em `category`, flags 0/1 em int8 e idade/antecedência em inteiros pequenos.
+    """
 
     # Datas
     df["ScheduledDay"] = pd.to_datetime(df["ScheduledDay"], utc=True, errors="coerce")
@@ -43,27 +159,28 @@ def load_data() -> pd.DataFrame:
 
     out = pd.DataFrame()
 
-    # Identificadores e datas
-    out["id_agendamento"] = df["AppointmentID"].astype(int)
-    out["data_agendamento"] = df["ScheduledDay"].dt.date
-    out["data_consulta"] = df["AppointmentDay"].dt.date
+    # Identificadores e datas (datetime64 normalizado no dia, em UTC)
+    out["id_agendamento"] = df["AppointmentID"].astype("int64")
+    out["data_agendamento"] = df["ScheduledDay"].dt.tz_convert(None).dt.normalize()
+    out["data_consulta"] = df["AppointmentDay"].dt.tz_convert(None).dt.normalize()
 
     # Perfil
-    out["idade"] = df["Age"].clip(lower=0)
-    out["idade_60_mais"] = (out["idade"] >= 60).astype(int)
+    out["idade"] = df["Age"].clip(lower=0).astype("int16")
+    out["idade_60_mais"] = (out["idade"] >= 60).astype("int8")
 
     # Canal (proxy: SMS recebido)
-    out["canal_confirmacao"] = (
+    out["canal_confirmacao"] = pd.Categorical(
         df["SMS_received"]
         .map({1: "SMS", 0: "Sem SMS"})
-        .fillna("Sem SMS")
+        .fillna("Sem SMS"),
+        categories=CANAIS,
     )
 
     # Localização (proxy de unidade)
-    out["bairro"] = df["Neighbourhood"].astype(str)
+    out["bairro"] = df["Neighbourhood"].astype(str).astype("category")
 
     # Especialidade (proxy fixo)
-    out["especialidade"] = "Geral"
+    out["especialidade"] = pd.Categorical.from_codes(np.zeros(len(df), dtype="int8"), ["Geral"])
 
     # Antecedência (dias e minutos)
     delta_minutes = (
@@ -73,11 +190,11 @@ def load_data() -> pd.DataFrame:
 
     delta_minutes = delta_minutes.fillna(0).clip(lower=0)
 
-    out["antecedencia_minutos"] = delta_minutes.round().astype(int)
-    out["antecedencia_dias"] = (delta_minutes / (60 * 24)).round().astype(int)
+    out["antecedencia_minutos"] = delta_minutes.round().astype("int32")
+    out["antecedencia_dias"] = (delta_minutes / (60 * 24)).round().astype("int16")
 
     # Todos são agendados nesse dataset
-    out["agendado"] = 1
+    out["agendado"] = np.ones(len(df), dtype="int8")
 
     # No-show
     out["faltou"] = (
@@ -87,12 +204,312 @@ def load_data() -> pd.DataFrame:
         .str.lower()
         .map({"yes": 1, "no": 0})
         .fillna(0)
-        .astype(int)
+        .astype("int8")
     )
 
-    out["compareceu"] = (out["faltou"] == 0).astype(int)
+    out["compareceu"] = (out["faltou"] == 0).astype("int8")
 
     # Proxy de valor
-    out["valor_medio"] = 150.0
+    out["valor_medio"] = np.full(len(df), 150.0, dtype="float32")
+
+    return out
+
+
+def _schema_arrow():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id_agendamento", pa.int64()),
+        ("data_agendamento", pa.timestamp("ns")),
+        ("data_consulta", pa.timestamp("ns")),
+        ("idade", pa.int16()),
+        ("idade_60_mais", pa.int8()),
+        ("canal_confirmacao", pa.string()),
+        ("bairro", pa.string()),
+        ("especialidade", pa.string()),
+        ("antecedencia_minutos", pa.int32()),
+        ("antecedencia_dias", pa.int16()),
+        ("agendado", pa.int8()),
+        ("faltou", pa.int8()),
+        ("compareceu", pa.int8()),
+        ("valor_medio", pa.float32()),
+    ])
+
+
+def _ajustar_tipos(out: pd.DataFrame) -> pd.DataFrame:
+    # Blocos diferentes geram dicionários em ordens diferentes: fixa a
+    # ordem das categorias para que o resultado não dependa da ingestão.
+    out["canal_confirmacao"] = out["canal_confirmacao"].cat.set_categories(CANAIS)
+    for col in ["bairro", "especialidade"]:
+        out[col] = out[col].cat.reorder_categories(sorted(out[col].cat.categories))
+    return out
+
+
+def alinhar_categorias(frames: list[pd.DataFrame], colunas: list[str]) -> list[pd.DataFrame]:
+    """
+    Unifica as categorias das `colunas` entre os frames antes de um concat
+    (categóricas com categorias diferentes viram object). Mantém a ordem
+    quando já são iguais; senão usa a união ordenada.
+    """
+
+    out = list(frames)
+    for col in colunas:
+        cats = [f[col].cat.categories for f in out if isinstance(f[col].dtype, pd.CategoricalDtype)]
+        if len(cats) != len(out) or all(c.equals(cats[0]) for c in cats):
+            continue
+        uniao = sorted(set().union(*cats))
+        out = [f.assign(**{col: f[col].cat.set_categories(uniao)}) for f in out]
+    return out
+
+
+def _ler_cache(cache_path: str, partes: list[str] = ()) -> pd.DataFrame | None:
+    """
+    Lê o Parquet base e, na ordem, as partes incrementais listadas.
+    """
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pasta = os.path.dirname(cache_path)
+        tabelas = [pq.read_table(cache_path, read_dictionary=CATEGORICAS)]
+        tabelas += [pq.read_table(os.path.join(pasta, p), read_dictionary=CATEGORICAS) for p in partes]
+        return _ajustar_tipos(pa.concat_tables(tabelas).to_pandas())
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+def _escrever_parquet(blocos, path: str) -> dict:
+    """
+    Grava blocos normalizados em `path` (um row group por bloco), somando o
+    cubo de KPIs bloco a bloco. Só um bloco fica em memória.
+    Escrita atômica (tmp + replace) para nunca deixar um arquivo pela metade.
+    """
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from utils.cube import CuboKpis
+
+    schema = _schema_arrow()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    linhas = 0
+    max_id = None
+    cubo = None
+    tmp = f"{path}.tmp"
+    with pq.ParquetWriter(tmp, schema) as writer:
+        for bloco in blocos:
+            if not len(bloco):
+                continue
+            writer.write_table(pa.Table.from_pandas(bloco, preserve_index=False).cast(schema))
+            linhas += len(bloco)
+            bloco_max = int(bloco["id_agendamento"].max())
+            max_id = bloco_max if max_id is None else max(max_id, bloco_max)
+
+            parcial = CuboKpis.de_dataframe(bloco)
+            cubo = parcial if cubo is None else CuboKpis.combinar([cubo.celulas, parcial.celulas])
+
+    os.replace(tmp, path)
+    return {"linhas": linhas, "max_id": max_id, "cubo": cubo}
+
+
+def _gravar_cache(blocos, data_path: str, cache_path: str, meta_path: str) -> dict:
+    """
+    Grava o cache base (Parquet + cubo) e os metadados da origem.
+    As partes incrementais da base anterior são descartadas e as
+    exportações diárias da pasta são re-ingeridas sobre a nova base
+    (só as linhas acima da marca d'água dela). Retorna o meta final.
+    """
+
+    res = _escrever_parquet(blocos, cache_path)
+
+    cubo = None
+    if res["cubo"] is not None:
+        cubo = _cubo_nome(cache_path, 0)
+        res["cubo"].salvar(os.path.join(os.path.dirname(cache_path), cubo))
+
+    st = os.stat(data_path)
+    meta = {
+        "schema_version": SCHEMA_VERSION,
+        "source": os.path.basename(data_path),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": _hash_arquivo(data_path),
+        "rows": res["linhas"],
+        "max_id": res["max_id"],
+        "cubo": cubo,
+        "partes": [],
+    }
+    _gravar_json_atomico(meta_path, meta)
+    limpar_orfaos(cache_path, meta)
+    return _reaplicar_partes(data_path, meta_path) or meta
+
+
+def _reaplicar_partes(data_path: str, meta_path: str) -> dict | None:
+    # Sem isso a base reconstruída ficaria sem os incrementos até o
+    # próximo `python -m utils.ingest`
+    from utils.ingest import atualizar
+
+    if not atualizar(data_path):
+        return None
+    return _ler_meta(meta_path)
+
+
+def _arquivos_partes(meta: dict) -> list[str]:
+    return [p["arquivo"] for p in meta.get("partes", []) if p.get("arquivo")]
+
+
+def limpar_orfaos(cache_path: str, meta: dict) -> None:
+    """
+    Remove cubos/partes deste cache que o meta atual não referencia mais.
+    """
+
+    pasta = os.path.dirname(cache_path)
+    nome = os.path.splitext(os.path.basename(cache_path))[0]
+    em_uso = {meta.get("cubo")} | {p.get("arquivo") for p in meta.get("partes", [])}
+    for arquivo in os.listdir(pasta):
+        if arquivo.startswith((f"{nome}.cubo-", f"{nome}.delta-")) and arquivo not in em_uso:
+            try:
+                os.remove(os.path.join(pasta, arquivo))
+            except OSError:
+                pass
+
+
+def ingerir_em_blocos(data_path: str | None = None, chunksize: int = CHUNK_ROWS) -> dict:
+    """
+    Ingestão em streaming: lê o CSV em blocos de `chunksize` linhas,
+    normaliza cada bloco com as mesmas regras de `_normalizar` e anexa ao
+    cache Parquet e ao cubo pré-agregado. O pico de memória é da ordem de
+    um bloco, não do arquivo. Retorna os metadados gravados.
+    """
+
+    data_path = data_path or _resolve_path()
+    cache_path, meta_path = _cache_paths(data_path)
+
+    blocos = (
+        _normalizar(bloco)
+        for bloco in pd.read_csv(data_path, usecols=COLUNAS_ORIGEM, chunksize=chunksize)
+    )
+    return _gravar_cache(blocos, data_path, cache_path, meta_path)
+
+
+def arquivos_cache() -> list[str]:
+    """
+    Arquivos Parquet (base + partes incrementais) do cache do CSV atual,
+    para motores que leem o Parquet direto (DuckDB) sem passar pelo pandas.
+    Sem cache válido, ingere o CSV em blocos primeiro.
+    """
+
+    data_path = _resolve_path()
+    cache_path, _ = _cache_paths(data_path)
+    meta = garantir_cache(data_path)
+
+    pasta = os.path.dirname(cache_path)
+    return [cache_path] + [os.path.join(pasta, p) for p in _arquivos_partes(meta)]
+
+
+def garantir_cache(data_path: str | None = None) -> dict:
+    """
+    Metadados de um cache válido para o CSV atual; sem ele, ingere o CSV em
+    blocos (reaplicando as partes incrementais) antes. Barato quando o cache
+    já vale: só lê o meta.
+    """
+
+    data_path = data_path or _resolve_path()
+    cache_path, meta_path = _cache_paths(data_path)
+    meta = _ler_meta(meta_path)
+    if meta and os.path.exists(cache_path) and _cache_valido(data_path, meta):
+        return meta
+    return ingerir_em_blocos(data_path)
+
+
+def partes_incrementais() -> list[str]:
+    """
+    Partes incrementais (arquivos Parquet em `cache/`) já anexadas à base,
+    na ordem de ingestão.
+    """
+
+    data_path = _resolve_path()
+    _, meta_path = _cache_paths(data_path)
+    meta = _ler_meta(meta_path) or {}
+    return _arquivos_partes(meta)
+
+
+def load_delta(partes: list[str]) -> pd.DataFrame | None:
+    """
+    Lê só as partes incrementais indicadas (para anexar a uma base já em memória).
+    """
+
+    cache_path, _ = _cache_paths(_resolve_path())
+    if not partes:
+        return None
+    primeira, resto = partes[0], list(partes[1:])
+    return _ler_cache(os.path.join(os.path.dirname(cache_path), primeira), resto)
+
+
+def load_cube():
+    """
+    Cubo de KPIs gravado junto do cache (utils.cube.CuboKpis), já somado
+    com as partes incrementais, ou None se não houver cubo válido para o
+    CSV atual.
+    """
+
+    from utils.cube import CuboKpis
+
+    data_path = _resolve_path()
+    cache_path, meta_path = _cache_paths(data_path)
+    meta = _ler_meta(meta_path)
+    if not meta or not meta.get("cubo") or not _cache_valido(data_path, meta):
+        return None
+
+    try:
+        return CuboKpis.carregar(os.path.join(os.path.dirname(cache_path), meta["cubo"]))
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+@medido("load_data")
+def load_data(use_cache: bool = True, chunksize: int | None = None) -> pd.DataFrame:
+    """
+    Carrega o dataset do Kaggle (No-show appointments) e normaliza
+    para modelo executivo em português.
+
+    Com `use_cache`, lê o Parquet normalizado em `cache/` ao lado do CSV
+    quando ele corresponde ao CSV atual; caso contrário normaliza o CSV
+    e regrava o cache. CSVs grandes (ou com `chunksize`) são ingeridos em
+    blocos direto para o cache, sem montar o frame bruto inteiro.
+    """
+
+    DATA_PATH = _resolve_path()
+    cache_path, meta_path = _cache_paths(DATA_PATH)
+
+    meta = _ler_meta(meta_path) if use_cache else None
+    if meta and os.path.exists(cache_path) and _cache_valido(DATA_PATH, meta):
+        out = _ler_cache(cache_path, _arquivos_partes(meta))
+        if out is not None:
+            if meta["mtime_ns"] != os.stat(DATA_PATH).st_mtime_ns:
+                _atualizar_mtime(DATA_PATH, meta, meta_path)
+            return out
+
+    if use_cache and (chunksize or os.stat(DATA_PATH).st_size >= STREAMING_MIN_BYTES):
+        meta = ingerir_em_blocos(DATA_PATH, chunksize or CHUNK_ROWS)
+        out = _ler_cache(cache_path, _arquivos_partes(meta))
+        if out is not None:
+            return out
+
+    df = pd.read_csv(DATA_PATH, usecols=COLUNAS_ORIGEM)
+    out = _normalizar(df)
+
+    # Sem pyarrow/permissão de escrita o cache é simplesmente ignorado
+    if use_cache:
+        try:
+            meta = _gravar_cache([out], DATA_PATH, cache_path, meta_path)
+        except (ImportError, OSError, ValueError):
+            meta = None
+        partes = _arquivos_partes(meta or {})
+        completo = _ler_cache(cache_path, partes) if partes else None
+        if completo is not None:
+            out = completo
 
     return out
@@ -0,0 +1,247 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Inferência do modelo linear em NumPy puro: o pipeline do sklearn
+# (ColumnTransformer → OneHotEncoder → matriz esparsa → predict_proba) vira
+# um peso por categoria (lookup pelos códigos inteiros) + produto escalar das
+# numéricas. Só é usado depois de conferido contra o pipeline original (ao
+# treinar ou carregar o modelo, nunca no caminho de uma requisição);
+# modelos não lineares (gradient boosting) seguem pelo pipeline.
+# GENESIS_SCORER_RAPIDO=0 desliga.
+SCORER_ATIVO = os.environ.get("GENESIS_SCORER_RAPIDO", "1") != "0"
+TOLERANCIA = 1e-9
+
+
+class ScorerLinear:
+    """
+    risco = sigmoide(intercepto + Σ peso[categoria] + numericas · coef).
+    `categoricas`: coluna -> (categorias, pesos, peso para valor desconhecido).
+    """
+
+    def __init__(self, categoricas: dict, numericas: list[str], coef: np.ndarray, intercepto: float):
+        self.categoricas = {
+            col: (pd.Index([str(c) for c in cats]), np.asarray(pesos, dtype=np.float64), float(desconhecido))
+            for col, (cats, pesos, desconhecido) in categoricas.items()
+        }
+        self.numericas = list(numericas)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercepto = float(intercepto)
+
+    @property
+    def features(self) -> list[str]:
+        return list(self.categoricas) + self.numericas
+
+    def _pesos(self, s: pd.Series, col: str) -> np.ndarray:
+        cats, pesos, desconhecido = self.categoricas[col]
+        # Mapeia só os valores distintos; por linha é um gather pelos códigos
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codigos, valores = np.asarray(s.array.codes), s.cat.categories
+        else:
+            codigos, valores = pd.factorize(s)
+        mapa = cats.get_indexer(pd.Index(valores).astype(str))
+        por_valor = np.append(np.where(mapa >= 0, pesos[mapa], desconhecido), desconhecido)
+        return por_valor[codigos]
+
+    def decisao(self, df: pd.DataFrame) -> np.ndarray:
+        z = df[self.numericas].to_numpy(dtype=np.float64) @ self.coef
+        z += self.intercepto
+        for col in self.categoricas:
+            z += self._pesos(df[col], col)
+        return z
+
+    def pontuar(self, df: pd.DataFrame) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-self.decisao(df)))
+
+    def predict_proba(self, df: pd.DataFrame) -> np.ndarray:
+        p = self.pontuar(df)
+        return np.column_stack([1.0 - p, p])
+
+
+def _de_pipeline(pipe) -> ScorerLinear | None:
+    # Pipeline do treinar_modelo_no_show / seleção: one-hot + passthrough +
+    # LogisticRegression binária
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+
+    pre, clf = pipe.named_steps.get("pre"), pipe.named_steps.get("clf")
+    if not isinstance(clf, LogisticRegression) or clf.coef_.shape[0] != 1 or pre is None:
+        return None
+
+    coef = clf.coef_[0]
+    categoricas, numericas, coef_num = {}, [], []
+    for nome, trans, colunas in pre.transformers_:
+        if nome == "remainder" and trans == "drop":
+            continue
+        fatia = coef[pre.output_indices_[nome]]
+        if isinstance(trans, OneHotEncoder):
+            if trans.drop is not None:
+                return None
+            inicio = 0
+            for col, cats in zip(colunas, trans.categories_):
+                # handle_unknown="ignore": valor desconhecido = linha de zeros
+                categoricas[col] = (list(cats), fatia[inicio:inicio + len(cats)], 0.0)
+                inicio += len(cats)
+        elif trans == "passthrough" or (isinstance(trans, FunctionTransformer) and trans.func is None):
+            # "passthrough" ajustado vira FunctionTransformer identidade
+            numericas += list(colunas)
+            coef_num += list(fatia)
+        else:
+            return None
+
+    return ScorerLinear(categoricas, numericas, np.array(coef_num), clf.intercept_[0])
+
+
+def _de_incremental(modelo) -> ScorerLinear:
+    # Numéricas padronizadas: (x - média) / escala vira coef / escala e
+    # ajuste no intercepto
+    from utils.model import NUMERICAS_MODELO
+
+    cod = modelo.codificador
+    coef = modelo.clf.coef_[0]
+    n_canais, n_bairros = len(cod.canais), len(cod.bairros)
+    pesos_canal = coef[:n_canais]
+    pesos_bairro = coef[n_canais:n_canais + n_bairros]
+    coef_num = coef[n_canais + n_bairros:] / cod.escala
+    intercepto = modelo.clf.intercept_[0] - float(np.sum(coef_num * cod.media))
+
+    return ScorerLinear(
+        {
+            # Desconhecidos: canal vira "Sem SMS", bairro vira "(outros)" (último)
+            "canal_confirmacao": (cod.canais, pesos_canal, pesos_canal[cod.canais.index("Sem SMS")]),
+            "bairro": (cod.bairros, pesos_bairro, pesos_bairro[-1]),
+        },
+        list(NUMERICAS_MODELO),
+        coef_num,
+        intercepto,
+    )
+
+
+def exportar(modelo) -> ScorerLinear | None:
+    """
+    ScorerLinear equivalente ao pipeline (ou ModeloIncremental), ou None se
+    o modelo não for linear nesse formato.
+    """
+
+    from sklearn.pipeline import Pipeline
+
+    from utils.model_incremental import ModeloIncremental
+
+    if isinstance(modelo, ModeloIncremental):
+        return _de_incremental(modelo)
+    if isinstance(modelo, Pipeline):
+        return _de_pipeline(modelo)
+    return None
+
+
+def amostra_verificacao(scorer: ScorerLinear, n: int = 5000, seed: int = 42) -> pd.DataFrame:
+    """
+    Linhas sintéticas cobrindo todas as categorias conhecidas (mais uma
+    desconhecida por coluna) e numéricas em faixas realistas.
+    """
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        col: rng.choice(list(cats) + ["__desconhecido__"], n)
+        for col, (cats, _, _) in scorer.categoricas.items()
+    })
+    idade = rng.integers(0, 100, n)
+    minutos = rng.integers(0, 180 * 24 * 60, n)
+    numericas = {
+        "idade": idade,
+        "idade_60_mais": (idade >= 60).astype(np.int8),
+        "antecedencia_minutos": minutos,
+        "antecedencia_dias": np.round(minutos / (60 * 24)).astype(np.int16),
+    }
+    for col in scorer.numericas:
+        df[col] = numericas.get(col, rng.normal(size=n))
+    return df
+
+
+def verificar_paridade(scorer: ScorerLinear, modelo, df: pd.DataFrame | None = None) -> float:
+    """
+    Maior diferença absoluta entre o risco do scorer e o `predict_proba` do
+    modelo original em `df` (padrão: amostra sintética).
+    """
+
+    df = amostra_verificacao(scorer) if df is None else df
+    esperado = modelo.predict_proba(df)[:, 1]
+    return float(np.max(np.abs(scorer.pontuar(df) - esperado))) if len(df) else 0.0
+
+
+def preparar_rapido(model_pack: dict | None) -> dict | None:
+    """
+    Exporta o scorer NumPy do model_pack e o confere contra o pipeline,
+    guardando o resultado em `model_pack["rapido"]` (None quando desligado,
+    não linear ou se a conferência divergir). Chamado uma vez, ao treinar ou
+    carregar o modelo, antes de o pack ser compartilhado.
+    """
+
+    if model_pack is None:
+        return None
+    scorer = exportar(model_pack["pipeline"]) if SCORER_ATIVO else None
+    if scorer is not None and verificar_paridade(scorer, model_pack["pipeline"]) > TOLERANCIA:
+        scorer = None
+    model_pack["rapido"] = scorer
+    return model_pack
+
+
+def scorer_rapido(model_pack: dict | None) -> ScorerLinear | None:
+    """
+    Scorer NumPy preparado por `preparar_rapido`, ou None: quem chama usa o
+    pipeline. Só lê o model_pack (compartilhado entre sessões e threads).
+    """
+
+    if not SCORER_ATIVO or model_pack is None:
+        return None
+    return model_pack.get("rapido")
+
+
+def main(argv=None) -> int:
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.fast_scorer",
+        description="Confere o scorer NumPy do modelo promovido contra o pipeline na base atual.",
+    )
+    parser.add_argument("-n", type=int, default=None, help="linhas da base (padrão: todas)")
+    args = parser.parse_args(argv)
+
+    from utils.data_loader import load_data
+    from utils.model_registry import carregar_modelo
+
+    model_pack = carregar_modelo()
+    if model_pack is None:
+        print("Nenhum modelo promovido no registro.")
+        return 1
+    scorer = exportar(model_pack["pipeline"])
+    if scorer is None:
+        print(f"Modelo {model_pack['versao']} não é linear: a pontuação segue pelo pipeline.")
+        return 0
+
+    df = load_data()
+    df = df[df["agendado"] == 1]
+    if args.n:
+        df = df.iloc[:args.n]
+
+    t0 = time.perf_counter()
+    esperado = model_pack["pipeline"].predict_proba(df[model_pack["features"]])[:, 1]
+    t_pipeline = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    risco = scorer.pontuar(df)
+    t_numpy = time.perf_counter() - t0
+
+    diff = float(np.max(np.abs(risco - esperado))) if len(df) else 0.0
+    sintetica = verificar_paridade(scorer, model_pack["pipeline"])
+    print(
+        f"{len(df):,} linhas: pipeline {t_pipeline * 1000:.0f} ms | NumPy {t_numpy * 1000:.0f} ms | ".replace(",", ".")
+        + f"diferença máx. {diff:.1e} (amostra sintética {sintetica:.1e})"
+    )
+    return 0 if max(diff, sintetica) <= TOLERANCIA else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import CATEGORICAS, alinhar_categorias
+from utils.instrumentation import medido
+
+
+COLUNA_DATA = "data_agendamento"
+COLUNAS_INDEXADAS = ["canal_confirmacao", "bairro"]
+
+
+def _posicoes_por_valor(s: pd.Series) -> dict:
+    """
+    Para uma coluna categórica, devolve {valor: posições das linhas} com as
+    posições em ordem crescente (argsort estável sobre os códigos).
+    Linhas sem valor (código -1) ficam de fora.
+    """
+
+    codes = s.cat.codes.to_numpy()
+    ordem = np.argsort(codes, kind="stable").astype(np.int64)
+    contagem = np.bincount(codes[codes >= 0], minlength=len(s.cat.categories))
+
+    inicio = int((codes < 0).sum())
+    out = {}
+    for valor, n in zip(s.cat.categories, contagem):
+        if n:
+            out[valor] = ordem[inicio:inicio + n]
+        inicio += n
+    return out
+
+
+class IndiceFiltros:
+    """
+    Motor de filtros da sidebar.
+
+    Mantém o dataset ordenado por `data_agendamento` (período vira um corte
+    por `searchsorted`) e, para canal e bairro, as posições das linhas de
+    cada valor. Filtrar só toca nas linhas selecionadas: sem máscaras do
+    tamanho da base e sem cópia quando só o período é filtrado.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        if not df[COLUNA_DATA].is_monotonic_increasing:
+            df = df.sort_values(COLUNA_DATA, kind="stable").reset_index(drop=True)
+
+        self.df = df
+        self._datas = df[COLUNA_DATA].to_numpy()
+        self._codigos = {c: np.asarray(df[c].array.codes) for c in COLUNAS_INDEXADAS}
+        self._posicoes = {
+            c: {v: (pos,) for v, pos in _posicoes_por_valor(df[c]).items()} for c in COLUNAS_INDEXADAS
+        }
+
+    @classmethod
+    def de_posicoes(cls, df: pd.DataFrame, posicoes: dict) -> "IndiceFiltros":
+        """
+        Índice com as posições por valor já calculadas (ex.: mapeadas do
+        disco), sem reordenar nem refazer o argsort. `df` já vem ordenado
+        por data; `posicoes[col][valor]` é uma tupla de segmentos (arrays
+        crescentes, cada um depois do anterior).
+        """
+
+        novo = object.__new__(cls)
+        novo.df = df
+        novo._datas = df[COLUNA_DATA].to_numpy()
+        novo._codigos = {c: np.asarray(df[c].array.codes) for c in COLUNAS_INDEXADAS}
+        novo._posicoes = posicoes
+        return novo
+
+    def anexar(self, delta: pd.DataFrame) -> "IndiceFiltros":
+        """
+        Novo índice com as linhas de `delta` ao final (ingestão incremental).
+        Quando o delta só traz datas ≥ a última da base, a ordem se mantém e
+        as posições do delta entram como um segmento novo por valor, sem
+        copiar as da base; senão o índice é reconstruído.
+        """
+
+        if delta is None or delta.empty:
+            return self
+
+        base, delta = alinhar_categorias([self.df, delta], CATEGORICAS)
+        df = pd.concat([base, delta], ignore_index=True)
+
+        datas_delta = delta[COLUNA_DATA].to_numpy()
+        em_ordem = delta[COLUNA_DATA].is_monotonic_increasing and (
+            not len(self._datas) or (not np.isnat(self._datas[-1]) and datas_delta[0] >= self._datas[-1])
+        )
+        if not em_ordem:
+            return IndiceFiltros(df)
+
+        posicoes = {}
+        offset = len(base)
+        for c in COLUNAS_INDEXADAS:
+            por_valor = dict(self._posicoes[c])
+            for valor, pos in _posicoes_por_valor(delta[c]).items():
+                por_valor[valor] = por_valor.get(valor, ()) + (pos + offset,)
+            posicoes[c] = por_valor
+        return IndiceFiltros.de_posicoes(df, posicoes)
+
+    def valores(self, col: str) -> list:
+        """Valores presentes na base (opções do filtro), em ordem alfabética."""
+        return sorted(self._posicoes[col].keys())
+
+    def periodo(self) -> tuple:
+        datas = self.df[COLUNA_DATA].dropna()
+        return datas.min(), datas.max()
+
+    def memoria_bytes(self) -> int:
+        return int(sum(
+            p.nbytes for por_valor in self._posicoes.values() for segs in por_valor.values() for p in segs
+        ))
+
+    def _corte_periodo(self, inicio, fim) -> tuple[int, int]:
+        lo = 0 if inicio is None else int(np.searchsorted(self._datas, np.datetime64(pd.Timestamp(inicio)), "left"))
+        hi = len(self._datas) if fim is None else int(np.searchsorted(self._datas, np.datetime64(pd.Timestamp(fim)), "right"))
+        return lo, max(lo, hi)
+
+    def _candidatos(self, col: str, valores, lo: int, hi: int) -> np.ndarray:
+        por_valor = self._posicoes[col]
+        presentes = [v for v in valores if v in por_valor]
+
+        # Corta cada segmento no período antes de juntar: só copia o que passa
+        partes = [
+            pos[np.searchsorted(pos, lo, "left"):np.searchsorted(pos, hi, "left")]
+            for v in presentes for pos in por_valor[v]
+        ]
+        partes = [p for p in partes if len(p)]
+        if not partes:
+            return np.empty(0, dtype=np.int64)
+        if len(partes) == 1:
+            return partes[0]
+
+        # Segmentos de um mesmo valor já vêm em ordem; de valores diferentes, não
+        pos = np.concatenate(partes)
+        return pos if len(presentes) == 1 else np.sort(pos)
+
+    def posicoes(self, inicio=None, fim=None, canais=None, bairros=None):
+        """
+        Posições (em `self.df`) das linhas que passam nos filtros.
+        Devolve um `slice` quando só o período filtra, senão um array ordenado.
+        `canais`/`bairros` vazios ou None = todos.
+        """
+
+        lo, hi = self._corte_periodo(inicio, fim)
+
+        selecao = [(c, v) for c, v in zip(COLUNAS_INDEXADAS, (canais, bairros)) if v]
+        if not selecao:
+            return slice(lo, hi)
+
+        # Parte do filtro mais seletivo e confere os demais pelos códigos
+        candidatos = [(self._candidatos(c, v, lo, hi), c, v) for c, v in selecao]
+        candidatos.sort(key=lambda t: len(t[0]))
+        pos = candidatos[0][0]
+
+        for _, col, valores in candidatos[1:]:
+            cats = self.df[col].cat.categories
+            codigos = cats.get_indexer(pd.Index(list(valores)))
+            pos = pos[np.isin(self._codigos[col][pos], codigos[codigos >= 0])]
+
+        return pos
+
+    @medido("filtros.filtrar")
+    def filtrar(self, inicio=None, fim=None, canais=None, bairros=None) -> pd.DataFrame:
+        """
+        Recorte filtrado do dataset (período inclusivo nas duas pontas).
+        """
+
+        pos = self.posicoes(inicio, fim, canais, bairros)
+        if isinstance(pos, slice):
+            return self.df.iloc[pos]
+        return self.df.take(pos)
@@ -0,0 +1,156 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from utils.cube import CuboKpis
+from utils.data_loader import (
+    CHUNK_ROWS,
+    COLUNAS_ORIGEM,
+    _cache_paths,
+    _cache_valido,
+    _cubo_nome,
+    _escrever_parquet,
+    _gravar_json_atomico,
+    _ler_meta,
+    _normalizar,
+    _parte_nome,
+    _resolve_path,
+    limpar_orfaos,
+    load_data,
+)
+
+
+def novos_arquivos(data_path: str, meta: dict) -> list[str]:
+    """
+    CSVs da pasta do arquivo principal (ex.: exportações diárias
+    `noshowappointments_2026-10-16.csv`) ainda não ingeridos — ou que
+    mudaram desde a última ingestão.
+    """
+
+    pasta = os.path.dirname(data_path) or "."
+    vistos = {(p["origem"], p["size"], p["mtime_ns"]) for p in meta.get("partes", [])}
+
+    out = []
+    for nome in sorted(os.listdir(pasta)):
+        path = os.path.join(pasta, nome)
+        if not nome.lower().endswith(".csv") or os.path.abspath(path) == os.path.abspath(data_path):
+            continue
+        st = os.stat(path)
+        if (nome, st.st_size, st.st_mtime_ns) not in vistos:
+            out.append(path)
+    return out
+
+
+def _meta_base(data_path: str) -> dict:
+    # Incrementos só fazem sentido sobre um cache base válido
+    _, meta_path = _cache_paths(data_path)
+    meta = _ler_meta(meta_path)
+    if not meta or not _cache_valido(data_path, meta):
+        load_data()
+        meta = _ler_meta(meta_path)
+    if not meta:
+        raise RuntimeError("Não foi possível gravar o cache base (pyarrow instalado?).")
+    return meta
+
+
+def ingerir_incremento(arquivo: str, data_path: str | None = None, chunksize: int = CHUNK_ROWS) -> dict:
+    """
+    Normaliza só as linhas novas de `arquivo` (AppointmentID acima da marca
+    d'água do cache), grava-as como parte incremental, soma o cubo delta ao
+    cubo gravado e atualiza os metadados. O custo é proporcional ao arquivo
+    do dia, não ao histórico.
+    """
+
+    data_path = data_path or _resolve_path()
+    cache_path, meta_path = _cache_paths(data_path)
+    pasta = os.path.dirname(cache_path)
+
+    meta = _meta_base(data_path)
+    max_id = meta.get("max_id")
+    seq = len(meta.get("partes", [])) + 1
+
+    def blocos():
+        for bruto in pd.read_csv(arquivo, usecols=COLUNAS_ORIGEM, chunksize=chunksize):
+            if max_id is not None:
+                bruto = bruto[bruto["AppointmentID"] > max_id]
+            if len(bruto):
+                yield _normalizar(bruto.reset_index(drop=True))
+
+    parte = _parte_nome(cache_path, seq)
+    res = _escrever_parquet(blocos(), os.path.join(pasta, parte))
+
+    st = os.stat(arquivo)
+    registro = {
+        "origem": os.path.basename(arquivo),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "linhas": res["linhas"],
+        "arquivo": parte if res["linhas"] else None,
+    }
+
+    if res["linhas"]:
+        cubo = res["cubo"]
+        if meta.get("cubo"):
+            atual = CuboKpis.carregar(os.path.join(pasta, meta["cubo"]))
+            cubo = CuboKpis.combinar([atual.celulas, cubo.celulas])
+        meta["cubo"] = _cubo_nome(cache_path, seq)
+        cubo.salvar(os.path.join(pasta, meta["cubo"]))
+
+        meta["rows"] = int(meta.get("rows", 0)) + res["linhas"]
+        meta["max_id"] = res["max_id"] if max_id is None else max(max_id, res["max_id"])
+
+    # O meta é a fonte da verdade: trocá-lo (atômico) é o que publica a parte
+    meta.setdefault("partes", []).append(registro)
+    _gravar_json_atomico(meta_path, meta)
+    limpar_orfaos(cache_path, meta)
+    return registro
+
+
+def atualizar(data_path: str | None = None, chunksize: int = CHUNK_ROWS) -> list[dict]:
+    """
+    Ingere todos os CSVs novos da pasta de dados. O dashboard percebe a
+    nova versão (`versao_dados`) no próximo rerun e anexa só o delta.
+    """
+
+    data_path = data_path or _resolve_path()
+    meta = _meta_base(data_path)
+    return [ingerir_incremento(arq, data_path, chunksize) for arq in novos_arquivos(data_path, meta)]
+
+
+def observar(intervalo: float = 60.0, data_path: str | None = None) -> None:
+    """
+    Loop de observação da pasta de dados (polling, sem dependências extras).
+    """
+
+    while True:
+        for r in atualizar(data_path):
+            print(f"{r['origem']}: {r['linhas']} linhas novas")
+        time.sleep(intervalo)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.ingest",
+        description="Ingestão incremental de novas exportações CSV em data/raw/.",
+    )
+    parser.add_argument("--observar", action="store_true", help="fica observando a pasta")
+    parser.add_argument("--intervalo", type=float, default=60.0, help="segundos entre verificações")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    if args.observar:
+        observar(args.intervalo)
+        return 0
+
+    registros = atualizar(chunksize=args.chunksize)
+    for r in registros:
+        print(f"{r['origem']}: {r['linhas']} linhas novas")
+    if not registros:
+        print("Nenhum arquivo novo.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
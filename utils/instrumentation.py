@@ -0,0 +1,194 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+
+# GENESIS_DIAG=1 mostra o painel "Diagnóstico" para todos (sem isso, só com
+# ?diag=1 na URL). GENESIS_DIAG_LOG aponta um arquivo JSONL que recebe as
+# medições de cada rerun.
+DIAG_ATIVO = os.environ.get("GENESIS_DIAG", "0") == "1"
+DIAG_LOG = os.environ.get("GENESIS_DIAG_LOG")
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+def _rss_mb() -> float | None:
+    # RSS atual do processo (Linux); barato o bastante para cada medição
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _linhas(valor) -> int | None:
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return int(len(valor))
+    if isinstance(valor, tuple):
+        for v in valor:
+            n = _linhas(v)
+            if n is not None:
+                return n
+    return None
+
+
+class Rerun:
+    """
+    Medições de um rerun (uma execução do script numa sessão): cada trecho
+    medido vira um registro com tempo, tempo próprio (sem os trechos
+    internos), linhas processadas e variação do RSS do processo.
+    """
+
+    def __init__(self, contexto: dict | None = None):
+        self.contexto = contexto or {}
+        self.registros = []
+        self._pilha = []
+        self._inicio = time.perf_counter()
+        self.total_s = None
+
+    def abrir(self, nome: str, linhas: int | None) -> dict:
+        reg = {
+            "nome": nome,
+            "nivel": len(self._pilha),
+            "linhas": linhas,
+            "_t0": time.perf_counter(),
+            "_rss0": _rss_mb(),
+            "_filhos_s": 0.0,
+        }
+        self.registros.append(reg)
+        self._pilha.append(reg)
+        return reg
+
+    def fechar(self, reg: dict, resultado=None) -> None:
+        tempo = time.perf_counter() - reg.pop("_t0")
+        rss0 = reg.pop("_rss0")
+        rss1 = _rss_mb()
+        filhos = reg.pop("_filhos_s")
+
+        reg["tempo_s"] = tempo
+        reg["proprio_s"] = max(tempo - filhos, 0.0)
+        reg["memoria_delta_mb"] = None if rss0 is None or rss1 is None else rss1 - rss0
+        if reg["linhas"] is None:
+            reg["linhas"] = _linhas(resultado)
+
+        self._pilha.pop()
+        if self._pilha:
+            self._pilha[-1]["_filhos_s"] += tempo
+
+    def finalizar(self) -> None:
+        self.total_s = time.perf_counter() - self._inicio
+
+    def tabela(self) -> pd.DataFrame:
+        linhas = [{
+            "trecho": "  " * r["nivel"] + r["nome"],
+            "tempo_ms": r["tempo_s"] * 1000,
+            "proprio_ms": r["proprio_s"] * 1000,
+            "linhas": r["linhas"],
+            "memoria_delta_mb": r["memoria_delta_mb"],
+        } for r in self.registros if "tempo_s" in r]
+        return pd.DataFrame(linhas, columns=["trecho", "tempo_ms", "proprio_ms", "linhas", "memoria_delta_mb"])
+
+
+def rerun_atual() -> Rerun | None:
+    return getattr(_local, "rerun", None)
+
+
+def iniciar_rerun(**contexto) -> Rerun:
+    """
+    Começa a coletar as medições desta thread (um rerun do Streamlit).
+    Fora de um rerun, funções medidas rodam sem custo extra.
+    """
+
+    _local.rerun = Rerun(contexto)
+    return _local.rerun
+
+
+def finalizar_rerun(path: str | None = None) -> Rerun | None:
+    """
+    Fecha o rerun desta thread e, com `path` (padrão GENESIS_DIAG_LOG),
+    anexa um registro JSON por trecho medido.
+    """
+
+    rerun = rerun_atual()
+    _local.rerun = None
+    if rerun is None:
+        return None
+    rerun.finalizar()
+
+    path = path or DIAG_LOG
+    if path:
+        agora = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        linhas = [
+            json.dumps({"ts": agora, **rerun.contexto, "total_rerun_s": rerun.total_s, **r}, ensure_ascii=False, default=str)
+            for r in rerun.registros if "tempo_s" in r
+        ]
+        with _log_lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n".join(linhas) + "\n")
+    return rerun
+
+
+@contextmanager
+def trecho(nome: str, linhas: int | None = None):
+    """
+    Mede um bloco de código dentro do rerun atual.
+    """
+
+    rerun = rerun_atual()
+    if rerun is None:
+        yield
+        return
+
+    reg = rerun.abrir(nome, linhas)
+    try:
+        yield
+    finally:
+        rerun.fechar(reg)
+
+
+def medido(nome: str | None = None):
+    """
+    Decorator: mede cada chamada da função no rerun atual. Linhas
+    processadas = tamanho do primeiro DataFrame dos argumentos (ou do
+    resultado).
+    """
+
+    def decorar(funcao):
+        rotulo = nome or funcao.__qualname__
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            rerun = rerun_atual()
+            if rerun is None:
+                return funcao(*args, **kwargs)
+
+            entrada = next((len(a) for a in list(args) + list(kwargs.values()) if isinstance(a, pd.DataFrame)), None)
+            reg = rerun.abrir(rotulo, entrada)
+            resultado = None
+            try:
+                resultado = funcao(*args, **kwargs)
+                return resultado
+            finally:
+                rerun.fechar(reg, resultado)
+
+        return envolvida
+
+    return decorar
+
+
+def plotly_chart(fig, **kwargs):
+    """
+    `st.plotly_chart` medido: separa a serialização do gráfico do resto da aba.
+    """
+
+    import streamlit as st
+
+    with trecho("plotly_chart"):
+        return st.plotly_chart(fig, **kwargs)
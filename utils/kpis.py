@@ -1,91 +1,264 @@
 import pandas as pd
 import numpy as np
 
-def compute_exec_kpis(df: pd.DataFrame) -> dict:
-    agendados = int(df["agendado"].sum())
-    compareceram = int(df["compareceu"].sum())
-    faltaram = int(df["faltou"].sum())
-
-    conversao = None  # Kaggle não tem "interessados"
-    taxa_comparecimento = compareceram / agendados if agendados else 0.0
-    taxa_no_show = faltaram / agendados if agendados else 0.0
-
-    return {
-        "interessados": None,
-        "agendados": agendados,
-        "compareceram": compareceram,
-        "faltaram": faltaram,
-        "conversao": conversao,
-        "taxa_comparecimento": taxa_comparecimento,
-        "taxa_no_show": taxa_no_show,
+from utils.instrumentation import medido
+from utils.lru import CacheLRU
+
+
+FAIXAS_ANTECEDENCIA_BINS = [-1, 0, 1, 3, 7, 14, 30, 999]
+FAIXAS_ANTECEDENCIA = ["0", "1", "2-3", "4-7", "8-14", "15-30", "30+"]
+FAIXAS_IDADE = ["60+", "<60"]
+
+# Dimensões agregadas de uma vez pelo ResumoKpis
+DIMENSOES = ["canal_confirmacao", "bairro", "faixa_antecedencia", "faixa_idade"]
+
+CACHE_RESUMOS_MAX = 16
+
+
+def faixa_antecedencia(dias) -> pd.Categorical:
+    return pd.cut(np.asarray(dias), bins=FAIXAS_ANTECEDENCIA_BINS, labels=FAIXAS_ANTECEDENCIA)
+
+
+def faixa_idade(idade) -> pd.Categorical:
+    codes = np.where(np.asarray(idade) >= 60, 0, 1).astype(np.int8)
+    return pd.Categorical.from_codes(codes, categories=FAIXAS_IDADE)
+
+
+def _chaves(df: pd.DataFrame, dims: list[str]) -> list[pd.Series]:
+    # Faixas derivadas viram chaves do groupby sem copiar o frame
+    derivadas = {
+        "faixa_antecedencia": lambda: faixa_antecedencia(df["antecedencia_dias"]),
+        "faixa_idade": lambda: faixa_idade(df["idade"]),
     }
+    out = []
+    for d in dims:
+        if d in df.columns:
+            out.append(df[d])
+        else:
+            out.append(pd.Series(derivadas[d](), index=df.index, name=d))
+    return out
+
+
+@medido("kpis.celulas_kpi")
+def celulas_kpi(df: pd.DataFrame, dims: list[str] | None = None) -> pd.DataFrame:
+    """
+    Uma única passada na base: somas e contagens por combinação das
+    dimensões. Todos os KPIs e agregados por dimensão saem destas células.
+    """
+
+    dims = DIMENSOES if dims is None else dims
+
+    medidas = dict(
+        n=("id_agendamento", "count"),
+        agendado=("agendado", "sum"),
+        faltou=("faltou", "sum"),
+        compareceu=("compareceu", "sum"),
+        valor_soma=("valor_medio", "sum"),
+        valor_n=("valor_medio", "count"),
+        antecedencia_soma=("antecedencia_dias", "sum"),
+        antecedencia_n=("antecedencia_dias", "count"),
+    )
+
+    if dims:
+        g = df.groupby(_chaves(df, dims), observed=True, dropna=False).agg(**medidas).reset_index()
+    else:
+        # Só totais: uma linha
+        g = pd.DataFrame({
+            nome: [getattr(df[col], func)()] for nome, (col, func) in medidas.items()
+        })
+
+    for c in ["n", "agendado", "faltou", "compareceu", "valor_n", "antecedencia_n"]:
+        g[c] = g[c].astype("int64")
+    for c in ["valor_soma", "antecedencia_soma"]:
+        g[c] = g[c].astype("float64")
+    return g
+
+
+class ResumoKpis:
+    """
+    KPIs executivos e agregados por dimensão da base filtrada, calculados a
+    partir das células de `celulas_kpi` (uma passada) e memoizados.
+    As quatro abas leem do mesmo objeto.
+    """
+
+    def __init__(self, celulas: pd.DataFrame):
+        self.celulas = celulas
+        self._memo = {}
+
+    @classmethod
+    def de_dataframe(cls, df: pd.DataFrame, dims: list[str] | None = None) -> "ResumoKpis":
+        return cls(celulas_kpi(df, dims))
+
+    def _memoizado(self, chave, calcular):
+        if chave not in self._memo:
+            self._memo[chave] = calcular()
+        return self._memo[chave]
+
+    def _por(self, col: str, observed: bool = True) -> pd.DataFrame:
+        return self._memoizado(("por", col, observed), lambda: self.celulas.groupby(col, observed=observed).agg(
+            agendados=("n", "sum"),
+            faltaram=("faltou", "sum"),
+            compareceram=("compareceu", "sum"),
+        ).reset_index())
+
+    def _totais(self) -> dict:
+        def calcular():
+            c = self.celulas
+            valor_n = int(c["valor_n"].sum())
+            return {
+                "n": int(c["n"].sum()),
+                "agendado": int(c["agendado"].sum()),
+                "faltou": int(c["faltou"].sum()),
+                "compareceu": int(c["compareceu"].sum()),
+                "valor_medio": float(c["valor_soma"].sum() / valor_n) if valor_n else np.nan,
+            }
+        return self._memoizado("totais", calcular)
+
+    def exec_kpis(self) -> dict:
+        t = self._totais()
+        agendados = t["agendado"]
+        compareceram = t["compareceu"]
+        faltaram = t["faltou"]
+
+        conversao = None  # Kaggle não tem "interessados"
+        taxa_comparecimento = compareceram / agendados if agendados else 0.0
+        taxa_no_show = faltaram / agendados if agendados else 0.0
+
+        return {
+            "interessados": None,
+            "agendados": agendados,
+            "compareceram": compareceram,
+            "faltaram": faltaram,
+            "conversao": conversao,
+            "taxa_comparecimento": taxa_comparecimento,
+            "taxa_no_show": taxa_no_show,
+        }
+
+    def pipeline_agenda(self) -> pd.DataFrame:
+        k = self.exec_kpis()
+        return pd.DataFrame({
+            "etapa": ["Agendados", "Compareceram", "No-show"],
+            "qtd": [k["agendados"], k["compareceram"], k["faltaram"]],
+        })
 
+    def _valor_medio(self) -> float:
+        t = self._totais()
+        return t["valor_medio"] if t["n"] else 0.0
+
+    def perda_financeira(self) -> dict:
+        valor = self._valor_medio()
+        return {"valor_medio": valor, "perda_no_show": self._totais()["faltou"] * valor}
+
+    def simular_reducao_no_show(self, reducao: float) -> float:
+        return self._totais()["agendado"] * reducao * self._valor_medio()
+
+    def no_show_por(self, col: str) -> pd.DataFrame:
+        g = self._por(col)[[col, "agendados", "faltaram"]].copy()
+        g["taxa_no_show"] = g["faltaram"] / g["agendados"].replace(0, np.nan)
+        return g.sort_values("taxa_no_show", ascending=False)
+
+    def comparecimento_por(self, col: str) -> pd.DataFrame:
+        g = self._por(col)[[col, "agendados", "compareceram"]].copy()
+        g["taxa_comparecimento"] = g["compareceram"] / g["agendados"].replace(0, np.nan)
+        return g.sort_values("taxa_comparecimento", ascending=False)
+
+    def impacto_antecedencia(self) -> pd.DataFrame:
+        # observed=False mantém todas as faixas no eixo, mesmo sem casos
+        g = self._por("faixa_antecedencia", observed=False)[["faixa_antecedencia", "agendados", "faltaram"]].copy()
+        g["taxa_no_show"] = g["faltaram"] / g["agendados"].replace(0, np.nan)
+        return g
+
+    def priorizar_acoes(self) -> pd.DataFrame:
+        g = self.celulas.groupby(["bairro", "canal_confirmacao"], observed=True).agg(
+            agendados=("n", "sum"),
+            faltaram=("faltou", "sum"),
+            valor_soma=("valor_soma", "sum"),
+            valor_n=("valor_n", "sum"),
+            antecedencia_soma=("antecedencia_soma", "sum"),
+            antecedencia_n=("antecedencia_n", "sum"),
+        ).reset_index()
+
+        g["valor_medio"] = g["valor_soma"] / g["valor_n"].replace(0, np.nan)
+        g["antecedencia_media"] = g["antecedencia_soma"] / g["antecedencia_n"].replace(0, np.nan)
+
+        g["taxa_no_show"] = g["faltaram"] / g["agendados"].replace(0, np.nan)
+        g["perda_estimada"] = g["faltaram"] * g["valor_medio"]
+        g["cluster"] = g["bairro"].astype(str) + " | " + g["canal_confirmacao"].astype(str)
+
+        g["score_prioridade"] = (
+            g["perda_estimada"].fillna(0)
+            + (g["taxa_no_show"].fillna(0) * 10000)
+            + (g["antecedencia_media"].fillna(0) * 30)
+        )
+
+        g = g.sort_values("score_prioridade", ascending=False)
+        return g[["cluster", "agendados", "taxa_no_show", "antecedencia_media", "perda_estimada"]]
+
+
+_cache_resumos = CacheLRU(CACHE_RESUMOS_MAX)
+
+
+@medido("kpis.resumo_kpis")
+def resumo_kpis(df: pd.DataFrame | None, chave: str | None = None, cubo=None, filtros: dict | None = None) -> ResumoKpis:
+    """
+    ResumoKpis da base filtrada, memoizado por `chave` (estado de filtro)
+    entre reruns e sessões. Sem chave, calcula sem cache.
+
+    Com um `cubo` (utils.cube.CuboKpis ou backend SQL), rola os KPIs a partir
+    do corte do cubo pelos `filtros` (inicio, fim, canais, bairros) sem varrer
+    `df`, que pode ser None.
+    """
+
+    if chave is not None:
+        resumo = _cache_resumos.get(chave)
+        if resumo is not None:
+            return resumo
+
+    if cubo is not None:
+        resumo = cubo.resumo(**(filtros or {}))
+    elif df is not None:
+        resumo = ResumoKpis.de_dataframe(df)
+    else:
+        raise ValueError("resumo_kpis precisa de `df` ou de um `cubo`.")
+    if chave is not None:
+        _cache_resumos.put(chave, resumo)
+    return resumo
+
+
+def limpar_cache_resumos() -> None:
+    _cache_resumos.clear()
+
+
+# Funções avulsas (mesma assinatura de antes), agora sobre o mesmo motor.
+
+@medido("kpis.compute_exec_kpis")
+def compute_exec_kpis(df: pd.DataFrame) -> dict:
+    return ResumoKpis.de_dataframe(df, []).exec_kpis()
+
+@medido("kpis.pipeline_agenda")
 def pipeline_agenda(df: pd.DataFrame) -> pd.DataFrame:
-    k = compute_exec_kpis(df)
-    return pd.DataFrame({
-        "etapa": ["Agendados", "Compareceram", "No-show"],
-        "qtd": [k["agendados"], k["compareceram"], k["faltaram"]],
-    })
+    return ResumoKpis.de_dataframe(df, []).pipeline_agenda()
 
+@medido("kpis.perda_financeira")
 def perda_financeira(df: pd.DataFrame) -> dict:
-    k = compute_exec_kpis(df)
-    valor = float(df["valor_medio"].mean()) if len(df) else 0.0
-    perda_no_show = k["faltaram"] * valor
-    return {"valor_medio": valor, "perda_no_show": perda_no_show}
+    return ResumoKpis.de_dataframe(df, []).perda_financeira()
 
+@medido("kpis.simular_reducao_no_show")
 def simular_reducao_no_show(df: pd.DataFrame, reducao: float) -> float:
-    agendados = int(df["agendado"].sum())
-    valor = float(df["valor_medio"].mean()) if len(df) else 0.0
-    return agendados * reducao * valor
+    return ResumoKpis.de_dataframe(df, []).simular_reducao_no_show(reducao)
 
+@medido("kpis.no_show_por")
 def no_show_por(df: pd.DataFrame, col: str) -> pd.DataFrame:
-    g = df.groupby(col).agg(
-        agendados=("id_agendamento", "count"),
-        faltaram=("faltou", "sum"),
-    ).reset_index()
-    g["taxa_no_show"] = g["faltaram"] / g["agendados"].replace(0, np.nan)
-    return g.sort_values("taxa_no_show", ascending=False)
+    return ResumoKpis.de_dataframe(df, [col]).no_show_por(col)
 
+@medido("kpis.comparecimento_por")
 def comparecimento_por(df: pd.DataFrame, col: str) -> pd.DataFrame:
-    g = df.groupby(col).agg(
-        agendados=("id_agendamento", "count"),
-        compareceram=("compareceu", "sum"),
-    ).reset_index()
-    g["taxa_comparecimento"] = g["compareceram"] / g["agendados"].replace(0, np.nan)
-    return g.sort_values("taxa_comparecimento", ascending=False)
+    return ResumoKpis.de_dataframe(df, [col]).comparecimento_por(col)
 
+@medido("kpis.impacto_antecedencia")
 def impacto_antecedencia(df: pd.DataFrame) -> pd.DataFrame:
-    bins = [-1, 0, 1, 3, 7, 14, 30, 999]
-    labels = ["0", "1", "2-3", "4-7", "8-14", "15-30", "30+"]
-
-    tmp = df.copy()
-    tmp["faixa_antecedencia"] = pd.cut(tmp["antecedencia_dias"], bins=bins, labels=labels)
-
-    g = tmp.groupby("faixa_antecedencia").agg(
-        agendados=("id_agendamento", "count"),
-        faltaram=("faltou", "sum"),
-    ).reset_index()
-
-    g["taxa_no_show"] = g["faltaram"] / g["agendados"].replace(0, np.nan)
-    return g
+    return ResumoKpis.de_dataframe(df, ["faixa_antecedencia"]).impacto_antecedencia()
 
+@medido("kpis.priorizar_acoes")
 def priorizar_acoes(df: pd.DataFrame) -> pd.DataFrame:
-    g = df.groupby(["bairro", "canal_confirmacao"]).agg(
-        agendados=("id_agendamento", "count"),
-        faltaram=("faltou", "sum"),
-        valor_medio=("valor_medio", "mean"),
-        antecedencia_media=("antecedencia_dias", "mean"),
-    ).reset_index()
-
-    g["taxa_no_show"] = g["faltaram"] / g["agendados"].replace(0, np.nan)
-    g["perda_estimada"] = g["faltaram"] * g["valor_medio"]
-    g["cluster"] = g["bairro"] + " | " + g["canal_confirmacao"]
-
-    g["score_prioridade"] = (
-        g["perda_estimada"].fillna(0)
-        + (g["taxa_no_show"].fillna(0) * 10000)
-        + (g["antecedencia_media"].fillna(0) * 30)
-    )
-
-    g = g.sort_values("score_prioridade", ascending=False)
-    return g[["cluster", "agendados", "taxa_no_show", "antecedencia_media", "perda_estimada"]]
+    return ResumoKpis.de_dataframe(df, ["bairro", "canal_confirmacao"]).priorizar_acoes()
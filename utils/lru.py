@@ -0,0 +1,40 @@
+import threading
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """
+    Cache LRU pequeno e thread-safe (sessões do Streamlit rodam em threads).
+    Os valores guardados são compartilhados: trate-os como somente leitura.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave, padrao=None):
+        with self._lock:
+            if chave not in self._dados:
+                return padrao
+            self._dados.move_to_end(chave)
+            return self._dados[chave]
+
+    def put(self, chave, valor) -> None:
+        with self._lock:
+            self._dados[chave] = valor
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+
+    def __contains__(self, chave) -> bool:
+        with self._lock:
+            return chave in self._dados
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._dados)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dados.clear()
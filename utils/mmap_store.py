@@ -0,0 +1,347 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import _cache_paths, _gravar_json_atomico, _resolve_path
+from utils.filters import COLUNA_DATA, COLUNAS_INDEXADAS, IndiceFiltros, _posicoes_por_valor
+
+
+# Exporta a base normalizada (já ordenada por data) como um arquivo binário
+# por coluna e abre com mmap somente leitura: vários processos do servidor
+# mapeiam os mesmos arquivos e o page cache do SO guarda uma cópia só.
+#
+# Partes incrementais são anexadas ao fim dos mesmos arquivos (o prefixo já
+# mapeado por outros processos nunca muda) e as posições do índice de cada
+# parte ficam num segmento próprio: anexar custa O(delta). Só um delta fora
+# de ordem de data (reordena a base) ou um bairro novo fora da ordem das
+# categorias (recodifica a coluna) reescreve o histórico.
+MMAP_ATIVO = os.environ.get("GENESIS_MMAP", "1") != "0"
+
+# Tempo máximo esperando outro processo terminar de anexar à mesma exportação
+TRAVA_ESPERA_S = 60.0
+
+
+def _prefixo() -> tuple[str, str]:
+    cache_path, _ = _cache_paths(_resolve_path())
+    nome = os.path.splitext(os.path.basename(cache_path))[0]
+    return os.path.dirname(cache_path), f"{nome}.mmap-"
+
+
+def _pasta(versao: str) -> str:
+    base, prefixo = _prefixo()
+    chave = hashlib.sha1(versao.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(base, f"{prefixo}{chave}")
+
+
+def _ler_meta(pasta: str) -> dict | None:
+    try:
+        with open(os.path.join(pasta, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Exportações no formato antigo (sem segmentos) são ignoradas e limpas
+    return meta if "segmentos" in meta else None
+
+
+def _localizar(versao: str) -> tuple[str, dict, int] | None:
+    """
+    (pasta, meta, nº do segmento) da exportação que contém `versao`. Uma
+    exportação cresce por partes, então a pasta não é necessariamente a
+    de `_pasta(versao)`.
+    """
+
+    base, prefixo = _prefixo()
+    candidatas = [_pasta(versao)]
+    if os.path.isdir(base):
+        candidatas += [
+            os.path.join(base, n) for n in sorted(os.listdir(base))
+            if n.startswith(prefixo) and ".tmp-" not in n
+        ]
+
+    for pasta in dict.fromkeys(candidatas):
+        meta = _ler_meta(pasta)
+        if meta is None:
+            continue
+        for k, seg in enumerate(meta["segmentos"]):
+            if seg["versao"] == versao:
+                return pasta, meta, k
+    return None
+
+
+def _limpar_antigos(pasta: str) -> None:
+    # Processos que ainda mapeiam a versão anterior mantêm os arquivos
+    # abertos (POSIX); os diretórios somem do disco quando eles saem.
+    base = os.path.dirname(pasta)
+    prefixo = os.path.basename(pasta).rsplit("-", 1)[0] + "-"
+    for nome in os.listdir(base):
+        if nome.startswith(prefixo) and ".tmp-" not in nome and os.path.join(base, nome) != pasta:
+            shutil.rmtree(os.path.join(base, nome), ignore_errors=True)
+
+
+def _valores_coluna(s: pd.Series) -> tuple[np.ndarray, dict]:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return np.asarray(s.array.codes), {
+            "categorias": [str(c) for c in s.cat.categories],
+            "ordenada": bool(s.cat.ordered),
+        }
+    return s.to_numpy(), {}
+
+
+def _gravar_segmento(pasta: str, k: int, posicoes: dict) -> dict:
+    """
+    Posições por valor ({col: {valor: array}}) concatenadas num array por
+    coluna indexada; o meta guarda os intervalos de cada valor.
+    """
+
+    intervalos = {}
+    for col in COLUNAS_INDEXADAS:
+        partes, por_col, inicio = [], [], 0
+        for valor, pos in posicoes[col].items():
+            partes.append(pos)
+            por_col.append([str(valor), inicio, inicio + len(pos)])
+            inicio += len(pos)
+        todas = np.concatenate(partes) if partes else np.empty(0, dtype=np.int64)
+        np.save(os.path.join(pasta, f"indice.{col}.{k:05d}.npy"), todas.astype(np.int64))
+        intervalos[col] = por_col
+    return intervalos
+
+
+def exportar(indice: IndiceFiltros, versao: str) -> str:
+    """
+    Grava `indice.df` (ordenado por data) e as posições por valor do índice
+    de filtros em `cache/<nome>.mmap-<versão>/`. Escrita num diretório
+    temporário renomeado no fim: quem abrir nunca vê uma exportação pela metade.
+    """
+
+    pasta = _pasta(versao)
+    if _ler_meta(pasta) is not None:
+        return pasta
+    shutil.rmtree(pasta, ignore_errors=True)
+
+    tmp = f"{pasta}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    df = indice.df
+    meta = {"colunas": {}, "segmentos": []}
+    for col in df.columns:
+        arr, spec = _valores_coluna(df[col])
+        arquivo = f"{col}.bin"
+        arr.tofile(os.path.join(tmp, arquivo))
+        meta["colunas"][col] = {"arquivo": arquivo, "dtype": arr.dtype.str, **spec}
+
+    meta["segmentos"].append({
+        "versao": versao,
+        "linhas": int(len(df)),
+        "indice": _gravar_segmento(tmp, 0, {
+            col: {v: np.concatenate(segs) for v, segs in indice._posicoes[col].items()}
+            for col in COLUNAS_INDEXADAS
+        }),
+    })
+    _gravar_json_atomico(os.path.join(tmp, "meta.json"), meta)
+
+    try:
+        os.replace(tmp, pasta)
+    except OSError:
+        # Outro processo exportou a mesma versão primeiro
+        shutil.rmtree(tmp, ignore_errors=True)
+    _limpar_antigos(pasta)
+    return pasta
+
+
+def _mapear(path: str, dtype: str, linhas: int) -> np.ndarray:
+    if linhas == 0:
+        return np.empty(0, dtype=dtype)
+    # ndarray comum (view do mapeamento), não a subclasse np.memmap
+    return np.asarray(np.memmap(path, dtype=dtype, mode="r", shape=(linhas,)))
+
+
+def abrir(versao: str) -> IndiceFiltros | None:
+    """
+    Índice de filtros sobre a base mapeada do disco (somente leitura, sem
+    cópia), ou None se não houver exportação para `versao`.
+    """
+
+    encontrado = _localizar(versao)
+    if encontrado is None:
+        return None
+    pasta, meta, k = encontrado
+    linhas = meta["segmentos"][k]["linhas"]
+
+    colunas = {}
+    for col, spec in meta["colunas"].items():
+        arr = _mapear(os.path.join(pasta, spec["arquivo"]), spec["dtype"], linhas)
+        if "categorias" in spec:
+            tipo = pd.CategoricalDtype(spec["categorias"], ordered=spec["ordenada"])
+            arr = pd.Categorical.from_codes(arr, dtype=tipo, validate=False)
+        colunas[col] = pd.Series(arr, copy=False, name=col)
+    df = pd.DataFrame(colunas, copy=False)
+
+    posicoes = {col: {} for col in COLUNAS_INDEXADAS}
+    for j, seg in enumerate(meta["segmentos"][:k + 1]):
+        for col, intervalos in seg["indice"].items():
+            todas = np.load(os.path.join(pasta, f"indice.{col}.{j:05d}.npy"), mmap_mode="r")
+            todas = np.asarray(todas)
+            por_valor = posicoes[col]
+            for v, i, f in intervalos:
+                por_valor[v] = por_valor.get(v, ()) + (todas[i:f],)
+
+    return IndiceFiltros.de_posicoes(df, posicoes)
+
+
+@contextmanager
+def _trava(pasta: str, espera: float = TRAVA_ESPERA_S):
+    # Arquivo de trava (O_EXCL) por exportação: um processo anexa por vez
+    path = os.path.join(pasta, ".trava")
+    limite = time.monotonic() + espera
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                # Trava deixada por um processo que morreu no meio
+                if time.time() - os.path.getmtime(path) > espera:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > limite:
+                raise TimeoutError(f"{path} ocupado há mais de {espera:.0f}s")
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _recodificar(pasta: str, spec: dict, linhas: int, categorias: list[str], k: int) -> dict:
+    """
+    Regrava os códigos de uma coluna categórica com novas categorias (num
+    arquivo novo: quem mapeia o antigo segue com ele). Custo O(histórico).
+    """
+
+    antigos = _mapear(os.path.join(pasta, spec["arquivo"]), spec["dtype"], linhas)
+    mapa = pd.Index(categorias).get_indexer(spec["categorias"])
+    novo_tipo = pd.Categorical.from_codes([], categories=categorias).codes.dtype
+    novos = np.where(antigos >= 0, mapa[antigos], -1).astype(novo_tipo)
+
+    arquivo = f"{spec['arquivo'].split('.', 1)[0]}.{k:05d}.bin"
+    novos.tofile(os.path.join(pasta, arquivo))
+    return {**spec, "arquivo": arquivo, "dtype": novos.dtype.str, "categorias": categorias}
+
+
+def anexar(anterior: str, versao: str, delta: pd.DataFrame) -> IndiceFiltros | None:
+    """
+    Estende a exportação de `anterior` com as linhas de `delta`, publicando
+    `versao`: só o delta é gravado (fim dos arquivos de coluna + um segmento
+    de posições). None quando não dá para anexar no lugar (sem exportação
+    de `anterior`, já estendida por outro caminho, ou delta fora de ordem
+    de data); aí o chamador reexporta tudo.
+    """
+
+    pronto = abrir(versao)
+    if pronto is not None:
+        return pronto
+
+    encontrado = _localizar(anterior)
+    if encontrado is None or delta is None or delta.empty:
+        return None
+    pasta = encontrado[0]
+
+    with _trava(pasta):
+        meta = _ler_meta(pasta)
+        if meta is None or meta["segmentos"][-1]["versao"] != anterior:
+            return None
+
+        linhas = meta["segmentos"][-1]["linhas"]
+        k = len(meta["segmentos"])
+
+        # Ordem por data preservada: o delta vai inteiro para o fim
+        spec_data = meta["colunas"][COLUNA_DATA]
+        datas = delta[COLUNA_DATA].to_numpy()
+        ultima = _mapear(os.path.join(pasta, spec_data["arquivo"]), spec_data["dtype"], linhas)[-1:]
+        if not delta[COLUNA_DATA].is_monotonic_increasing or (
+            len(ultima) and (np.isnat(ultima[0]) or datas[0] < ultima[0])
+        ):
+            return None
+
+        colunas = {}
+        for col, spec in meta["colunas"].items():
+            s = delta[col]
+            if "categorias" in spec:
+                atuais = spec["categorias"]
+                novas = [str(c) for c in s.cat.categories if str(c) not in set(atuais)]
+                if novas:
+                    # Mesma regra de alinhar_categorias: união ordenada
+                    spec = _recodificar(pasta, spec, linhas, sorted(set(atuais) | set(novas)), k)
+                arr = np.asarray(s.cat.set_categories(spec["categorias"]).array.codes)
+                if arr.dtype.itemsize > np.dtype(spec["dtype"]).itemsize:
+                    spec = _recodificar(pasta, spec, linhas, spec["categorias"], k)
+            else:
+                arr = s.to_numpy()
+                if arr.dtype.str != spec["dtype"]:
+                    return None
+            colunas[col] = (spec, np.asarray(arr, dtype=spec["dtype"]))
+
+        for spec, arr in colunas.values():
+            # Descarta sobra de uma anexação interrompida antes de escrever
+            with open(os.path.join(pasta, spec["arquivo"]), "r+b") as f:
+                f.truncate(linhas * arr.dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                arr.tofile(f)
+
+        substituidos = {
+            meta["colunas"][col]["arquivo"] for col, (spec, _) in colunas.items()
+            if spec["arquivo"] != meta["colunas"][col]["arquivo"]
+        }
+        meta["colunas"] = {col: spec for col, (spec, _) in colunas.items()}
+        meta["segmentos"].append({
+            "versao": versao,
+            "linhas": linhas + int(len(delta)),
+            "indice": _gravar_segmento(pasta, k, {
+                col: {v: pos + linhas for v, pos in _posicoes_por_valor(delta[col]).items()}
+                for col in COLUNAS_INDEXADAS
+            }),
+        })
+        # O meta é o que publica a versão nova para os outros processos
+        _gravar_json_atomico(os.path.join(pasta, "meta.json"), meta)
+        for arquivo in substituidos:
+            try:
+                os.remove(os.path.join(pasta, arquivo))
+            except OSError:
+                pass
+
+    return abrir(versao)
+
+
+def abrir_ou_exportar(versao: str, montar) -> tuple[IndiceFiltros, bool]:
+    """
+    (índice, mapeado): abre a exportação de `versao`; se não existir, monta o
+    índice com `montar()`, exporta e reabre mapeado para que a cópia
+    privada seja descartada. Sem permissão de escrita, segue com a cópia em
+    memória.
+    """
+
+    indice = abrir(versao)
+    if indice is not None:
+        return indice, True
+
+    indice = montar()
+    try:
+        exportar(indice, versao)
+    except OSError:
+        return indice, False
+
+    mapeado = abrir(versao)
+    return (mapeado, True) if mapeado is not None else (indice, False)
@@ -1,25 +1,40 @@
+import hashlib
+
 import pandas as pd
 import numpy as np
 
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import roc_auc_score
+from utils.instrumentation import medido
+from utils.lru import CacheLRU
+
+# O scikit-learn (~1,5 s de import) só é importado ao treinar: o dashboard
+# desenha a primeira tela sem ele e pontuar usa os métodos do pipeline.
+
+# Features do modelo de no-show: a mesma lista para o treino inline, o
+# registro, o treino incremental, a seleção de modelos e o serviço de score.
+FEATURES = ["idade", "idade_60_mais", "canal_confirmacao", "bairro", "antecedencia_minutos", "antecedencia_dias"]
+CATEGORICAS_MODELO = ["canal_confirmacao", "bairro"]
+NUMERICAS_MODELO = ["idade", "idade_60_mais", "antecedencia_minutos", "antecedencia_dias"]
 
+@medido("modelo.treinar_modelo_no_show")
 def treinar_modelo_no_show(df: pd.DataFrame):
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import OneHotEncoder
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import roc_auc_score
+
     base = df[df["agendado"] == 1].copy()
     if len(base) < 500:
         return None
 
     y = base["faltou"].astype(int)
 
-    features = ["idade", "idade_60_mais", "canal_confirmacao", "bairro", "antecedencia_minutos", "antecedencia_dias"]
+    features = list(FEATURES)
     X = base[features].copy()
 
-    cat = ["canal_confirmacao", "bairro"]
-    num = ["idade", "idade_60_mais", "antecedencia_minutos", "antecedencia_dias"]
+    cat = list(CATEGORICAS_MODELO)
+    num = list(NUMERICAS_MODELO)
 
     pre = ColumnTransformer(
         transformers=[
@@ -49,14 +64,19 @@ def treinar_modelo_no_show(df: pd.DataFrame):
         "importance": np.abs(coefs[:len(feature_names)]),
     }).sort_values("importance", ascending=False).head(15)
 
-    return {
+    # Scorer NumPy exportado e conferido aqui, antes de o pack ser
+    # compartilhado: pontuar só lê
+    from utils.fast_scorer import preparar_rapido
+
+    return preparar_rapido({
         "pipeline": pipe,
         "auc": float(auc),
         "n_train": int(len(base)),
         "feature_importance": fi,
         "features": features,
-    }
+    })
 
+@medido("modelo.pontuar_risco_no_show")
 def pontuar_risco_no_show(df: pd.DataFrame, model_pack: dict):
     if model_pack is None:
         return None
@@ -68,6 +88,63 @@ def pontuar_risco_no_show(df: pd.DataFrame, model_pack: dict):
     if len(base) == 0:
         return None
 
+    # Modelo linear: scorer NumPy (conferido contra o pipeline) direto nas
+    # colunas categóricas; senão, o pipeline
+    from utils.fast_scorer import scorer_rapido
+
+    rapido = scorer_rapido(model_pack)
+    if rapido is not None:
+        base["risco_no_show"] = rapido.pontuar(base)
+        return base
+
     X = base[features].copy()
     base["risco_no_show"] = pipe.predict_proba(X)[:, 1]
     return base
+
+
+# Cache LRU de (modelo, base pontuada) por estado de filtro, compartilhado
+# pelas abas Predict e Act e entre sessões do mesmo processo. O conteúdo é
+# somente leitura: quem precisar alterar a base pontuada deve copiá-la.
+CACHE_MODELOS_MAX = 8
+
+_cache_modelos = CacheLRU(CACHE_MODELOS_MAX)
+
+
+def chave_modelo(versao_dados: str, filtros: tuple) -> str:
+    """
+    Impressão digital da base filtrada: versão dos dados + tupla de filtros.
+    """
+
+    return hashlib.sha1(repr((versao_dados, filtros)).encode("utf-8")).hexdigest()
+
+
+@medido("modelo.modelo_e_score")
+def modelo_e_score(df: pd.DataFrame, chave: str | None = None, model_pack: dict | None = None) -> tuple:
+    """
+    Treina o modelo e pontua a base uma única vez por `chave`.
+    Retorna (model_pack, scored); qualquer um pode ser None como nas
+    funções originais. Sem chave, calcula sem cache.
+
+    Com um `model_pack` já treinado (ex.: do registro de modelos), só pontua.
+    """
+
+    if chave is not None and model_pack is not None:
+        chave = f"{chave}:{model_pack.get('versao')}"
+
+    if chave is not None:
+        resultado = _cache_modelos.get(chave)
+        if resultado is not None:
+            return resultado
+
+    if model_pack is None:
+        model_pack = treinar_modelo_no_show(df)
+    resultado = (model_pack, pontuar_risco_no_show(df, model_pack))
+
+    if chave is not None:
+        _cache_modelos.put(chave, resultado)
+
+    return resultado
+
+
+def limpar_cache_modelos() -> None:
+    _cache_modelos.clear()
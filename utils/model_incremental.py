@@ -0,0 +1,295 @@
+import copy
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import CANAIS, CATEGORICAS, CHUNK_ROWS
+from utils.model import FEATURES, NUMERICAS_MODELO
+
+
+# Treino incremental (fora da memória): SGD com log loss sobre a base lida do
+# cache Parquet em blocos. O modelo pode ser atualizado com as partes diárias
+# da ingestão incremental sem refazer o treino sobre todo o histórico.
+COLUNAS_TREINO = ["id_agendamento", "agendado", "faltou"] + FEATURES
+
+# Bairros fora do vocabulário (novos desde o último treino completo) caem
+# nesta coluna até o próximo treino completo.
+OUTROS = "(outros)"
+
+# SGD médio (ASGD): sem a média, o passo "optimal" oscila muito entre
+# blocos e o AUC de uma época varia de 0,43 a 0,60 conforme o alpha
+ALPHA = 1e-4
+BINS_AUC = 1000
+MIN_TREINO = 500
+
+
+def _validacao(ids) -> np.ndarray:
+    """
+    ~25% dos agendamentos (por hash do id, estável entre treinos e
+    atualizações) ficam fora do treino para medir o AUC.
+    """
+
+    h = (np.asarray(ids, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(60)
+    return h < 4
+
+
+def _codigos(s: pd.Series, vocab: pd.Index) -> np.ndarray:
+    # Posição de cada valor no vocabulário (-1 = fora); categóricas mapeiam
+    # só as categorias e depois os códigos
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        mapa = np.append(vocab.get_indexer(s.cat.categories.astype(str)), -1)
+        return mapa[np.asarray(s.array.codes)]
+    return vocab.get_indexer(s.astype(str))
+
+
+class CodificadorFixo:
+    """
+    One-hot de canal e bairro com vocabulário fixo + numéricas padronizadas,
+    em matriz esparsa (2 categorias + 4 numéricas por linha). O vocabulário e
+    as médias/desvios são acumulados com `ajustar` bloco a bloco e ficam
+    congelados depois do treino completo: atualizações diárias não mudam a
+    escala que os coeficientes já aprenderam.
+    """
+
+    def __init__(self):
+        self.canais = list(CANAIS)
+        self.bairros = set()
+        self._n = 0
+        self._soma = np.zeros(len(NUMERICAS_MODELO))
+        self._soma2 = np.zeros(len(NUMERICAS_MODELO))
+        self.congelado = False
+
+    def ajustar(self, df: pd.DataFrame) -> None:
+        if self.congelado:
+            raise RuntimeError("Codificador congelado: vocabulário e escala são fixos após o treino completo.")
+        s = df["bairro"]
+        valores = s.cat.categories[np.unique(s.array.codes[s.array.codes >= 0])] if isinstance(s.dtype, pd.CategoricalDtype) else s.dropna().unique()
+        self.bairros.update(str(v) for v in valores)
+
+        x = df[NUMERICAS_MODELO].to_numpy(dtype=np.float64)
+        self._n += len(x)
+        self._soma += x.sum(axis=0)
+        self._soma2 += (x ** 2).sum(axis=0)
+
+    def congelar(self) -> None:
+        self.bairros = sorted(self.bairros) + [OUTROS]
+        self.media = self._soma / max(self._n, 1)
+        var = self._soma2 / max(self._n, 1) - self.media ** 2
+        self.escala = np.sqrt(np.maximum(var, 0.0))
+        self.escala[self.escala == 0] = 1.0
+        self._vocab = None
+        self.congelado = True
+
+    def __getstate__(self):
+        estado = dict(self.__dict__)
+        estado.pop("_vocab", None)
+        return estado
+
+    def _vocabularios(self) -> tuple[pd.Index, pd.Index]:
+        if getattr(self, "_vocab", None) is None:
+            self._vocab = (pd.Index(self.canais), pd.Index(self.bairros))
+        return self._vocab
+
+    @property
+    def n_colunas(self) -> int:
+        return len(self.canais) + len(self.bairros) + len(NUMERICAS_MODELO)
+
+    def nomes(self) -> list[str]:
+        return (
+            [f"canal_confirmacao_{c}" for c in self.canais]
+            + [f"bairro_{b}" for b in self.bairros]
+            + list(NUMERICAS_MODELO)
+        )
+
+    def transformar(self, df: pd.DataFrame):
+        from scipy import sparse
+
+        if not self.congelado:
+            raise RuntimeError("Codificador sem vocabulário: chame ajustar() e congelar() antes.")
+
+        vocab_canal, vocab_bairro = self._vocabularios()
+        n = len(df)
+
+        canal = _codigos(df["canal_confirmacao"], vocab_canal)
+        canal = np.where(canal < 0, vocab_canal.get_loc("Sem SMS"), canal)
+        bairro = _codigos(df["bairro"], vocab_bairro)
+        bairro = np.where(bairro < 0, len(self.bairros) - 1, bairro) + len(self.canais)
+
+        inicio_num = len(self.canais) + len(self.bairros)
+        num = (df[NUMERICAS_MODELO].to_numpy(dtype=np.float64) - self.media) / self.escala
+
+        por_linha = 2 + len(NUMERICAS_MODELO)
+        indices = np.empty((n, por_linha), dtype=np.int32)
+        indices[:, 0] = canal
+        indices[:, 1] = bairro
+        indices[:, 2:] = np.arange(inicio_num, inicio_num + len(NUMERICAS_MODELO))
+        dados = np.ones((n, por_linha))
+        dados[:, 2:] = num
+
+        indptr = np.arange(0, n * por_linha + 1, por_linha, dtype=np.int64)
+        return sparse.csr_matrix((dados.ravel(), indices.ravel(), indptr), shape=(n, self.n_colunas))
+
+
+class ModeloIncremental:
+    """
+    `SGDClassifier(loss="log_loss")` + `CodificadorFixo`, com `partial_fit`
+    por bloco. Tem `predict_proba(DataFrame)` como o pipeline do
+    `treinar_modelo_no_show`: entra no model_pack e no registro no lugar dele.
+    """
+
+    def __init__(self, codificador: CodificadorFixo, alpha: float = ALPHA, seed: int = 42, **params):
+        from sklearn.linear_model import SGDClassifier
+
+        self.codificador = codificador
+        self.clf = SGDClassifier(loss="log_loss", alpha=alpha, random_state=seed, **{"average": True, **params})
+        self.n_train = 0
+        self._rng = np.random.default_rng(seed)
+
+    def partial_fit(self, X: pd.DataFrame, y) -> "ModeloIncremental":
+        y = np.asarray(y, dtype=np.int8)
+        if len(y) == 0:
+            return self
+        # A base vem ordenada por data: embaralha dentro do bloco
+        ordem = self._rng.permutation(len(y))
+        self.clf.partial_fit(self.codificador.transformar(X)[ordem], y[ordem], classes=np.array([0, 1], dtype=np.int8))
+        self.n_train += len(y)
+        return self
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        return self.clf.predict_proba(self.codificador.transformar(X))
+
+    @property
+    def coef_(self) -> np.ndarray:
+        return self.clf.coef_
+
+
+class _AucHistograma:
+    """
+    AUC aproximado em memória constante: contagens de positivos/negativos por
+    faixa de probabilidade (BINS_AUC faixas; empates dentro da faixa contam 1/2).
+    """
+
+    def __init__(self, bins: int = BINS_AUC):
+        self.pos = np.zeros(bins, dtype=np.int64)
+        self.neg = np.zeros(bins, dtype=np.int64)
+
+    def adicionar(self, proba: np.ndarray, y: np.ndarray) -> None:
+        faixa = np.minimum((proba * len(self.pos)).astype(np.int64), len(self.pos) - 1)
+        self.pos += np.bincount(faixa[y == 1], minlength=len(self.pos))
+        self.neg += np.bincount(faixa[y == 0], minlength=len(self.neg))
+
+    def auc(self) -> float | None:
+        p, n = self.pos.sum(), self.neg.sum()
+        if p == 0 or n == 0:
+            return None
+        neg_abaixo = np.cumsum(self.neg) - self.neg
+        return float((self.pos * neg_abaixo).sum() + 0.5 * (self.pos * self.neg).sum()) / (p * n)
+
+
+def blocos_parquet(arquivos: list[str], colunas: list[str] = COLUNAS_TREINO, bloco: int = CHUNK_ROWS):
+    """
+    DataFrames de até `bloco` linhas lidos em sequência dos arquivos Parquet
+    do cache (base + partes), só com as `colunas` pedidas.
+    """
+
+    import pyarrow.parquet as pq
+
+    dicionario = [c for c in colunas if c in CATEGORICAS]
+    for path in arquivos:
+        arquivo = pq.ParquetFile(path, read_dictionary=dicionario)
+        for lote in arquivo.iter_batches(batch_size=bloco, columns=colunas):
+            yield lote.to_pandas()
+
+
+def _agendados(df: pd.DataFrame) -> pd.DataFrame:
+    return df[df["agendado"] == 1]
+
+
+def _importancias(modelo: ModeloIncremental) -> pd.DataFrame:
+    return pd.DataFrame({
+        "feature": modelo.codificador.nomes(),
+        "importance": np.abs(modelo.coef_[0]),
+    }).sort_values("importance", ascending=False).head(15)
+
+
+def _pack(modelo: ModeloIncremental, auc: float, fingerprint: str) -> dict:
+    return {
+        "pipeline": modelo,
+        "auc": float(auc),
+        "n_train": int(modelo.n_train),
+        "feature_importance": _importancias(modelo),
+        "features": list(FEATURES),
+        "tipo": "incremental",
+        "fingerprint": fingerprint,
+    }
+
+
+def _passada(modelo: ModeloIncremental, blocos, auc: _AucHistograma | None, h) -> None:
+    for df in blocos:
+        df = _agendados(df)
+        if h is not None:
+            h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        validacao = _validacao(df["id_agendamento"].to_numpy())
+        treino = df[~validacao]
+        modelo.partial_fit(treino[FEATURES], treino["faltou"])
+        if auc is not None and validacao.any():
+            val = df[validacao]
+            auc.adicionar(modelo.predict_proba(val[FEATURES])[:, 1], val["faltou"].to_numpy())
+
+
+def treinar_incremental(arquivos: list[str] | None = None, bloco: int = CHUNK_ROWS, epocas: int = 1,
+                        alpha: float = ALPHA, seed: int = 42, **params) -> dict | None:
+    """
+    Treino completo em blocos sobre o cache Parquet (padrão: base + partes do
+    CSV atual). Memória limitada a um bloco: uma passada para vocabulário e
+    escala, `epocas` passadas de `partial_fit` e uma para o AUC de validação.
+    Retorna um model_pack como `treinar_modelo_no_show` (None se houver
+    menos de 500 agendamentos).
+    """
+
+    from utils.data_loader import arquivos_cache
+
+    arquivos = arquivos or arquivos_cache()
+
+    codificador = CodificadorFixo()
+    for df in blocos_parquet(arquivos, bloco=bloco):
+        codificador.ajustar(_agendados(df))
+    if codificador._n < MIN_TREINO:
+        return None
+    codificador.congelar()
+
+    modelo = ModeloIncremental(codificador, alpha=alpha, seed=seed, **params)
+    h = hashlib.sha256()
+    for epoca in range(epocas):
+        _passada(modelo, blocos_parquet(arquivos, bloco=bloco), None, h if epoca == 0 else None)
+
+    auc = _AucHistograma()
+    for df in blocos_parquet(arquivos, bloco=bloco):
+        val = _agendados(df)
+        val = val[_validacao(val["id_agendamento"].to_numpy())]
+        if len(val):
+            auc.adicionar(modelo.predict_proba(val[FEATURES])[:, 1], val["faltou"].to_numpy())
+
+    modelo.n_train = modelo.n_train // epocas
+    return _pack(modelo, auc.auc() or 0.5, h.hexdigest())
+
+
+def atualizar_incremental(model_pack: dict, df: pd.DataFrame, bloco: int = CHUNK_ROWS) -> dict:
+    """
+    Novo model_pack com o modelo de `model_pack` atualizado (`partial_fit`)
+    pelos agendamentos de `df` (ex.: as partes do dia). O pack original não
+    muda. O AUC passa a ser o da validação dos dados novos quando houver
+    positivos e negativos suficientes; senão fica o anterior.
+    """
+
+    if model_pack.get("tipo") != "incremental":
+        raise ValueError("Só modelos do treino incremental aceitam atualização (treine com --incremental).")
+
+    modelo = copy.deepcopy(model_pack["pipeline"])
+    auc = _AucHistograma()
+    h = hashlib.sha256(model_pack.get("fingerprint", "").encode("utf-8"))
+    _passada(modelo, (df.iloc[i:i + bloco] for i in range(0, len(df), bloco)), auc, h)
+
+    novo_auc = auc.auc() if min(auc.pos.sum(), auc.neg.sum()) >= 50 else None
+    return _pack(modelo, novo_auc if novo_auc is not None else model_pack["auc"], h.hexdigest())
@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from utils.model import treinar_modelo_no_show
+
+
+REGISTRY_DIR = os.path.join("models", "no_show")
+
+MODELO_ARQUIVO = "modelo.joblib"
+META_ARQUIVO = "meta.json"
+LATEST_ARQUIVO = "latest.json"
+
+
+def fingerprint_dados(df: pd.DataFrame) -> str:
+    """
+    Impressão digital do conteúdo usado no treino (independe do índice).
+    """
+
+    h = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(h.tobytes()).hexdigest()
+
+
+def _gravar_json(path: str, conteudo: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(conteudo, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def registrar_modelo(model_pack: dict, df: pd.DataFrame | None, pasta: str = REGISTRY_DIR,
+                     promover: bool = True, extra: dict | None = None) -> str:
+    """
+    Serializa o model_pack (pipeline + importâncias) e os metadados em
+    `<pasta>/<versao>/`. Com `promover`, passa a ser o modelo carregado
+    pelo dashboard. Retorna a versão (timestamp UTC).
+
+    Sem `df` (treino em blocos, a base nunca fica inteira em memória), usa a
+    impressão digital calculada no treino (`model_pack["fingerprint"]`).
+    """
+
+    criado_em = datetime.now(timezone.utc)
+    versao = criado_em.strftime("%Y%m%dT%H%M%S%fZ")
+    destino = os.path.join(pasta, versao)
+
+    # Grava numa pasta temporária e renomeia: nunca expõe versão incompleta
+    tmp = f"{destino}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+
+    import joblib
+
+    # "rapido" (scorer NumPy) é derivado do pipeline e refeito ao carregar
+    pack = {k: v for k, v in model_pack.items() if k not in ("versao", "meta", "rapido")}
+    joblib.dump(pack, os.path.join(tmp, MODELO_ARQUIVO))
+
+    meta = {
+        "versao": versao,
+        "criado_em": criado_em.isoformat(),
+        "auc": float(model_pack["auc"]),
+        "n_train": int(model_pack["n_train"]),
+        "features": list(model_pack["features"]),
+        "fingerprint_dados": fingerprint_dados(df) if df is not None else model_pack.get("fingerprint"),
+        **(extra or {}),
+    }
+    _gravar_json(os.path.join(tmp, META_ARQUIVO), meta)
+    os.replace(tmp, destino)
+
+    if promover:
+        promover_modelo(versao, pasta)
+
+    return versao
+
+
+def promover_modelo(versao: str, pasta: str = REGISTRY_DIR) -> None:
+    if not os.path.exists(os.path.join(pasta, versao, MODELO_ARQUIVO)):
+        raise FileNotFoundError(f"Modelo {versao} não encontrado em {pasta}.")
+    _gravar_json(os.path.join(pasta, LATEST_ARQUIVO), {"versao": versao})
+
+
+def versao_atual(pasta: str = REGISTRY_DIR) -> str | None:
+    """
+    Versão promovida (ou None se o registro estiver vazio).
+    """
+
+    try:
+        with open(os.path.join(pasta, LATEST_ARQUIVO), "r", encoding="utf-8") as f:
+            return json.load(f)["versao"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def listar_modelos(pasta: str = REGISTRY_DIR) -> list[dict]:
+    if not os.path.isdir(pasta):
+        return []
+
+    out = []
+    for nome in sorted(os.listdir(pasta)):
+        meta_path = os.path.join(pasta, nome, META_ARQUIVO)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                out.append(json.load(f))
+    return out
+
+
+def carregar_modelo(versao: str | None = None, pasta: str = REGISTRY_DIR) -> dict | None:
+    """
+    Carrega um model_pack do registro (por padrão o promovido), no mesmo
+    formato de `treinar_modelo_no_show`, com `versao` e `meta` adicionais.
+    """
+
+    versao = versao or versao_atual(pasta)
+    if versao is None:
+        return None
+
+    # joblib (e o scikit-learn, ao desserializar o pipeline) só quando uma
+    # aba de modelo pede
+    import joblib
+
+    base = os.path.join(pasta, versao)
+    pack = joblib.load(os.path.join(base, MODELO_ARQUIVO))
+    with open(os.path.join(base, META_ARQUIVO), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    pack["versao"] = versao
+    pack["meta"] = meta
+
+    from utils.fast_scorer import preparar_rapido
+
+    return preparar_rapido(pack)
+
+
+def remover_modelo(versao: str, pasta: str = REGISTRY_DIR) -> None:
+    if versao == versao_atual(pasta):
+        raise ValueError("Não é possível remover o modelo promovido.")
+    shutil.rmtree(os.path.join(pasta, versao))
+
+
+def treinar_e_registrar(pasta: str = REGISTRY_DIR, promover: bool = True, incremental: bool = False,
+                        bloco: int | None = None, epocas: int = 1) -> str | None:
+    """
+    Treino offline: carrega a base completa, treina e registra. Com
+    `incremental`, treina em blocos sobre o cache Parquet (memória limitada
+    a um bloco) e o modelo aceita `atualizar_e_registrar` com as partes diárias.
+    """
+
+    from utils.data_loader import CHUNK_ROWS, _base_versao, arquivos_cache, load_data
+
+    if incremental:
+        from utils.model_incremental import treinar_incremental
+
+        arquivos = arquivos_cache()
+        model_pack = treinar_incremental(arquivos, bloco=bloco or CHUNK_ROWS, epocas=epocas)
+        if model_pack is None:
+            return None
+        extra = {
+            "tipo": "incremental",
+            "base_dados": _base_versao(),
+            "partes": [os.path.basename(a) for a in arquivos[1:]],
+        }
+        return registrar_modelo(model_pack, None, pasta=pasta, promover=promover, extra=extra)
+
+    df = load_data()
+    model_pack = treinar_modelo_no_show(df)
+    if model_pack is None:
+        return None
+    return registrar_modelo(model_pack, df, pasta=pasta, promover=promover)
+
+
+def atualizar_e_registrar(pasta: str = REGISTRY_DIR, promover: bool = True) -> str | None:
+    """
+    Atualiza o modelo promovido (do treino incremental) com as partes da
+    ingestão incremental que ele ainda não viu e registra como nova versão.
+    None se não houver partes novas. Se o CSV base mudou, é preciso treinar
+    de novo (ValueError).
+    """
+
+    from utils.data_loader import _base_versao, load_delta, partes_incrementais
+    from utils.model_incremental import atualizar_incremental
+
+    model_pack = carregar_modelo(pasta=pasta)
+    if model_pack is None:
+        raise ValueError("Nenhum modelo promovido no registro.")
+    meta = model_pack["meta"]
+    if meta.get("tipo") != "incremental":
+        raise ValueError("O modelo promovido não é do treino incremental: use treinar --incremental.")
+
+    partes = partes_incrementais()
+    vistas = meta.get("partes", [])
+    if meta.get("base_dados") != _base_versao() or partes[:len(vistas)] != vistas:
+        raise ValueError("A base mudou desde o treino do modelo: use treinar --incremental.")
+
+    novas = partes[len(vistas):]
+    if not novas:
+        return None
+
+    df = load_delta(novas)
+    novo = atualizar_incremental(model_pack, df)
+    extra = {"tipo": "incremental", "base_dados": meta["base_dados"], "partes": partes, "atualizado_de": model_pack["versao"]}
+    return registrar_modelo(novo, None, pasta=pasta, promover=promover, extra=extra)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.model_registry",
+        description="Registro de modelos de no-show (treino offline e promoção).",
+    )
+    parser.add_argument("--pasta", default=REGISTRY_DIR)
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_treinar = sub.add_parser("treinar", help="treina na base completa e registra")
+    p_treinar.add_argument("--sem-promover", action="store_true")
+    p_treinar.add_argument("--incremental", action="store_true",
+                           help="treino em blocos (SGD) sobre o cache Parquet; aceita 'atualizar' depois")
+    p_treinar.add_argument("--bloco", type=int, default=None, help="linhas por bloco no treino incremental")
+    p_treinar.add_argument("--epocas", type=int, default=1)
+
+    p_atualizar = sub.add_parser("atualizar", help="atualiza o modelo incremental promovido com as partes novas")
+    p_atualizar.add_argument("--sem-promover", action="store_true")
+
+    sub.add_parser("listar", help="lista as versões registradas")
+
+    p_promover = sub.add_parser("promover", help="promove uma versão")
+    p_promover.add_argument("versao")
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "treinar":
+        versao = treinar_e_registrar(args.pasta, promover=not args.sem_promover, incremental=args.incremental,
+                                     bloco=args.bloco, epocas=args.epocas)
+        if versao is None:
+            print("Sem dados suficientes para treinar o modelo.")
+            return 1
+        print(f"Modelo registrado: {versao}")
+    elif args.comando == "atualizar":
+        try:
+            versao = atualizar_e_registrar(args.pasta, promover=not args.sem_promover)
+        except ValueError as e:
+            print(e)
+            return 1
+        if versao is None:
+            print("Nenhuma parte nova desde a última atualização.")
+            return 0
+        print(f"Modelo atualizado: {versao}")
+    elif args.comando == "listar":
+        atual = versao_atual(args.pasta)
+        for meta in listar_modelos(args.pasta):
+            marca = "*" if meta["versao"] == atual else " "
+            tipo = f"  {meta['tipo']}" if meta.get("tipo") else ""
+            print(f"{marca} {meta['versao']}  auc={meta['auc']:.3f}  n_train={meta['n_train']}{tipo}")
+    elif args.comando == "promover":
+        promover_modelo(args.versao, args.pasta)
+        print(f"Modelo promovido: {args.versao}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,339 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from utils.model import CATEGORICAS_MODELO, FEATURES, NUMERICAS_MODELO
+from utils.model_registry import REGISTRY_DIR, _gravar_json, registrar_modelo
+
+
+# Seleção de modelos: validação cruzada k-fold de vários candidatos num pool
+# de processos (um processo por núcleo, cada um com 1 thread de BLAS/OpenMP).
+# Roda fora do Streamlit (CLI ou processo em segundo plano disparado pela aba
+# Predict); o progresso vai para `<registro>/selecao.json`.
+
+# nome -> (tipo, parâmetros); parâmetros simples para caber no JSON de status
+CANDIDATOS = {
+    "logistica_C0.1": ("logistica", {"C": 0.1}),
+    "logistica_C1": ("logistica", {"C": 1.0}),
+    "logistica_C10": ("logistica", {"C": 10.0}),
+    "gb_raso": ("gb", {"max_depth": 3, "learning_rate": 0.1, "max_iter": 200}),
+    "gb_folhas63": ("gb", {"max_leaf_nodes": 63, "learning_rate": 0.05, "max_iter": 300}),
+}
+FOLDS = 5
+STATUS_ARQUIVO = "selecao.json"
+LOG_ARQUIVO = "selecao.log"
+
+_X = None
+_y = None
+
+# Seleções disparadas por este processo (pid -> Popen), para coletar o
+# status de saída: sem o wait, cada filho que termina vira zumbi no servidor
+_filhos: dict = {}
+
+
+def montar_candidato(tipo: str, params: dict):
+    """
+    Pipeline não treinado do candidato (mesmas features do
+    `treinar_modelo_no_show`).
+    """
+
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+
+    if tipo == "logistica":
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import OneHotEncoder
+
+        pre = ColumnTransformer([
+            ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAS_MODELO),
+            ("num", "passthrough", NUMERICAS_MODELO),
+        ])
+        clf = LogisticRegression(max_iter=1000, **params)
+    elif tipo == "gb":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        from sklearn.preprocessing import OrdinalEncoder
+
+        # Categóricas como códigos ordinais tratados como categoria pelo GB;
+        # valor desconhecido vira NaN (ausente)
+        pre = ColumnTransformer([
+            ("cat", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=np.nan), CATEGORICAS_MODELO),
+            ("num", "passthrough", NUMERICAS_MODELO),
+        ])
+        clf = HistGradientBoostingClassifier(
+            categorical_features=list(range(len(CATEGORICAS_MODELO))), random_state=42, **params
+        )
+    else:
+        raise ValueError(f"Tipo de candidato desconhecido: {tipo}")
+
+    return Pipeline(steps=[("pre", pre), ("clf", clf)])
+
+
+def _dados(amostra: int | None = None, seed: int = 42) -> tuple[pd.DataFrame, np.ndarray]:
+    # Com GENESIS_MMAP, os workers mapeiam a mesma exportação da base (o
+    # processo principal exporta antes de abrir o pool)
+    from utils.data_loader import load_data, versao_dados
+    from utils.filters import IndiceFiltros
+    from utils.mmap_store import MMAP_ATIVO, abrir_ou_exportar
+
+    if MMAP_ATIVO:
+        df = abrir_ou_exportar(versao_dados(), lambda: IndiceFiltros(load_data()))[0].df
+    else:
+        df = load_data()
+
+    base = df.loc[df["agendado"] == 1, FEATURES + ["faltou"]]
+    if amostra and len(base) > amostra:
+        posicoes = np.sort(np.random.default_rng(seed).choice(len(base), amostra, replace=False))
+        base = base.iloc[posicoes]
+    return base[FEATURES], base["faltou"].to_numpy(dtype=np.int8)
+
+
+def _iniciar_worker(amostra: int | None, seed: int) -> None:
+    from threadpoolctl import threadpool_limits
+
+    global _X, _y
+    threadpool_limits(1)
+    _X, _y = _dados(amostra, seed)
+
+
+def _folds(y: np.ndarray, k: int, seed: int) -> list:
+    from sklearn.model_selection import StratifiedKFold
+
+    return list(StratifiedKFold(n_splits=k, shuffle=True, random_state=seed).split(np.zeros(len(y)), y))
+
+
+def _avaliar(nome: str, tipo: str, params: dict, fold: int, k: int, seed: int) -> dict:
+    from sklearn.metrics import roc_auc_score
+
+    t0 = time.perf_counter()
+    treino, val = _folds(_y, k, seed)[fold]
+    pipe = montar_candidato(tipo, params)
+    pipe.fit(_X.iloc[treino], _y[treino])
+    auc = roc_auc_score(_y[val], pipe.predict_proba(_X.iloc[val])[:, 1])
+    return {"candidato": nome, "fold": fold, "auc": float(auc), "tempo_s": time.perf_counter() - t0}
+
+
+def resumo_resultados(resultados: list[dict]) -> pd.DataFrame:
+    """
+    AUC médio, desvio e folds concluídos por candidato (melhor primeiro).
+    """
+
+    if not resultados:
+        return pd.DataFrame(columns=["candidato", "auc_medio", "auc_dp", "folds", "tempo_s"])
+    r = pd.DataFrame(resultados)
+    return (
+        r.groupby("candidato")
+        .agg(auc_medio=("auc", "mean"), auc_dp=("auc", "std"), folds=("fold", "count"), tempo_s=("tempo_s", "sum"))
+        .reset_index()
+        .sort_values("auc_medio", ascending=False)
+        .reset_index(drop=True)
+    )
+
+
+def _importancias(pipe, X: pd.DataFrame, y: np.ndarray, seed: int) -> pd.DataFrame:
+    clf = pipe.named_steps["clf"]
+    if hasattr(clf, "coef_"):
+        ohe = pipe.named_steps["pre"].named_transformers_["cat"]
+        nomes = ohe.get_feature_names_out(CATEGORICAS_MODELO).tolist() + NUMERICAS_MODELO
+        valores = np.abs(clf.coef_[0][:len(nomes)])
+    else:
+        # Sem coeficientes (GB): importância por permutação numa amostra
+        from sklearn.inspection import permutation_importance
+
+        n = min(len(X), 20_000)
+        pos = np.random.default_rng(seed).choice(len(X), n, replace=False)
+        perm = permutation_importance(pipe, X.iloc[pos], y[pos], scoring="roc_auc", n_repeats=3, random_state=seed)
+        nomes, valores = list(X.columns), np.maximum(perm.importances_mean, 0)
+    return pd.DataFrame({"feature": nomes, "importance": valores}).sort_values("importance", ascending=False).head(15)
+
+
+def _coletar_filhos() -> None:
+    for pid, proc in list(_filhos.items()):
+        if proc.poll() is not None:
+            del _filhos[pid]
+
+
+def estado_selecao(pasta: str = REGISTRY_DIR) -> dict | None:
+    """
+    Status da última seleção (`selecao.json`), ou None se nunca rodou.
+    """
+
+    _coletar_filhos()
+    try:
+        with open(os.path.join(pasta, STATUS_ARQUIVO), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _rodando(status: dict | None) -> bool:
+    _coletar_filhos()
+    if not status or status.get("estado") not in ("iniciando", "rodando"):
+        return False
+    try:
+        pid = int(status["pid"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    if pid in _filhos:
+        return True
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    # Filho de outro processo do servidor que terminou e ainda não foi coletado (zumbi)
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            return f.read().rsplit(")", 1)[-1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def selecionar_modelo(pasta: str = REGISTRY_DIR, candidatos: dict = CANDIDATOS, k: int = FOLDS,
+                      processos: int | None = None, amostra: int | None = None, seed: int = 42,
+                      promover: bool = True, progresso=None) -> str | None:
+    """
+    Validação cruzada de `candidatos` (k folds cada, tarefas independentes
+    no pool), retreino do melhor (maior AUC médio) na base inteira e
+    registro. Com `amostra`, só a validação usa N agendamentos sorteados;
+    o tamanho fica no meta do registro (`amostra_cv`).
+    `progresso(feitos, total, resultado)` é chamado a cada fold.
+    Retorna a versão registrada (None se houver menos de 500 agendamentos).
+    """
+
+    os.makedirs(pasta, exist_ok=True)
+    status_path = os.path.join(pasta, STATUS_ARQUIVO)
+    tarefas = [(nome, tipo, params, fold) for nome, (tipo, params) in candidatos.items() for fold in range(k)]
+    status = {
+        "estado": "rodando", "pid": os.getpid(), "inicio": _agora(), "fim": None,
+        "k": k, "candidatos": list(candidatos), "feitos": 0, "total": len(tarefas),
+        "resultados": [], "melhor": None, "versao": None, "erro": None,
+    }
+    _gravar_json(status_path, status)
+
+    try:
+        # Base inteira: decide se há dados e é nela que o melhor é retreinado
+        X, y = _dados(None, seed)
+        if len(y) < 500:
+            status.update(estado="sem_dados", fim=_agora())
+            _gravar_json(status_path, status)
+            return None
+
+        processos = processos or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_worker, initargs=(amostra, seed)) as pool:
+            futuros = [pool.submit(_avaliar, nome, tipo, params, fold, k, seed) for nome, tipo, params, fold in tarefas]
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                status["resultados"].append(resultado)
+                status["feitos"] += 1
+                _gravar_json(status_path, status)
+                if progresso:
+                    progresso(status["feitos"], status["total"], resultado)
+
+        resumo = resumo_resultados(status["resultados"])
+        melhor = resumo.iloc[0]
+        status["melhor"] = str(melhor["candidato"])
+        _gravar_json(status_path, status)
+
+        tipo, params = candidatos[status["melhor"]]
+        pipe = montar_candidato(tipo, params)
+        pipe.fit(X, y)
+        model_pack = {
+            "pipeline": pipe,
+            "auc": float(melhor["auc_medio"]),
+            "n_train": int(len(y)),
+            "feature_importance": _importancias(pipe, X, y, seed),
+            "features": list(FEATURES),
+        }
+        extra = {
+            "tipo": "selecao",
+            "candidato": status["melhor"],
+            "k": k,
+            "amostra_cv": int(min(amostra, len(y))) if amostra else None,
+            "cv": resumo.drop(columns="tempo_s").to_dict(orient="records"),
+        }
+        versao = registrar_modelo(model_pack, X.assign(faltou=y), pasta=pasta, promover=promover, extra=extra)
+        status.update(estado="concluido", versao=versao, fim=_agora())
+        _gravar_json(status_path, status)
+        return versao
+    except Exception as e:
+        status.update(estado="erro", erro=f"{type(e).__name__}: {e}", fim=_agora())
+        _gravar_json(status_path, status)
+        raise
+
+
+def iniciar_em_segundo_plano(pasta: str = REGISTRY_DIR, k: int = FOLDS, processos: int | None = None,
+                             amostra: int | None = None) -> int | None:
+    """
+    Dispara a seleção num processo separado (sobrevive ao rerun/sessão do
+    Streamlit) e retorna o pid; None se já houver uma seleção rodando.
+    """
+
+    if _rodando(estado_selecao(pasta)):
+        return None
+
+    os.makedirs(pasta, exist_ok=True)
+    cmd = [sys.executable, "-m", "utils.model_selection", "--pasta", pasta, "-k", str(k)]
+    if processos:
+        cmd += ["--processos", str(processos)]
+    if amostra:
+        cmd += ["--amostra", str(amostra)]
+
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [raiz, os.environ.get("PYTHONPATH")]))}
+    with open(os.path.join(pasta, LOG_ARQUIVO), "ab") as log:
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=env, start_new_session=True)
+    _filhos[proc.pid] = proc
+
+    # Registra o pid já: um segundo clique antes do filho gravar o status não
+    # dispara outra seleção
+    _gravar_json(os.path.join(pasta, STATUS_ARQUIVO), {
+        "estado": "iniciando", "pid": proc.pid, "inicio": _agora(), "feitos": 0, "total": None, "resultados": [],
+    })
+    return proc.pid
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.model_selection",
+        description="Validação cruzada de modelos candidatos em paralelo e promoção do melhor.",
+    )
+    parser.add_argument("--pasta", default=REGISTRY_DIR)
+    parser.add_argument("-k", type=int, default=FOLDS, help="número de folds")
+    parser.add_argument("--processos", type=int, default=None, help="padrão: todos os núcleos")
+    parser.add_argument("--amostra", type=int, default=None, help="limita a validação a N agendamentos")
+    parser.add_argument("--candidatos", nargs="+", choices=list(CANDIDATOS), default=list(CANDIDATOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sem-promover", action="store_true")
+    args = parser.parse_args(argv)
+
+    def progresso(feitos, total, r):
+        print(f"[{feitos}/{total}] {r['candidato']:<16} fold {r['fold']}  auc={r['auc']:.4f}  ({r['tempo_s']:.1f} s)", flush=True)
+
+    versao = selecionar_modelo(
+        args.pasta, {n: CANDIDATOS[n] for n in args.candidatos}, k=args.k, processos=args.processos,
+        amostra=args.amostra, seed=args.seed, promover=not args.sem_promover, progresso=progresso,
+    )
+    if versao is None:
+        print("Sem dados suficientes para treinar o modelo.")
+        return 1
+
+    status = estado_selecao(args.pasta)
+    with pd.option_context("display.float_format", "{:.4f}".format):
+        print(resumo_resultados(status["resultados"]).to_string(index=False))
+    print(f"Melhor: {status['melhor']} | modelo registrado: {versao}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,306 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+# Faixas na ordem de prioridade (ordenar pela categoria = alto primeiro)
+FAIXAS = ["ALTO", "MODERADO", "BAIXO"]
+
+EXEC_MANUAL = "Manual (analista)"
+EXEC_BOT = "Automático (bot)"
+
+# Playbook padrão versionado no repo; operações pode apontar outro arquivo
+# via GENESIS_REGRAS_ACAO sem mexer em código.
+REGRAS_PATH = os.environ.get(
+    "GENESIS_REGRAS_ACAO",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "regras_acao.json"),
+)
+
+# Limites padrão das faixas (sliders da aba Act e fila em lote)
+LIMIAR_MODERADO = 0.55
+LIMIAR_ALTO = 0.75
+
+OPERADORES = ("==", "!=", ">", ">=", "<", "<=", "in", "not_in")
+
+# Colunas da fila de ação exportada para os analistas
+COLUNAS_FILA = [
+    "id_agendamento", "idade", "canal_confirmacao", "bairro", "antecedencia_dias",
+    "faixa_risco", "acao_recomendada", "execucao", "risco_no_show",
+]
+
+
+def faixa_risco(risco, limiar_moderado: float, limiar_alto: float) -> pd.Categorical:
+    """
+    ALTO se risco ≥ limiar_alto, MODERADO se ≥ limiar_moderado, senão BAIXO.
+    """
+
+    r = np.asarray(risco, dtype=float)
+    limiar_alto = max(limiar_alto, limiar_moderado)
+
+    # nº de limites ≤ risco: 0 = BAIXO, 1 = MODERADO, 2 = ALTO
+    n = np.searchsorted(np.array([limiar_moderado, limiar_alto]), r, side="right")
+    n[np.isnan(r)] = 0
+
+    codes = (len(FAIXAS) - 1 - n).astype(np.int8)
+    return pd.Categorical.from_codes(codes, categories=FAIXAS)
+
+
+def _condicoes(quando: dict) -> list[tuple]:
+    """
+    Normaliza o bloco `quando` em [(coluna, operador, valor)]:
+    - {"col": valor}           → igualdade
+    - {"col": [v1, v2]}        → pertence à lista
+    - {"col": {">=": 15, ...}} → operadores explícitos
+    """
+
+    out = []
+    for col, spec in quando.items():
+        if isinstance(spec, dict):
+            for op, valor in spec.items():
+                if op not in OPERADORES:
+                    raise ValueError(f"Operador inválido na regra ({col}): {op!r}. Use um de {OPERADORES}.")
+                if op in ("in", "not_in") and not isinstance(valor, list):
+                    valor = [valor]
+                out.append((col, op, valor))
+        elif isinstance(spec, list):
+            out.append((col, "in", spec))
+        else:
+            out.append((col, "==", spec))
+    return out
+
+
+def _mascara(df: pd.DataFrame, col: str, op: str, valor) -> np.ndarray:
+    if col not in df.columns:
+        raise ValueError(f"Regra usa coluna inexistente na base pontuada: {col!r}")
+
+    s = df[col]
+    valores = valor if op in ("in", "not_in") else [valor]
+
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # Compara códigos inteiros em vez de strings
+        if op not in ("==", "!=", "in", "not_in"):
+            raise ValueError(f"Operador {op!r} não se aplica à coluna categórica {col!r}")
+        alvo = s.cat.categories.get_indexer(pd.Index(valores))
+        m = np.isin(s.cat.codes.to_numpy(), alvo[alvo >= 0])
+        return m if op in ("==", "in") else ~m
+
+    x = s.to_numpy()
+    if op == "in":
+        return np.isin(x, valores)
+    if op == "not_in":
+        return ~np.isin(x, valores)
+    if op == "==":
+        return x == valor
+    if op == "!=":
+        return x != valor
+    if op == ">":
+        return x > valor
+    if op == ">=":
+        return x >= valor
+    if op == "<":
+        return x < valor
+    return x <= valor
+
+
+class RegrasAcao:
+    """
+    Tabela declarativa de regras de intervenção, compilada uma vez.
+
+    Cada regra tem `quando` (condições sobre colunas da base pontuada),
+    `acao` e `execucao`. A primeira regra que casar vence; linhas sem regra
+    ficam sem ação (NaN). A avaliação monta uma máscara vetorizada por
+    condição distinta (reaproveitada entre regras) e resolve tudo num único
+    `np.select` sobre a base.
+    """
+
+    def __init__(self, regras: list[dict]):
+        self.regras = []
+        self.acoes = []
+        self.execucoes = []
+
+        for i, r in enumerate(regras):
+            if "acao" not in r or "execucao" not in r:
+                raise ValueError(f"Regra {i} sem 'acao' ou 'execucao': {r}")
+
+            for lista, valor in ((self.acoes, r["acao"]), (self.execucoes, r["execucao"])):
+                if valor not in lista:
+                    lista.append(valor)
+
+            condicoes = _condicoes(r.get("quando", {}))
+            self.regras.append({
+                "nome": r.get("nome", f"regra_{i}"),
+                "descricao": r.get("descricao") or ", ".join(f"{c} {op} {v}" for c, op, v in condicoes) or "demais casos",
+                "condicoes": condicoes,
+                "acao": r["acao"],
+                "execucao": r["execucao"],
+            })
+
+        self._acao_code = np.array([self.acoes.index(r["acao"]) for r in self.regras], dtype=np.int16)
+        self._exec_code = np.array([self.execucoes.index(r["execucao"]) for r in self.regras], dtype=np.int16)
+
+    @property
+    def colunas(self) -> set:
+        return {c for r in self.regras for c, _, _ in r["condicoes"]}
+
+    def avaliar(self, df: pd.DataFrame) -> tuple[pd.Categorical, pd.Categorical]:
+        """
+        (acao, execucao) por linha de `df`, como categóricas.
+        """
+
+        n = len(df)
+        if not self.regras:
+            vazio = np.full(n, -1, dtype=np.int16)
+            return (
+                pd.Categorical.from_codes(vazio, categories=self.acoes),
+                pd.Categorical.from_codes(vazio, categories=self.execucoes),
+            )
+
+        cache = {}
+        condlist = []
+        for r in self.regras:
+            m = np.ones(n, dtype=bool)
+            for col, op, valor in r["condicoes"]:
+                chave = (col, op, json.dumps(valor, sort_keys=True, default=str))
+                if chave not in cache:
+                    cache[chave] = _mascara(df, col, op, valor)
+                m &= cache[chave]
+            condlist.append(m)
+
+        # índice da primeira regra que casa (-1 = nenhuma)
+        idx = np.select(condlist, list(range(len(condlist))), default=-1)
+        sem_regra = idx < 0
+
+        acao = np.where(sem_regra, -1, self._acao_code[idx])
+        execucao = np.where(sem_regra, -1, self._exec_code[idx])
+        return (
+            pd.Categorical.from_codes(acao, categories=self.acoes),
+            pd.Categorical.from_codes(execucao, categories=self.execucoes),
+        )
+
+
+_regras_cache = {}
+_regras_lock = threading.Lock()
+
+
+def carregar_regras(path: str | None = None) -> RegrasAcao:
+    """
+    Lê e compila o playbook em JSON. Recompila só quando o arquivo muda
+    (mtime), então edições de operações valem no próximo rerun.
+    """
+
+    path = os.path.abspath(path or REGRAS_PATH)
+    chave = (path, os.stat(path).st_mtime_ns)
+
+    with _regras_lock:
+        if chave not in _regras_cache:
+            with open(path, "r", encoding="utf-8") as f:
+                tabela = json.load(f)
+            _regras_cache.clear()
+            _regras_cache[chave] = RegrasAcao(tabela["regras"])
+        return _regras_cache[chave]
+
+
+def aplicar_regras(scored: pd.DataFrame, limiar_moderado: float, limiar_alto: float,
+                   regras: RegrasAcao | None = None) -> pd.DataFrame:
+    """
+    Acrescenta `faixa_risco`, `acao_recomendada` e `execucao` (categóricas)
+    a uma cópia da base pontuada, usando o playbook (padrão: REGRAS_PATH).
+    """
+
+    regras = regras or carregar_regras()
+
+    out = scored.copy()
+    out["faixa_risco"] = pd.Series(
+        faixa_risco(out["risco_no_show"].to_numpy(), limiar_moderado, limiar_alto), index=out.index
+    )
+
+    acao, execucao = regras.avaliar(out)
+    out["acao_recomendada"] = pd.Series(acao, index=out.index)
+    out["execucao"] = pd.Series(execucao, index=out.index)
+    return out
+
+
+def ranking_acoes(tmp: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casos, risco e antecedência médios por faixa × grupo de idade × ação
+    (base com `aplicar_regras`). Alto risco primeiro, depois por volume.
+    """
+
+    agg = tmp.groupby(["faixa_risco", "idade_60_mais", "acao_recomendada", "execucao"], observed=True).agg(
+        qtd=("id_agendamento", "count"),
+        risco_medio=("risco_no_show", "mean"),
+        antecedencia_media=("antecedencia_dias", "mean"),
+    ).reset_index()
+
+    agg["grupo_idade"] = agg["idade_60_mais"].apply(lambda x: "60+" if int(x) == 1 else "<60")
+
+    # ordenação: alto primeiro, depois moderado, depois baixo (ordem das categorias)
+    return agg.sort_values(["faixa_risco", "qtd"], ascending=[True, False]).drop(columns=["idade_60_mais"])
+
+
+def top_k(valores, k: int, maior: bool = True) -> np.ndarray:
+    """
+    Posições dos `k` maiores (ou menores) valores, já ordenadas, sem ordenar
+    o resto: seleção parcial (O(n)) + ordenação só dos k. Empates saem na
+    ordem original, como num sort estável; NaN fica por último.
+    """
+
+    v = np.asarray(valores, dtype=np.float64)
+    v = np.where(np.isnan(v), -np.inf, v if maior else -v)
+    n = len(v)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= n:
+        return np.argsort(-v, kind="stable")
+
+    # k-ésimo maior; no limite, só os primeiros empates que couberem
+    limite = np.partition(v, n - k)[n - k]
+    acima = np.flatnonzero(v > limite)
+    empate = np.flatnonzero(v == limite)[:k - len(acima)]
+    pos = np.concatenate([acima, empate])
+    return pos[np.argsort(-v[pos], kind="stable")]
+
+
+def fila_acao(tmp: pd.DataFrame, k: int | None = None) -> pd.DataFrame:
+    """
+    Fila operacional: casos ordenados por risco (maior primeiro); com `k`,
+    só os k primeiros (seleção parcial em vez de ordenar a base toda).
+    """
+
+    pos = top_k(tmp["risco_no_show"].to_numpy(), len(tmp) if k is None else k)
+    return tmp.iloc[pos][COLUNAS_FILA]
+
+
+def mascara_fila(tmp: pd.DataFrame, faixas: list | None = None, execucoes: list | None = None) -> np.ndarray:
+    """
+    Linhas da fila nas `faixas`/`execucoes` pedidas (vazio = todas).
+    """
+
+    m = np.ones(len(tmp), dtype=bool)
+    if faixas:
+        m &= _mascara(tmp, "faixa_risco", "in", list(faixas))
+    if execucoes:
+        m &= _mascara(tmp, "execucao", "in", list(execucoes))
+    return m
+
+
+def pagina_fila(tmp: pd.DataFrame, pagina: int = 0, por_pagina: int = 200, ordenar_por: str = "risco_no_show",
+                decrescente: bool = True, mascara: np.ndarray | None = None) -> tuple[pd.DataFrame, int]:
+    """
+    (página, total de linhas): a `pagina` (0 = primeira) da fila filtrada por
+    `mascara` e ordenada por uma coluna numérica. Só as linhas até o fim da
+    página são selecionadas e ordenadas (top-k), nunca a base inteira.
+    """
+
+    linhas = np.flatnonzero(mascara) if mascara is not None else np.arange(len(tmp))
+    total = len(linhas)
+    inicio = max(pagina, 0) * por_pagina
+    if inicio >= total:
+        return tmp.iloc[:0][COLUNAS_FILA], total
+
+    valores = tmp[ordenar_por].to_numpy()[linhas]
+    pos = top_k(valores, inicio + por_pagina, maior=decrescente)[inicio:]
+    return tmp.iloc[linhas[pos]][COLUNAS_FILA], total
@@ -0,0 +1,459 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.model import FEATURES
+
+
+# Serviço de score em tempo real: agendamentos chegam um a um (HTTP/1.1
+# keep-alive, TCP ou socket Unix) e são pontuados em micro-lotes — o que
+# chega dentro de JANELA_MS vira uma chamada só de predict_proba, que custa
+# quase o mesmo para 1 ou 500 linhas. Só biblioteca padrão + o pipeline do
+# registro; sem framework web.
+JANELA_MS = 5.0
+MAX_LOTE = 512
+RECARREGAR_S = 30.0
+HOST = "127.0.0.1"
+PORTA = 8765
+MAX_CORPO = 1 << 20
+
+CAMPOS_OBRIGATORIOS = ["idade", "canal_confirmacao", "bairro"]
+
+
+class ErroEntrada(ValueError):
+    pass
+
+
+def validar_registro(r, i: int = 0) -> dict:
+    """
+    Features do modelo a partir do JSON de um agendamento: `idade`,
+    `canal_confirmacao` ("SMS"/"Sem SMS"), `bairro` e `antecedencia_minutos`
+    ou `antecedencia_dias` (a outra e `idade_60_mais` são derivadas).
+    Python puro: roda por pedido no event loop, o DataFrame é montado uma vez
+    por lote.
+    """
+
+    if not isinstance(r, dict):
+        raise ErroEntrada(f"Agendamento {i}: esperado objeto JSON.")
+    faltando = [c for c in CAMPOS_OBRIGATORIOS if r.get(c) is None]
+    if r.get("antecedencia_minutos") is None and r.get("antecedencia_dias") is None:
+        faltando.append("antecedencia_minutos|antecedencia_dias")
+    if faltando:
+        raise ErroEntrada(f"Agendamento {i}: faltam {', '.join(faltando)}.")
+
+    try:
+        idade = max(int(r["idade"]), 0)
+        if r.get("antecedencia_minutos") is not None:
+            minutos = max(float(r["antecedencia_minutos"]), 0.0)
+        else:
+            minutos = max(float(r["antecedencia_dias"]), 0.0) * 60 * 24
+    except (ValueError, TypeError, OverflowError) as e:
+        raise ErroEntrada(f"Agendamento {i}: campo numérico inválido ({e}).") from None
+    if not math.isfinite(minutos):
+        raise ErroEntrada(f"Agendamento {i}: antecedência precisa ser um número finito.")
+
+    return {
+        "idade": idade,
+        "idade_60_mais": int(idade >= 60),
+        "canal_confirmacao": str(r["canal_confirmacao"]),
+        "bairro": str(r["bairro"]),
+        "antecedencia_minutos": round(minutos),
+        "antecedencia_dias": round(minutos / (60 * 24)),
+    }
+
+
+def preparar_registros(validados: list[dict]) -> pd.DataFrame:
+    """
+    DataFrame de features a partir de registros de `validar_registro`.
+    """
+
+    return pd.DataFrame.from_records(validados, columns=FEATURES)
+
+
+class Modelo:
+    """
+    model_pack promovido no registro, recarregado (fora do event loop)
+    quando outra versão é promovida.
+    """
+
+    def __init__(self, model_pack: dict):
+        self.pack = model_pack
+        self._verificado = time.monotonic()
+
+    @classmethod
+    def carregar(cls) -> "Modelo":
+        from utils.data_loader import load_data
+        from utils.model import treinar_modelo_no_show
+        from utils.model_registry import carregar_modelo
+
+        # Sem modelo promovido, treina na base histórica (como as abas)
+        pack = carregar_modelo()
+        if pack is None:
+            pack = treinar_modelo_no_show(load_data())
+        if pack is None:
+            raise RuntimeError("Sem modelo promovido e sem dados suficientes para treinar.")
+        return cls(pack)
+
+    @property
+    def versao(self) -> str | None:
+        return self.pack.get("versao")
+
+    def recarregar_se_mudou(self, intervalo: float = RECARREGAR_S) -> None:
+        from utils.model_registry import carregar_modelo, versao_atual
+
+        if time.monotonic() - self._verificado < intervalo:
+            return
+        self._verificado = time.monotonic()
+        versao = versao_atual()
+        if versao and versao != self.versao:
+            self.pack = carregar_modelo(versao)
+
+    def pontuar(self, X: pd.DataFrame) -> np.ndarray:
+        from utils.fast_scorer import scorer_rapido
+
+        rapido = scorer_rapido(self.pack)
+        if rapido is not None:
+            return rapido.pontuar(X)
+        return self.pack["pipeline"].predict_proba(X[self.pack["features"]])[:, 1]
+
+
+class MicroLote:
+    """
+    Junta pedidos concorrentes: o primeiro abre uma janela de `janela_ms`
+    (ou até `max_lote` pedidos) e o lote inteiro é pontuado numa chamada,
+    numa thread à parte para o event loop continuar aceitando conexões.
+    """
+
+    def __init__(self, modelo: Modelo, janela_ms: float = JANELA_MS, max_lote: int = MAX_LOTE):
+        self.modelo = modelo
+        self.janela = janela_ms / 1000
+        self.max_lote = max_lote
+        self._fila = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="score")
+        self.lotes = 0
+        self.pedidos = 0
+
+    async def pontuar(self, registros: list[dict]) -> np.ndarray:
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila.put((registros, futuro))
+        return await futuro
+
+    async def _coletar(self) -> list:
+        itens = [await self._fila.get()]
+        n = len(itens[0][0])
+        limite = time.monotonic() + self.janela
+        while n < self.max_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._fila.get(), restante)
+            except asyncio.TimeoutError:
+                break
+            itens.append(item)
+            n += len(item[0])
+        return itens
+
+    def _pontuar_lote(self, registros: list[dict]) -> np.ndarray:
+        self.modelo.recarregar_se_mudou()
+        return self.modelo.pontuar(preparar_registros(registros))
+
+    async def executar(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            itens = await self._coletar()
+            registros = [r for lote, _ in itens for r in lote]
+            try:
+                risco = await loop.run_in_executor(self._executor, self._pontuar_lote, registros)
+            except Exception as e:
+                for _, futuro in itens:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+
+            self.lotes += 1
+            self.pedidos += len(itens)
+            inicio = 0
+            for x, futuro in itens:
+                if not futuro.done():
+                    futuro.set_result(risco[inicio:inicio + len(x)])
+                inicio += len(x)
+
+
+async def _ler_requisicao(reader: asyncio.StreamReader) -> tuple[str, str, dict, bytes] | None:
+    try:
+        cabecalho = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise ErroEntrada("Cabeçalho grande demais.") from None
+    linhas = cabecalho.decode("latin-1").split("\r\n")
+    metodo, caminho, _ = linhas[0].split(" ", 2)
+    headers = {}
+    for linha in linhas[1:]:
+        if ":" in linha:
+            k, v = linha.split(":", 1)
+            headers[k.strip().lower()] = v.strip()
+    tamanho = int(headers.get("content-length", 0))
+    if tamanho > MAX_CORPO:
+        raise ErroEntrada("Corpo grande demais.")
+    try:
+        corpo = await reader.readexactly(tamanho) if tamanho else b""
+    except (asyncio.IncompleteReadError, ConnectionError):
+        # Cliente desconectou no meio do corpo: como no fim do cabeçalho
+        return None
+    return metodo, caminho, headers, corpo
+
+
+def _resposta(status: int, conteudo: dict, manter: bool) -> bytes:
+    textos = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+    corpo = json.dumps(conteudo, ensure_ascii=False).encode("utf-8")
+    return (
+        f"HTTP/1.1 {status} {textos[status]}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(corpo)}\r\n"
+        f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n"
+    ).encode("latin-1") + corpo
+
+
+async def _atender(lote: MicroLote, metodo: str, caminho: str, corpo: bytes) -> tuple[int, dict]:
+    if metodo == "GET" and caminho == "/saude":
+        return 200, {"ok": True, "modelo": lote.modelo.versao, "pedidos": lote.pedidos, "lotes": lote.lotes}
+    if metodo != "POST" or caminho != "/pontuar":
+        return 404, {"erro": "Use POST /pontuar ou GET /saude."}
+
+    try:
+        dados = json.loads(corpo or b"null")
+    except ValueError:
+        return 400, {"erro": "JSON inválido."}
+    unico = isinstance(dados, dict)
+    registros = [dados] if unico else dados
+    if not isinstance(registros, list) or not registros:
+        return 400, {"erro": "Envie um agendamento (objeto) ou uma lista de agendamentos."}
+
+    try:
+        validados = [validar_registro(r, i) for i, r in enumerate(registros)]
+    except ErroEntrada as e:
+        return 400, {"erro": str(e)}
+
+    risco = await lote.pontuar(validados)
+    if unico:
+        return 200, {"risco_no_show": float(risco[0]), "modelo": lote.modelo.versao}
+    return 200, {"risco_no_show": [float(r) for r in risco], "modelo": lote.modelo.versao}
+
+
+def _conexao(lote: MicroLote):
+    async def tratar(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    req = await _ler_requisicao(reader)
+                except (ErroEntrada, ValueError) as e:
+                    writer.write(_resposta(400, {"erro": str(e)}, False))
+                    break
+                if req is None:
+                    break
+                metodo, caminho, headers, corpo = req
+                manter = headers.get("connection", "").lower() != "close"
+                try:
+                    status, conteudo = await _atender(lote, metodo, caminho, corpo)
+                except Exception as e:
+                    status, conteudo = 500, {"erro": f"{type(e).__name__}: {e}"}
+                writer.write(_resposta(status, conteudo, manter))
+                await writer.drain()
+                if not manter:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return tratar
+
+
+async def servir(host: str = HOST, porta: int = PORTA, socket_unix: str | None = None,
+                 janela_ms: float = JANELA_MS, max_lote: int = MAX_LOTE, pronto=None) -> None:
+    """
+    Sobe o serviço (TCP em host:porta ou socket Unix) até ser cancelado.
+    `pronto(servidor)` é chamado quando ele já aceita conexões.
+    """
+
+    loop = asyncio.get_running_loop()
+    modelo = await loop.run_in_executor(None, Modelo.carregar)
+    lote = MicroLote(modelo, janela_ms, max_lote)
+    tarefa = asyncio.create_task(lote.executar())
+
+    if socket_unix:
+        servidor = await asyncio.start_unix_server(_conexao(lote), path=socket_unix)
+    else:
+        servidor = await asyncio.start_server(_conexao(lote), host, porta)
+    if pronto:
+        pronto(servidor)
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        tarefa.cancel()
+
+
+class ClienteRisco:
+    """
+    Cliente asyncio com conexões keep-alive reaproveitadas (até `conexoes`
+    pedidos em voo). `await cliente.pontuar({...})` -> risco (0 a 1).
+    """
+
+    def __init__(self, host: str = HOST, porta: int = PORTA, socket_unix: str | None = None, conexoes: int = 32):
+        self.host, self.porta, self.socket_unix = host, porta, socket_unix
+        self._livres = asyncio.LifoQueue()
+        self._vagas = asyncio.Semaphore(conexoes)
+
+    async def _abrir(self):
+        if self.socket_unix:
+            return await asyncio.open_unix_connection(self.socket_unix)
+        return await asyncio.open_connection(self.host, self.porta)
+
+    async def _pedido(self, metodo: str, caminho: str, conteudo=None) -> dict:
+        corpo = b"" if conteudo is None else json.dumps(conteudo).encode("utf-8")
+        requisicao = (
+            f"{metodo} {caminho} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(corpo)}\r\n\r\n"
+        ).encode("latin-1") + corpo
+
+        async with self._vagas:
+            reader, writer = self._livres.get_nowait() if not self._livres.empty() else await self._abrir()
+            try:
+                writer.write(requisicao)
+                await writer.drain()
+                cabecalho = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+                status = int(cabecalho.split(" ", 2)[1])
+                tamanho = next(
+                    int(l.split(":", 1)[1]) for l in cabecalho.split("\r\n") if l.lower().startswith("content-length:")
+                )
+                resposta = json.loads(await reader.readexactly(tamanho))
+            except BaseException:
+                writer.close()
+                raise
+            self._livres.put_nowait((reader, writer))
+
+        if status != 200:
+            raise RuntimeError(f"{status}: {resposta.get('erro')}")
+        return resposta
+
+    async def pontuar(self, agendamento: dict) -> float:
+        return (await self._pedido("POST", "/pontuar", agendamento))["risco_no_show"]
+
+    async def pontuar_varios(self, agendamentos: list[dict]) -> list[float]:
+        return (await self._pedido("POST", "/pontuar", agendamentos))["risco_no_show"]
+
+    async def saude(self) -> dict:
+        return await self._pedido("GET", "/saude")
+
+    async def fechar(self) -> None:
+        while not self._livres.empty():
+            _, writer = self._livres.get_nowait()
+            writer.close()
+
+
+async def carga(cliente: ClienteRisco, n: int = 2000, concorrencia: int = 64, seed: int = 42) -> dict:
+    """
+    Teste de carga: `n` agendamentos individuais com `concorrencia` pedidos
+    em voo. Latências em ms e pedidos/s.
+    """
+
+    rng = np.random.default_rng(seed)
+    canais = ["SMS", "Sem SMS"]
+    agendamentos = [
+        {
+            "idade": int(rng.integers(0, 95)),
+            "canal_confirmacao": canais[int(rng.integers(0, 2))],
+            "bairro": f"BAIRRO {int(rng.integers(0, 30))}",
+            "antecedencia_dias": int(rng.integers(0, 60)),
+        }
+        for _ in range(n)
+    ]
+
+    latencias = []
+    vagas = asyncio.Semaphore(concorrencia)
+
+    async def um(ag):
+        async with vagas:
+            t0 = time.perf_counter()
+            await cliente.pontuar(ag)
+            latencias.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(um(a) for a in agendamentos))
+    total = time.perf_counter() - t0
+
+    lat = np.array(latencias) * 1000
+    return {
+        "pedidos": n,
+        "pedidos_s": n / total,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "p99_ms": float(np.percentile(lat, 99)),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.scoring_service",
+        description="Serviço HTTP de risco de no-show com micro-lotes (e cliente de teste de carga).",
+    )
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    for nome, ajuda in (("servir", "sobe o serviço"), ("carga", "teste de carga contra um serviço rodando")):
+        p = sub.add_parser(nome, help=ajuda)
+        p.add_argument("--host", default=HOST)
+        p.add_argument("--porta", type=int, default=PORTA)
+        p.add_argument("--socket", help="socket Unix em vez de TCP")
+        if nome == "servir":
+            p.add_argument("--janela-ms", type=float, default=JANELA_MS, help="espera máxima para formar um lote")
+            p.add_argument("--max-lote", type=int, default=MAX_LOTE, help="linhas por chamada ao modelo")
+        else:
+            p.add_argument("-n", type=int, default=2000)
+            p.add_argument("--concorrencia", type=int, default=64)
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "servir":
+        def pronto(servidor):
+            onde = args.socket or f"http://{args.host}:{args.porta}"
+            print(f"Servindo em {onde} (janela {args.janela_ms} ms, lote até {args.max_lote})", flush=True)
+
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+        try:
+            asyncio.run(servir(args.host, args.porta, args.socket, args.janela_ms, args.max_lote, pronto))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    async def rodar():
+        cliente = ClienteRisco(args.host, args.porta, args.socket, conexoes=args.concorrencia)
+        try:
+            r = await carga(cliente, args.n, args.concorrencia)
+            r["servidor"] = await cliente.saude()
+            return r
+        finally:
+            await cliente.fechar()
+
+    r = asyncio.run(rodar())
+    s = r["servidor"]
+    print(
+        f"{r['pedidos']} pedidos: {r['pedidos_s']:.0f}/s | p50 {r['p50_ms']:.1f} ms | "
+        f"p95 {r['p95_ms']:.1f} ms | p99 {r['p99_ms']:.1f} ms | "
+        f"{s['lotes']} lotes no servidor ({s['pedidos'] / max(s['lotes'], 1):.1f} pedidos/lote)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())